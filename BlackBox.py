@@ -2,24 +2,158 @@
 # Date: 8/3/2020
 # Description: Code for BlackBoxGame
 
+import bisect
+
+
+class PersistentList:
+    """
+    Represents a list that is never changed: append returns a new list that shares every item of this one instead of copying them, so any number of versions of a list cost one small node per item appended.
+    """
+    __slots__ = ("_last", "_rest", "_length")
+
+    def __init__(self, items=()):
+        """
+        :param items: default parameter, items of the new list, in order
+        """
+        self._last = None
+        self._rest = None  # PersistentList of the items before the last one, None for an empty list
+        self._length = 0
+        items = list(items)
+        if items:
+            rest = EMPTY_LIST
+            for item in items[:-1]:
+                rest = rest.append(item)
+            self._last, self._rest, self._length = items[-1], rest, len(items)
+
+    def append(self, item):
+        """
+        returns a new list with item added at the end, this list is unchanged
+        """
+        node = PersistentList.__new__(PersistentList)
+        node._last, node._rest, node._length = item, self, self._length + 1
+        return node
+
+    def get_last(self):
+        return self._last
+
+    def get_rest(self):
+        """
+        returns the list without its last item, an empty list stays empty
+        """
+        return self._rest if self._rest is not None else self
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, item):
+        node = self
+        while node._length:
+            if node._last == item:
+                return True
+            node = node._rest
+        return False
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def to_list(self):
+        """
+        takes no parameters and returns a new Python list of the items, in the order they were appended
+        """
+        items = [None] * self._length
+        node = self
+        while node._length:
+            items[node._length - 1] = node._last
+            node = node._rest
+        return items
+
+    def __reduce__(self):
+        """
+        pickles the items as a flat list, so long lists do not pickle as deeply nested nodes. Lists that share nodes are pickled with pack_lists instead, which stores each node once.
+        """
+        return (PersistentList, (self.to_list(),))
+
+
+EMPTY_LIST = PersistentList()  # shared by every list that starts empty, since it is never changed
+
+
+def pack_lists(lists):
+    """
+    flattens PersistentList objects into one table that stores every node once, however many of the lists share it, and without nesting, so they pickle in space linear in their nodes
+    :param lists: list of PersistentList objects or None
+    :return: tuple (items, rests, heads): node i holds items[i] after the node rests[i], -1 for an empty list; heads[j] is the node of lists[j], -1 for an empty list and None for None
+    """
+    ids = {}  # id of a node -> its index, nodes are shared by identity
+    items = []
+    rests = []
+    heads = []
+    for plist in lists:
+        new = []
+        node = plist
+        while node is not None and node._length and id(node) not in ids:
+            new.append(node)
+            node = node._rest
+        for node in reversed(new):  # the node before comes first, so every rest index is known when it is used
+            ids[id(node)] = len(items)
+            items.append(node._last)
+            rests.append(ids[id(node._rest)] if node._rest._length else -1)
+        if plist is None:
+            heads.append(None)
+        else:
+            heads.append(ids[id(plist)] if plist._length else -1)
+
+    return items, rests, heads
+
+
+def unpack_lists(items, rests, heads):
+    """
+    rebuilds the lists flattened by pack_lists, the nodes they shared are shared again
+    :return: list of PersistentList objects or None, in the order of heads
+    """
+    nodes = []
+    for item, rest in zip(items, rests):
+        nodes.append((nodes[rest] if rest >= 0 else EMPTY_LIST).append(item))
+
+    return [None if head is None else nodes[head] if head >= 0 else EMPTY_LIST for head in heads]
+
+
 class BlackBoxGame:
     """
     Represents the game, initializes the board and the score. This class will communicate with the Board class and the Ray class. Composition is used since the Board class is used as a data member. The Ray class is used in the shoot_ray method. This class has a method to initialize the board and the player's score. This class has methods that the player would use to play the game, including shoot_ray, guess_atom, get_score, and atom_left. This class also has the update_score method that would be called by shoot_ray to update the score.
     """
-    def __init__(self, pos_list):
+    LIST_FIELDS = ("_entries_exits", "_hit_list", "_reflect_list", "_ray_list")  # PersistentList attributes of the state
+    SNAPSHOT_LISTS = (4, 6, 7, 8)  # positions of the same lists in a snapshot
+
+    def __init__(self, pos_list, board_class=None, size=10, event_log=None, game_id=0):
         """
         takes in a list of atoms position as parameter and initializes the data members including board, score, atoms_left, atom positions, guesses, and entries_exit
         :param pos_list: a list of tuples that represents the locations of atoms
+        :param board_class: default parameter, the class used for the board, Board if None, BitBoard or SparseBoard can be used instead
+        :param size: default parameter, number of squares on each side of the board, border included
+        :param event_log: default parameter, eventlog.EventLog the game records its creation, rays and guesses in
+        :param game_id: default parameter, id of the game in the event log
         """
-        self._board = Board(pos_list)
+        if board_class is None:
+            board_class = Board
+        self._board = board_class(pos_list, size)
         self._score = 100
         self._atoms = pos_list
         self._atoms_left = len(pos_list)
+        # the lists are PersistentList objects and the guesses a tuple, which are never changed once built, so a snapshot of
+        # the state shares them. The guesses are few and checked on every guess, so a tuple is searched faster.
         self._guesses = None  # to keep track of guesses that has been made
         self._entries_exits = None  # to keep track of entries and exits that have been used
+        self._used_mask = 0  # bit get_border_index of each square in entries_exits, to check if a square was used
         self._hit_list = None
         self._reflect_list = None
+        self._ray_list = None  # (entry, exit) of every ray shot, in order
         self._game_status = "started"
+        self._undo = EMPTY_LIST  # snapshots before each move, the last one first
+        self._redo = EMPTY_LIST  # snapshots of the moves undone, the last one first
+        self._event_log = event_log
+        self._game_id = game_id
+        if event_log is not None:
+            event_log.record_create(game_id, pos_list, size, board_class, self._score)
 
     def shoot_ray(self, row, col):
         """
@@ -28,47 +162,61 @@ class BlackBoxGame:
         :param col: type is integer
         :return: If the ray origin a corner square or a non-border square, then return False. Otherwise, shoot_ray should return a tuple of the row and column (in that order) of the exit border square. If there is no exit border square (because there was a hit), then return None,
         """
-        ray = Ray(row, col)
+        entry = (row, col)
         entry_score = None
         exit_score = None
 
-        if ray.get_entry()[0] not in range(0,10) or ray.get_entry()[1] not in range(0,10):
-            return False
-
-        if ray.entry_is_corner() or ray.entry_is_nonborder():
+        # corners, non-border and off-board squares are not ray origins
+        if not self._board.is_border_entry(entry):
             return False
 
+        before = self.get_snapshot()
         if self._entries_exits is None:
-            self._entries_exits = []
+            self._entries_exits = EMPTY_LIST
 
-        self._board.find_exit(ray)
+        exit = self._board.get_exit(entry)
 
-        if ray.get_entry() not in self._entries_exits:
-            self._entries_exits.append(ray.get_entry())
+        # one bit per border square, so the mask kept by each snapshot grows with the border and not the whole board
+        entry_bit = 1 << self._board.get_border_index(entry)
+        if not self._used_mask & entry_bit:
+            self._entries_exits = self._entries_exits.append(entry)
+            self._used_mask |= entry_bit
             entry_score = True
 
-        if ray.get_exit() is not None and ray.get_exit() not in self._entries_exits:
-            self._entries_exits.append(ray.get_exit())
-            exit_score = True
+        if exit is not None:
+            exit_bit = 1 << self._board.get_border_index(exit)
+            if not self._used_mask & exit_bit:
+                self._entries_exits = self._entries_exits.append(exit)
+                self._used_mask |= exit_bit
+                exit_score = True
 
         self.update_score(entry_score, exit_score)
-        self.update_tracking(ray.get_entry(),ray.get_exit())
+        self.update_tracking(entry, exit)
         self.update_game_status()
+        self.record_move(before)
+
+        if self._event_log is not None:
+            self._event_log.record_shot(self._game_id, entry, exit, self._score)
 
-        return (ray.get_entry(), ray.get_exit())
+        return (entry, exit)
 
     def update_tracking(self,entry, exit):
         if self._hit_list is None:
-            self._hit_list = []
+            self._hit_list = EMPTY_LIST
 
         if self._reflect_list is None:
-            self._reflect_list = []
+            self._reflect_list = EMPTY_LIST
+
+        if self._ray_list is None:
+            self._ray_list = EMPTY_LIST
+
+        self._ray_list = self._ray_list.append((entry, exit))
 
         if exit is None:
-            self._hit_list.append(entry)
+            self._hit_list = self._hit_list.append(entry)
         else:
             if exit == entry:
-                self._reflect_list.append(exit)
+                self._reflect_list = self._reflect_list.append(exit)
 
     def update_score(self, entry = None, exit = None, guess = None):
         """
@@ -100,10 +248,10 @@ class BlackBoxGame:
                 self._score -= 5
 
     def update_game_status(self):
-        if self._guesses is not None and len(self._guesses) == 4:
-            self._guesses.sort()
+        if self._guesses is not None and len(self._guesses) == len(self._atoms):
+            self._guesses = tuple(sorted(self._guesses))
             self._atoms.sort()
-            if self._guesses == self._atoms:
+            if list(self._guesses) == self._atoms:
                 self._game_status = "You won! Play again!"
             else:
                 self._game_status = "You lost! Try again!"
@@ -114,20 +262,26 @@ class BlackBoxGame:
         :return: True if guess is right, otherwise it should return False
         """
         pos = (row, col)
-
-        if self._guesses is None:
-            self._guesses = []
-
-        if pos not in self._guesses:
-            self._guesses.append(pos)
-            if pos not in self._board.get_atoms_pos():
+        if self._event_log is not None:
+            self._event_log.check_pos(pos)  # before the guess changes the game, so the log always matches it
+        correct = pos in self._board.get_atoms_pos()
+
+        # guessing a square again changes nothing, so only a new guess is recorded as a move
+        if self._guesses is None or pos not in self._guesses:
+            before = self.get_snapshot()
+            self._guesses = (self._guesses or ()) + (pos,)
+            if not correct:
                 self.update_score(None, None, False)
             else:
                 self._atoms_left -= 1
+            self.update_game_status()
+            self._undo = self._undo.append(before)
+            self._redo = EMPTY_LIST
 
-        self.update_game_status()
+        if self._event_log is not None:
+            self._event_log.record_guess(self._game_id, pos, correct, self._score)
 
-        return pos in self._board.get_atoms_pos()
+        return correct
 
     def get_score(self):
         """
@@ -151,16 +305,139 @@ class BlackBoxGame:
         return self._board
 
     def get_guesses(self):
-        return self._guesses
+        return None if self._guesses is None else list(self._guesses)
 
     def get_hits(self):
-        return self._hit_list
+        return None if self._hit_list is None else self._hit_list.to_list()
 
     def get_reflects(self):
-        return self._reflect_list
+        return None if self._reflect_list is None else self._reflect_list.to_list()
 
     def get_entries_exits(self):
-        return self._entries_exits
+        return None if self._entries_exits is None else self._entries_exits.to_list()
+
+    def get_rays(self):
+        return None if self._ray_list is None else self._ray_list.to_list()
+
+    def get_snapshot(self):
+        """
+        takes no parameters and returns the state of the game (score, status, guesses and rays) as an immutable tuple. Nothing is copied, the tuple shares the lists of the game, so a snapshot costs the same however long the game is.
+        """
+        return (self._score, self._atoms_left, self._game_status, self._guesses, self._entries_exits,
+                self._used_mask, self._hit_list, self._reflect_list, self._ray_list)
+
+    def set_snapshot(self, snapshot):
+        (self._score, self._atoms_left, self._game_status, self._guesses, self._entries_exits,
+         self._used_mask, self._hit_list, self._reflect_list, self._ray_list) = snapshot
+
+    def record_move(self, before):
+        """
+        pushes the state before a move on the undo history if the move changed anything, and forgets the moves that were undone
+        :param before: snapshot taken before the move
+        """
+        if before != self.get_snapshot():
+            self._undo = self._undo.append(before)
+            self._redo = EMPTY_LIST
+
+    def can_undo(self):
+        return len(self._undo) > 0
+
+    def can_redo(self):
+        return len(self._redo) > 0
+
+    def undo(self):
+        """
+        takes back the last shoot_ray or guess_atom that changed the game, score included
+        :return: True if a move was taken back, False if there was none
+        """
+        if not self._undo:
+            return False
+        self._redo = self._redo.append(self.get_snapshot())
+        self.set_snapshot(self._undo.get_last())
+        self._undo = self._undo.get_rest()
+        if self._event_log is not None:
+            self._event_log.record_undo(self._game_id, self._score)
+        return True
+
+    def redo(self):
+        """
+        plays again the last move taken back by undo
+        :return: True if a move was played again, False if there was none
+        """
+        if not self._redo:
+            return False
+        self._undo = self._undo.append(self.get_snapshot())
+        self.set_snapshot(self._redo.get_last())
+        self._redo = self._redo.get_rest()
+        if self._event_log is not None:
+            self._event_log.record_redo(self._game_id, self._score)
+        return True
+
+    def restore(self, snapshot):
+        """
+        puts the game back in the state of a snapshot taken with get_snapshot from this game or one of its branches, as a move that can be undone. The event log has no record for it, so games with an event log cannot be restored.
+        """
+        if self._event_log is not None:
+            raise ValueError("game %d records to an event log and cannot be restored" % self._game_id)
+        before = self.get_snapshot()
+        self.set_snapshot(snapshot)
+        self.record_move(before)
+
+    def branch(self):
+        """
+        takes no parameters and returns a new game in the same state, with the same undo and redo history, that can be played without changing this one. The board and the state are shared and not copied, so a branch is as cheap as a snapshot. The branch has no event log.
+        """
+        game = BlackBoxGame.__new__(BlackBoxGame)
+        game.__dict__.update(self.__dict__)
+        game._event_log = None
+        return game
+
+    def __getstate__(self):
+        """
+        pickles the state with every list node stored once. The snapshots of the undo and redo history share their list nodes with each other and with the game, pickling each list on its own would store the same rays again for every snapshot.
+        """
+        state = self.__dict__.copy()
+        snapshots, history_rests, history_heads = pack_lists([self._undo, self._redo])
+        lists = [state[name] for name in self.LIST_FIELDS]
+        for snapshot in snapshots:
+            lists += [snapshot[i] for i in self.SNAPSHOT_LISTS]
+        items, rests, heads = pack_lists(lists)
+
+        for name, head in zip(self.LIST_FIELDS, heads):
+            state[name] = head
+        heads = iter(heads[len(self.LIST_FIELDS):])
+        packed = []
+        for snapshot in snapshots:
+            snapshot = list(snapshot)
+            for i in self.SNAPSHOT_LISTS:
+                snapshot[i] = next(heads)
+            packed.append(tuple(snapshot))
+        state["_undo"], state["_redo"] = history_heads
+        state["_packed"] = (items, rests, packed, history_rests)
+        return state
+
+    def __setstate__(self, state):
+        """
+        rebuilds the lists of a pickled game, the snapshots share their nodes again
+        """
+        state = dict(state)
+        items, rests, packed, history_rests = state.pop("_packed")
+        heads = [state[name] for name in self.LIST_FIELDS]
+        for snapshot in packed:
+            heads += [snapshot[i] for i in self.SNAPSHOT_LISTS]
+        lists = unpack_lists(items, rests, heads)
+
+        for name, plist in zip(self.LIST_FIELDS, lists):
+            state[name] = plist
+        lists = iter(lists[len(self.LIST_FIELDS):])
+        snapshots = []
+        for snapshot in packed:
+            snapshot = list(snapshot)
+            for i in self.SNAPSHOT_LISTS:
+                snapshot[i] = next(lists)
+            snapshots.append(tuple(snapshot))
+        state["_undo"], state["_redo"] = unpack_lists(snapshots, history_rests, [state["_undo"], state["_redo"]])
+        self.__dict__.update(state)
 
     def print_board(self):
         """
@@ -175,10 +452,12 @@ class Ray:
     """
     Represents a ray with origin, direction, and exit. Ray object would provide ray information for the BlackBoxGame and Board class to use.
     """
-    def __init__(self, row, col):
+    def __init__(self, row, col, size=10):
         """
         takes in row and col as parameters and initializes the origin and direction of the ray
+        :param size: default parameter, number of squares on each side of the board the ray is shot on
         """
+        self._size = size
         self._row = row
         self._col = col
         self._pos = (row, col)
@@ -193,11 +472,11 @@ class Ray:
         """
         if self._row == 0:
             direction = "move down"
-        elif self._row == 9:
+        elif self._row == self._size - 1:
             direction = "move up"
         elif self._col == 0:
             direction = "move right"
-        elif self._col == 9:
+        elif self._col == self._size - 1:
             direction = "move left"
         else:
             direction = None
@@ -210,7 +489,8 @@ class Ray:
         determines if ray origin is non-border, no parameter
         :return: True if ray origin is not on the border, otherwise return False
         """
-        if self._row not in [0, 9] and self._col not in [0, 9]:
+        last = self._size - 1
+        if self._row not in [0, last] and self._col not in [0, last]:
             return True
 
         return False
@@ -220,7 +500,8 @@ class Ray:
         takes no parameter and determines if ray origin is corner of board
         :return: True if ray origin is on corner, otherwise return False
         """
-        if self._pos in [(0, 0), (0, 9), (9, 0), (9, 9)]:
+        last = self._size - 1
+        if self._pos in [(0, 0), (0, last), (last, 0), (last, last)]:
             return True
 
         return False
@@ -274,27 +555,26 @@ class Board:
     """
     Represents the board, initializes the board with atoms positions. This class will get information from the Ray class and use it in methods that let the BlackBoxGame class know where the exit is. There is a method to update the direction of the ray if it cannot keep moving in the original direction and a method that updates the exit of the ray if the ray has reached a border.
     """
-    def __init__(self, pos_list):
+    def __init__(self, pos_list, size=10):
         """
         initializes the board with atoms positions
         :param pos_list: list of tuples that represents atoms positions
+        :param size: default parameter, number of squares on each side of the board, border included
         """
         self._atoms_pos = pos_list
+        self._size = size
+        self._exits = None  # ray origin -> exit of every ray traced so far, each ray is traced the first time it is needed
+        self._paths = None  # ray origin -> mask of the squares the ray checked for atoms, bit row * size + col, recorded once atoms are changed
 
     def get_board(self):
         """
         takes no parameters and return a list of lists that represents the current board
         """
-        board = [['0', '1', '2', '3', '4', '5', '6', '7', '8', '9'],
-                 ['1', " ", " ", " ", " ", " ", " ", " ", " ", 'b'],
-                 ['2', " ", " ", " ", " ", " ", " ", " ", " ", 'b'],
-                 ['3', " ", " ", " ", " ", " ", " ", " ", " ", 'b'],
-                 ['4', " ", " ", " ", " ", " ", " ", " ", " ", 'b'],
-                 ['5', " ", " ", " ", " ", " ", " ", " ", " ", 'b'],
-                 ['6', " ", " ", " ", " ", " ", " ", " ", " ", 'b'],
-                 ['7', " ", " ", " ", " ", " ", " ", " ", " ", 'b'],
-                 ['8', " ", " ", " ", " ", " ", " ", " ", " ", 'b'],
-                 ['9', "b", "b", "b", "b", "b", "b", "b", "b", 'b']]
+        size = self._size
+        board = [[str(col) for col in range(size)]]
+        for row in range(1, size - 1):
+            board.append([str(row)] + [" "] * (size - 2) + ['b'])
+        board.append([str(size - 1)] + ["b"] * (size - 1))
         for pos in self._atoms_pos:
             board[pos[0]][pos[1]] = "x"
 
@@ -306,6 +586,170 @@ class Board:
         """
         return self._atoms_pos
 
+    def get_size(self):
+        """
+        takes no parameters and returns the number of squares on each side of the board, border included
+        """
+        return self._size
+
+    def get_border_index(self, pos):
+        """
+        takes a legal ray origin and returns its position in the list of get_border_entries, without building the list
+        """
+        if pos[0] == 0:
+            return 4 * (pos[1] - 1)
+        if pos[0] == self._size - 1:
+            return 4 * (pos[1] - 1) + 1
+        if pos[1] == 0:
+            return 4 * (pos[0] - 1) + 2
+        return 4 * (pos[0] - 1) + 3
+
+    def get_border_entries(self):
+        """
+        takes no parameters and returns a list of tuples that represents every legal ray origin on the border
+        """
+        last = self._size - 1
+        entries = []
+        for i in range(1, last):
+            entries += [(0, i), (last, i), (i, 0), (i, last)]
+
+        return entries
+
+    def is_border_entry(self, pos):
+        """
+        checks if position is a legal ray origin: on the border but not a corner
+        :param pos: tuple that represents position on board
+        :return: True if a ray can be shot from pos, otherwise return False
+        """
+        last = self._size - 1
+        if pos[0] not in range(0, self._size) or pos[1] not in range(0, self._size):
+            return False
+
+        return (pos[0] in (0, last)) != (pos[1] in (0, last))
+
+    def get_exits(self):
+        """
+        traces the rays of every legal origin that were not traced yet, so later lookups do not walk the board again. This walks the whole border, get_exit only traces the ray it is asked for.
+        :return: a dictionary that maps each ray origin to its exit, the exit is None if the ray hits an atom
+        """
+        entries = self.get_border_entries()
+        if self._exits is None or len(self._exits) < len(entries):
+            self._exits = {entry: self.get_exit(entry) for entry in entries}  # in the order of get_border_entries
+
+        return self._exits
+
+    def get_exit(self, entry):
+        """
+        traces a single ray the first time it is asked for and remembers its exit
+        :param entry: tuple that represents a legal ray origin
+        :return: exit of the ray, None if the ray hits an atom
+        """
+        if self._exits is None:
+            self._exits = {}
+        if entry not in self._exits:
+            if self._paths is not None:
+                self.trace_path(entry)
+            else:
+                ray = Ray(entry[0], entry[1], self._size)
+                self.find_exit(ray)
+                self._exits[entry] = ray.get_exit()
+
+        return self._exits[entry]
+
+    def record_paths(self):
+        """
+        traces the rays traced so far again and records the squares each one checked for atoms, so that changing an atom only retraces the rays that came near it. Rays traced later record their path too.
+        """
+        entries = list(self._exits or ())
+        self._exits = {}
+        self._paths = {}
+        for entry in entries:
+            self.trace_path(entry)
+
+    def trace_path(self, entry):
+        """
+        traces one ray, recording the squares it checks as a mask
+        :return: the new exit of the ray
+        """
+        ray = Ray(entry[0], entry[1], self._size)
+        path = []
+        self.find_exit(ray, path)
+        mask = 0
+        for square in path:
+            mask |= 1 << square
+        self._paths[entry] = mask
+        self._exits[entry] = ray.get_exit()
+        return ray.get_exit()
+
+    def set_atom(self, pos, present):
+        """
+        puts an atom on a square or takes it off, without updating the exits. Subclasses that index the atoms update their index too.
+        """
+        self._atoms_pos = list(self._atoms_pos)  # the list passed in belongs to the caller
+        if present:
+            self._atoms_pos.append(pos)
+        else:
+            self._atoms_pos.remove(pos)
+
+    def update_atoms(self, removed, added):
+        """
+        removes and adds atoms, then retraces the rays whose recorded path went through the 3x3 square around a changed square, a ray that never checked those squares cannot have changed. Rays that were never traced are traced with the new atoms when they are first needed.
+        :param removed: list of the positions of atoms to remove
+        :param added: list of the positions of atoms to add
+        :return: list of the ray origins traced so far whose exit changed
+        """
+        for pos in removed:
+            if pos not in self._atoms_pos:
+                raise ValueError("there is no atom at %s" % (pos,))
+        for pos in added:
+            if not self.is_in_bound(pos) or (pos in self._atoms_pos and pos not in removed):
+                raise ValueError("an atom cannot be added at %s" % (pos,))
+
+        for pos in removed:
+            self.set_atom(pos, False)
+        for pos in added:
+            self.set_atom(pos, True)
+
+        if not self._exits:
+            return []  # nothing was traced yet, get_exit traces with the new atoms
+        if self._paths is None:
+            old_exits = self._exits
+            self.record_paths()
+            return [entry for entry in old_exits if old_exits[entry] != self._exits[entry]]
+
+        region = 0
+        for row, col in removed + added:
+            for d_row in (-1, 0, 1):
+                for d_col in (-1, 0, 1):
+                    region |= 1 << ((row + d_row) * self._size + col + d_col)
+
+        changed = []
+        for entry, path in list(self._paths.items()):
+            if path & region:
+                old_exit = self._exits[entry]
+                if self.trace_path(entry) != old_exit:
+                    changed.append(entry)
+
+        return changed
+
+    def add_atom(self, pos):
+        """
+        :return: list of the ray origins whose exit changed
+        """
+        return self.update_atoms([], [pos])
+
+    def remove_atom(self, pos):
+        """
+        :return: list of the ray origins whose exit changed
+        """
+        return self.update_atoms([pos], [])
+
+    def move_atom(self, old_pos, new_pos):
+        """
+        :return: list of the ray origins whose exit changed
+        """
+        return self.update_atoms([old_pos], [new_pos])
+
     def get_neighbor_pos(self, pos):
         """
         gets neighbors of a position
@@ -366,7 +810,7 @@ class Board:
         :param pos: tuple that represents position on board
         :return: True if position is on board and non-border, False if not
         """
-        if pos[0] in range(1, 9) and pos[1] in range(1, 9):
+        if pos[0] in range(1, self._size - 1) and pos[1] in range(1, self._size - 1):
             return True
 
         return False
@@ -395,17 +839,23 @@ class Board:
             elif neighbors["bottom"] in self._atoms_pos:
                 ray.set_dir("move up")
 
-    def find_exit(self, ray):
+    def find_exit(self, ray, path=None):
         """
         finds exit of ray and update the ray's exit, does not return anything
         :param ray: Ray object
+        :param path: default parameter, list the number (row * size + col) of every square the ray checks for atoms around is appended to
         """
         next_pos = self.get_next_pos(ray)
         counter = 0
 
         # while loop keeps running unless the next pos is on the border or ray hits atom or there's double deflection
         while self.is_in_bound(next_pos):
+            if path is not None:
+                path.append(next_pos[0] * self._size + next_pos[1])
             counter += 1
+            if counter > 4 * self._size * self._size:  # more steps than there are positions and directions, the ray is trapped between atoms
+                ray.set_exit(None)  # a trapped ray never leaves the board, so it is treated like a hit
+                return
             if self.can_move(ray):
                 ray.set_pos(next_pos[0], next_pos[1])  # updates cur pos of ray to next pos
                 if ray.get_pos() in self._atoms_pos:  # if ray hits atom, function returns, exit updated to None
@@ -425,6 +875,306 @@ class Board:
 
         ray.set_exit(next_pos)
 
+class BitBoard(Board):
+    """
+    Represents the board with the atoms stored as the bits of one integer, square (row, col) is bit row * size + col. The masks of the two squares beside every square are built once for each board size, so checking for a hit, a deflection or a double deflection is a single AND instead of looking tuples up in the atoms list. It can be used anywhere a Board is used. The masks take about size ** 3 bits, so it is meant for standard sized boards, SparseBoard is meant for large ones.
+    """
+    _geometry = {}  # board size -> tables shared by every BitBoard of that size
+
+    def __init__(self, pos_list, size=10):
+        """
+        initializes the board with atoms positions and sets their bits in the atoms mask
+        :param pos_list: list of tuples that represents atoms positions
+        :param size: default parameter, number of squares on each side of the board, border included
+        """
+        super().__init__(pos_list, size)
+        if size not in self._geometry:
+            self._geometry[size] = self.build_geometry(size)
+        self._steps, self._directions, self._turns, self._interior, self._side_masks = self._geometry[size]
+        self._atoms_mask = 0
+        for pos in pos_list:
+            self._atoms_mask |= 1 << (pos[0] * size + pos[1])
+
+    @staticmethod
+    def build_geometry(size):
+        """
+        builds the tables used to move a ray on a board of the given size
+        :param size: number of squares on each side of the board, border included
+        :return: a tuple of the step of each direction, the direction of each step, the step taken when turning away from the lower side, whether each square is non-border, and for each step the mask of the two squares beside every square (left/right when moving vertically, top/bottom when moving horizontally)
+        """
+        steps = {"move down": size, "move up": -size, "move right": 1, "move left": -1}
+        directions = {size: "move down", -size: "move up", 1: "move right", -1: "move left"}
+        turns = {size: 1, -size: 1, 1: size, -1: size}
+        interior = tuple(0 < square // size < size - 1 and 0 < square % size < size - 1 for square in range(size * size))
+        side_masks = {}
+        for step in directions:
+            side = turns[step]
+            side_masks[step] = tuple(1 << (square - side) | 1 << (square + side) if interior[square] else 0
+                                     for square in range(size * size))
+
+        return steps, directions, turns, interior, side_masks
+
+    def __getstate__(self):
+        """
+        leaves the tables shared by every board of the same size out when the board is pickled
+        """
+        state = self.__dict__.copy()
+        for name in ("_steps", "_directions", "_turns", "_interior", "_side_masks"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        """
+        restores a pickled board and looks the shared tables up again
+        """
+        self.__dict__.update(state)
+        if self._size not in self._geometry:
+            self._geometry[self._size] = self.build_geometry(self._size)
+        self._steps, self._directions, self._turns, self._interior, self._side_masks = self._geometry[self._size]
+
+    def get_atoms_mask(self):
+        """
+        takes no parameters and returns the integer whose bits are the atoms positions
+        """
+        return self._atoms_mask
+
+    def set_atom(self, pos, present):
+        super().set_atom(pos, present)
+        bit = 1 << (pos[0] * self._size + pos[1])
+        if present:
+            self._atoms_mask |= bit
+        else:
+            self._atoms_mask &= ~bit
+
+    def can_move(self, ray):
+        """
+        checks if the ray can move to the next square on the board
+        :param ray: Ray object
+        :return: True if ray can move, otherwise, return False
+        """
+        row, col = ray.get_pos()
+        step = self._steps[ray.get_dir()]
+        next_square = row * self._size + col + step
+        return self._interior[next_square] and not self._side_masks[step][next_square] & self._atoms_mask
+
+    def update_direction(self, ray):
+        """
+        updates direction of ray and does not return anything
+        :param ray: Ray object
+        """
+        row, col = ray.get_pos()
+        step = self._steps[ray.get_dir()]
+        next_square = row * self._size + col + step
+        side = self._side_masks[step][next_square]
+        blocked = side & self._atoms_mask
+        if not blocked:
+            return
+
+        if blocked == side:
+            ray.set_dir(None)  # this represents a double deflection since there are neighbors on both sides
+            return
+
+        # the ray turns away from the atom: the left or top neighbor is the lower bit of the side mask
+        turn = self._turns[step]
+        if blocked >> (next_square - turn) & 1:
+            ray.set_dir(self._directions[turn])
+        else:
+            ray.set_dir(self._directions[-turn])
+
+    def find_exit(self, ray, path=None):
+        """
+        finds exit of ray and update the ray's exit, does not return anything. Same rules as Board.find_exit, but the ray position and direction are kept as integers while it moves
+        :param ray: Ray object
+        :param path: default parameter, list the number (row * size + col) of every square the ray checks for atoms around is appended to
+        """
+        size = self._size
+        atoms = self._atoms_mask
+        interior = self._interior
+        side_masks = self._side_masks
+        turns = self._turns
+        limit = 4 * size * size  # same limit as Board.find_exit for a ray trapped between atoms
+        row, col = ray.get_pos()
+        square = row * size + col
+        step = self._steps[ray.get_dir()]
+        next_square = square + step
+        counter = 0
+
+        while interior[next_square]:
+            if path is not None:
+                path.append(next_square)
+            counter += 1
+            if counter > limit:
+                ray.set_exit(None)
+                return
+
+            side = side_masks[step][next_square]
+            blocked = side & atoms
+            if not blocked:
+                square = next_square
+                if atoms >> square & 1:  # ray hits atom
+                    ray.set_pos(square // size, square % size)
+                    ray.set_exit(None)
+                    return
+            elif blocked == side:  # double deflection means exit is the same as entry
+                ray.set_pos(square // size, square % size)
+                ray.set_dir(None)
+                ray.set_exit(ray.get_entry())
+                return
+            else:
+                turn = turns[step]
+                step = turn if blocked >> (next_square - turn) & 1 else -turn
+            next_square = square + step
+
+        ray.set_pos(square // size, square % size)
+        ray.set_dir(self._directions[step])
+
+        # if while loop was ran only once, then the ray was reflected
+        if counter == 1:
+            ray.set_exit(ray.get_entry())
+            return
+
+        ray.set_exit((next_square // size, next_square % size))
+
+
+class SparseBoard(Board):
+    """
+    Represents a board for large grids with few atoms. The atoms are indexed by row and by column in sorted lists, so instead of stepping square by square the ray jumps straight to the next square where something can happen: the first atom on its own line (a hit), the first atom on one of the two lines beside it (a deflection) or the border. It follows the same rules as Board.find_exit and can be used anywhere a Board is used.
+    """
+    _moves = {"move down": (1, 0), "move up": (-1, 0), "move right": (0, 1), "move left": (0, -1)}
+    _directions = {(1, 0): "move down", (-1, 0): "move up", (0, 1): "move right", (0, -1): "move left"}
+
+    def __init__(self, pos_list, size=10):
+        """
+        initializes the board with atoms positions and indexes them by row and by column
+        :param pos_list: list of tuples that represents atoms positions
+        :param size: default parameter, number of squares on each side of the board, border included
+        """
+        super().__init__(pos_list, size)
+        self._rows = {}  # row -> sorted columns of the atoms on that row
+        self._cols = {}  # column -> sorted rows of the atoms on that column
+        for row, col in pos_list:
+            self._rows.setdefault(row, []).append(col)
+            self._cols.setdefault(col, []).append(row)
+        for line in self._rows.values():
+            line.sort()
+        for line in self._cols.values():
+            line.sort()
+
+    def set_atom(self, pos, present):
+        super().set_atom(pos, present)
+        row, col = pos
+        if present:
+            bisect.insort(self._rows.setdefault(row, []), col)
+            bisect.insort(self._cols.setdefault(col, []), row)
+        else:
+            self._rows[row].remove(col)
+            self._cols[col].remove(row)
+
+    def get_next_atom(self, line, pos, step):
+        """
+        finds the closest atom on a line strictly ahead of a position
+        :param line: sorted list of the atoms coordinates on a row or column, or None if there are none
+        :param pos: coordinate of the ray along that line
+        :param step: 1 if the ray moves toward larger coordinates, -1 otherwise
+        :return: the distance to that atom, or None if there is no atom ahead
+        """
+        if not line:
+            return None
+
+        if step == 1:
+            i = bisect.bisect_right(line, pos)
+            if i == len(line):
+                return None
+            return line[i] - pos
+
+        i = bisect.bisect_left(line, pos)
+        if i == 0:
+            return None
+        return pos - line[i - 1]
+
+    def find_exit(self, ray, path=None):
+        """
+        finds exit of ray and update the ray's exit, does not return anything
+        :param ray: Ray object
+        :param path: default parameter, list the number (row * size + col) of every square the ray checks for atoms around is appended to, the squares a jump skips included
+        """
+        last = self._size - 1
+        limit = 4 * self._size * self._size  # same limit as Board.find_exit for a ray trapped between atoms
+        row, col = ray.get_pos()
+        d_row, d_col = self._moves[ray.get_dir()]
+        counter = 0
+
+        while True:
+            # the ray moves along a line (its row or column) and pos is its coordinate on that line
+            if d_row == 0:
+                lines, line, pos, step = self._rows, row, col, d_col
+            else:
+                lines, line, pos, step = self._cols, col, row, d_row
+
+            if not (0 < line < last and 0 < pos + step < last):
+                break  # the next square is on the border
+
+            hit = self.get_next_atom(lines.get(line), pos, step)
+            low = self.get_next_atom(lines.get(line - 1), pos, step)  # atoms on the left or top line
+            high = self.get_next_atom(lines.get(line + 1), pos, step)  # atoms on the right or bottom line
+            wall = (last - pos) if step == 1 else pos
+
+            deflect = None
+            if low is not None or high is not None:
+                deflect = min(distance for distance in (low, high) if distance is not None)
+
+            # every square the ray moves into counts as one loop of Board.find_exit, a deflection counts as one more
+            if deflect is not None and (hit is None or deflect <= hit):
+                steps = deflect
+            elif hit is not None:
+                steps = hit
+            else:
+                steps = wall - 1
+
+            if path is not None:
+                # the squares pos + step up to pos + steps * step, which are all checked by Board.find_exit
+                if d_row == 0:
+                    path.extend(range(line * self._size + pos + step, line * self._size + pos + step * (steps + 1), step))
+                else:
+                    path.extend(range((pos + step) * self._size + line, (pos + step * (steps + 1)) * self._size + line,
+                                      step * self._size))
+
+            if counter + steps > limit:
+                ray.set_exit(None)  # same as Board.find_exit for a ray trapped between atoms
+                return
+            counter += steps
+
+            if deflect is not None and (hit is None or deflect <= hit):
+                pos += (deflect - 1) * step
+                row, col = (line, pos) if d_row == 0 else (pos, line)
+                ray.set_pos(row, col)
+                if low == deflect and high == deflect:
+                    ray.set_dir(None)  # double deflection means exit is the same as entry
+                    ray.set_exit(ray.get_entry())
+                    return
+                # the ray turns away from the atom, toward the higher line if the atom is on the lower one
+                turn = 1 if low == deflect else -1
+                d_row, d_col = (turn, 0) if d_row == 0 else (0, turn)
+            elif hit is not None:
+                pos += hit * step
+                row, col = (line, pos) if d_row == 0 else (pos, line)
+                ray.set_pos(row, col)
+                ray.set_exit(None)  # ray hits atom
+                return
+            else:
+                pos += (wall - 1) * step
+                row, col = (line, pos) if d_row == 0 else (pos, line)
+
+        ray.set_pos(row, col)
+        ray.set_dir(self._directions[(d_row, d_col)])
+
+        # if the ray only moved or turned once, then it was reflected
+        if counter == 1:
+            ray.set_exit(ray.get_entry())
+            return
+
+        ray.set_exit((row + d_row, col + d_col))
+
 # game = BlackBoxGame([(5, 5), (1, 6), (4, 5), (6, 2), (1, 1)])
 # game.print_board()
 # print("first move")
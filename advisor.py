@@ -0,0 +1,174 @@
+# Description: recommends the next ray to shoot in a BlackBoxGame, within a time budget
+
+import math
+import random
+import time
+
+import BlackBox
+import solver
+
+
+class Advisor:
+    """
+    Recommends the ray whose outcome best splits the atom layouts that are still possible, minus the points it is expected to cost. The possible layouts are estimated with a sample of distinct layouts that explain every ray shot so far, found by trying random layouts and layouts one atom away from the ones already found. The sample is kept between moves and only checked against the new rays, so late in the game it gets close to the exact set of possible layouts. The search is anytime: it can be stopped at any point and still gives the best move found so far.
+    """
+    def __init__(self, game, cost_weight=0.5, max_samples=2000, seed=None):
+        """
+        :param game: BlackBoxGame object to advise on
+        :param cost_weight: default parameter, bits of information that one point of score is worth
+        :param max_samples: default parameter, number of sampled layouts after which the estimate is considered good enough
+        :param seed: default parameter, seed of the random layouts
+        """
+        self._game = game
+        self._size = game.get_board().get_size()
+        self._atom_count = len(game.get_atoms())
+        self._entries = game.get_board().get_border_entries()
+        self._cost_weight = cost_weight
+        self._max_samples = max_samples
+        self._rng = random.Random(seed)
+        self._shots = []  # observations in the order the rays were shot
+        self._observations = []  # the same observations, most restrictive first
+        self._candidates = solver.get_candidate_squares([], self._size)
+        self._samples = {}  # sorted tuple of atoms -> exit table, for each layout found that explains every observation
+        self._counts = {entry: {} for entry in self._entries}  # entry -> exit -> number of samples
+
+    def get_samples(self):
+        return self._samples
+
+    def update(self):
+        """
+        reads the rays shot since the last call and drops the samples that do not explain them. Rays taken back (by undo) start the sample over.
+        """
+        observations = solver.get_observations(self._game)
+        if observations[:len(self._shots)] != self._shots:
+            self._shots = []
+            self._observations = []
+            self._candidates = solver.get_candidate_squares([], self._size)
+            self._samples = {}
+            self._counts = {entry: {} for entry in self._entries}
+
+        new = observations[len(self._shots):]
+        if not new:
+            return
+
+        self._shots = observations
+
+        self._candidates = solver.get_candidate_squares(observations, self._size)
+        self._observations = solver.order_observations(observations, self._candidates, self._atom_count,
+                                                       self._size, samples=32)
+        for layout, exits in list(self._samples.items()):
+            if not all(exits[entry] == exit for entry, exit in new):
+                del self._samples[layout]
+                self.count(exits, -1)
+
+    def count(self, exits, amount):
+        """
+        adds a sample's outcomes to the counts of every entry, or removes them if amount is -1
+        """
+        for entry in self._entries:
+            outcomes = self._counts[entry]
+            outcomes[exits[entry]] = outcomes.get(exits[entry], 0) + amount
+
+    def draw_sample(self):
+        """
+        tries a random layout, or half of the time a layout found before with one atom moved, and keeps it if it is new and explains every observation
+        :return: True if the layout was kept, otherwise False
+        """
+        if len(self._candidates) < self._atom_count:
+            return False
+
+        if self._samples and self._rng.random() < 0.5:
+            layout = list(self._rng.choice(list(self._samples)))
+            square = self._rng.choice(self._candidates)
+            if square in layout:
+                return False
+            layout[self._rng.randrange(len(layout))] = square
+        else:
+            layout = self._rng.sample(self._candidates, self._atom_count)
+
+        key = tuple(sorted(layout))
+        if key in self._samples:
+            return False
+
+        board = BlackBox.BitBoard(layout, self._size)
+        for entry, exit in self._observations:
+            if board.get_exit(entry) != exit:
+                return False
+
+        exits = board.get_exits()
+        self._samples[key] = exits
+        self.count(exits, 1)
+        return True
+
+    def get_moves(self):
+        """
+        takes no parameters and returns the legal ray origins that have not been shot yet
+        """
+        shot = set(entry for entry, exit in self._observations)
+        return [entry for entry in self._entries if entry not in shot]
+
+    def rate(self, entry):
+        """
+        rates a ray origin by the information its outcome is expected to give, in bits, minus the weighted points it is expected to cost
+        """
+        used = self._game.get_entries_exits() or []
+        outcomes = self._counts[entry]
+        total = sum(outcomes.values())
+        cost = 0 if entry in used else 1
+        if total == 0:
+            return -self._cost_weight * cost
+
+        gain = 0.0
+        for exit, number in outcomes.items():
+            if number == 0:
+                continue
+            p = number / total
+            gain -= p * math.log2(p)
+            if exit is not None and exit != entry and exit not in used:
+                cost += p
+
+        return gain - self._cost_weight * cost
+
+    def get_best_move(self):
+        """
+        takes no parameters and returns the best rated ray origin with the current sample, None if every origin has been shot
+        """
+        moves = self.get_moves()
+        if not moves:
+            return None
+
+        return max(moves, key=self.rate)
+
+    def iter_moves(self, batch=16):
+        """
+        keeps drawing samples and yields the best move after every batch of draws, stops once the sample is large enough
+        :param batch: default parameter, number of layouts drawn between two answers
+        """
+        self.update()
+        yield self.get_best_move()
+        while len(self._samples) < self._max_samples and len(self._candidates) >= self._atom_count:
+            for _ in range(batch):
+                self.draw_sample()
+            yield self.get_best_move()
+
+    def recommend(self, budget=0.04):
+        """
+        refines the recommendation until the time budget runs out
+        :param budget: default parameter, wall-clock time in seconds
+        :return: tuple (row, col) of the ray origin to shoot next, None if every origin has been shot
+        """
+        deadline = time.perf_counter() + budget
+        best = None
+        for best in self.iter_moves():
+            if time.perf_counter() >= deadline:
+                break
+
+        return best
+
+
+def recommend(game, budget=0.04, seed=None):
+    """
+    recommends the next ray for a BlackBoxGame without keeping an Advisor between moves
+    :return: tuple (row, col) of the ray origin to shoot next, None if every origin has been shot
+    """
+    return Advisor(game, seed=seed).recommend(budget)
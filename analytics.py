@@ -0,0 +1,360 @@
+# Description: streaming reports over JSON-lines exports of finished games, in constant memory
+#
+#   python analytics.py games.jsonl --processes 4 --output report.json
+#
+# Each line of an export is one finished game, as written by get_record:
+#   {"size": 10, "atoms": [[2, 3], ...], "rays": [[[0, 4], [9, 4]], [[5, 0], null], ...], "guesses": [[2, 3], ...], "score": 87}
+# rays are (entry, exit) in the order they were shot, exit is null for a hit, like the results of the server.
+# Every game is played again with BlackBoxGame: a ray whose exit differs from the recorded one, or a final score
+# that differs, is counted as a mismatch, and only the games whose rays and score all replay as recorded are added
+# to the statistics. Border squares are counted separately for each board size. Lines that are not a game of 3 to MAX_SIZE squares a side, with distinct non-border atoms and guesses
+# on the board, are counted as invalid. A plain file is cut into byte ranges on line boundaries that the
+# workers read themselves, other inputs (.gz files, - for stdin) are read here and sent to the workers in chunks.
+# Only the report is kept, never the games, so memory does not grow with the input.
+
+import argparse
+import gzip
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+import BlackBox
+
+MAX_ERRORS = 20  # error messages kept in a report, the others are only counted
+MAX_SIZE = 1000  # largest board size played again, as for the games of server.py
+
+
+def get_record(game):
+    """
+    takes a BlackBoxGame and returns its line of an export as a dictionary
+    """
+    return {
+        "size": game.get_board().get_size(),
+        "atoms": [list(pos) for pos in game.get_atoms()],
+        "rays": [[list(entry), list(exit) if exit is not None else None] for entry, exit in game.get_rays() or []],
+        "guesses": [list(pos) for pos in game.get_guesses() or []],
+        "score": game.get_score(),
+    }
+
+
+class Report:
+    """
+    Represents the statistics of any number of games, in memory that only depends on the board sizes: score and ray count histograms, outcomes of the rays shot from each border square of each board size, and the exits of the first ray of each game by board size and entry. Reports of separate parts of an export can be merged in any order.
+    """
+    def __init__(self):
+        self._games = 0
+        self._wins = 0
+        self._bytes = 0
+        self._invalid = 0  # lines that are not a game
+        self._mismatched = 0  # games with a ray or a score that did not replay as recorded
+        self._ray_mismatches = 0
+        self._score_mismatches = 0
+        self._errors = []
+        self._scores = {}  # score -> games
+        self._ray_counts = {}  # rays shot -> games
+        self._cells = {}  # (board size, row, col) of an entry -> [rays, hits, reflects]
+        self._openings = {}  # (board size, row, col) of the entry of the first ray -> {exit: games}
+
+    def add_bytes(self, count):
+        self._bytes += count
+
+    def add_error(self, message):
+        if len(self._errors) < MAX_ERRORS:
+            self._errors.append(message)
+
+    def add_invalid(self, message):
+        self._invalid += 1
+        self.add_error(message)
+
+    def add_game(self, record, where="game"):
+        """
+        plays a recorded game again and adds it to the report
+        :param record: dictionary read from one line
+        :param where: default parameter, position of the game in the input, used in the error messages
+        """
+        try:
+            size = int(record.get("size", 10))
+            atoms = [(int(pos[0]), int(pos[1])) for pos in record["atoms"]]
+            rays = [((int(entry[0]), int(entry[1])), None if exit is None else (int(exit[0]), int(exit[1])))
+                    for entry, exit in record["rays"]]
+            guesses = [(int(pos[0]), int(pos[1])) for pos in record.get("guesses") or []]
+            score = int(record["score"])
+        except (KeyError, TypeError, ValueError, IndexError, OverflowError) as error:
+            self.add_invalid("%s: not a game (%r)" % (where, error))
+            return
+
+        # checked before the game is built: the boards fail on atoms off the board, and a huge board stalls the worker
+        if not 3 <= size <= MAX_SIZE:
+            self.add_invalid("%s: board size %d is not from 3 to %d" % (where, size, MAX_SIZE))
+            return
+        last = size - 1
+        if not all(0 < row < last and 0 < col < last for row, col in atoms) or len(set(atoms)) != len(atoms):
+            self.add_invalid("%s: atoms must be distinct non-border squares" % where)
+            return
+        if not all(0 <= row <= last and 0 <= col <= last for row, col in guesses):
+            self.add_invalid("%s: guesses must be on the board" % where)
+            return
+
+        board_class = BlackBox.BitBoard if size <= 16 else BlackBox.SparseBoard
+        game = BlackBox.BlackBoxGame(atoms, board_class, size)
+        clean = True
+        for entry, exit in rays:
+            result = game.shoot_ray(entry[0], entry[1])
+            if result is False or result[1] != exit:
+                clean = False
+                self._ray_mismatches += 1
+                self.add_error("%s: ray from %s recorded with exit %s, replays as %s"
+                               % (where, entry, exit, "not a ray origin" if result is False else result[1]))
+        for pos in guesses:
+            game.guess_atom(pos[0], pos[1])
+        if game.get_score() != score:
+            clean = False
+            self._score_mismatches += 1
+            self.add_error("%s: score %d recorded, replays as %d" % (where, score, game.get_score()))
+
+        # only games that replay as recorded are added to the statistics
+        if not clean:
+            self._mismatched += 1
+            return
+        self._games += 1
+        if game.get_status() == "You won! Play again!":
+            self._wins += 1
+        self._scores[score] = self._scores.get(score, 0) + 1
+        self._ray_counts[len(rays)] = self._ray_counts.get(len(rays), 0) + 1
+        for entry, exit in rays:
+            cell = self._cells.setdefault((size,) + entry, [0, 0, 0])
+            cell[0] += 1
+            if exit is None:
+                cell[1] += 1
+            elif exit == entry:
+                cell[2] += 1
+        if rays:
+            outcomes = self._openings.setdefault((size,) + rays[0][0], {})
+            outcomes[rays[0][1]] = outcomes.get(rays[0][1], 0) + 1
+
+    def merge(self, other):
+        """
+        adds the games of another Report to this one
+        """
+        self._games += other._games
+        self._wins += other._wins
+        self._bytes += other._bytes
+        self._invalid += other._invalid
+        self._mismatched += other._mismatched
+        self._ray_mismatches += other._ray_mismatches
+        self._score_mismatches += other._score_mismatches
+        for message in other._errors:
+            self.add_error(message)
+        for score, count in other._scores.items():
+            self._scores[score] = self._scores.get(score, 0) + count
+        for rays, count in other._ray_counts.items():
+            self._ray_counts[rays] = self._ray_counts.get(rays, 0) + count
+        for entry, counts in other._cells.items():
+            cell = self._cells.setdefault(entry, [0, 0, 0])
+            for i in range(3):
+                cell[i] += counts[i]
+        for entry, outcomes in other._openings.items():
+            mine = self._openings.setdefault(entry, {})
+            for exit, count in outcomes.items():
+                mine[exit] = mine.get(exit, 0) + count
+
+    def get_games(self):
+        return self._games
+
+    def get_bytes(self):
+        return self._bytes
+
+    def get_openings(self, top=10):
+        """
+        rates the first rays of the games by the information their outcome gave, the entropy in bits of their exits
+        :param top: default parameter, number of entries returned
+        :return: list of dictionaries, most informative first
+        """
+        rated = []
+        for (size, row, col), outcomes in self._openings.items():
+            total = sum(outcomes.values())
+            bits = -sum(count / total * math.log2(count / total) for count in outcomes.values())
+            rated.append({"size": size, "entry": [row, col], "games": total, "bits": round(bits, 4)})
+        rated.sort(key=lambda opening: (-opening["bits"], -opening["games"], opening["size"], opening["entry"]))
+        return rated[:top]
+
+    def get_report(self):
+        """
+        takes no parameters and returns the statistics as a dictionary that can be written as JSON
+        """
+        return {
+            "games": self._games,
+            "wins": self._wins,
+            "bytes": self._bytes,
+            "invalid_lines": self._invalid,
+            "mismatched_games": self._mismatched,
+            "ray_mismatches": self._ray_mismatches,
+            "score_mismatches": self._score_mismatches,
+            "errors": self._errors,
+            "scores": {str(score): self._scores[score] for score in sorted(self._scores)},
+            "rays_per_game": {str(rays): self._ray_counts[rays] for rays in sorted(self._ray_counts)},
+            "cells": {"%d:%d,%d" % cell: {"rays": rays, "hit_rate": round(hits / rays, 4),
+                                        "reflect_rate": round(reflects / rays, 4)}
+                      for cell, (rays, hits, reflects) in sorted(self._cells.items())},
+            "openings": self.get_openings(),
+        }
+
+
+def analyze_lines(lines, first_line=None, offset=None):
+    """
+    reads the games of a list of lines
+    :param lines: list of bytes, one game each, blank lines are skipped
+    :param first_line: default parameter, number of the first line in the input, used in the error messages when the lines were read in order
+    :param offset: default parameter, position in bytes of the first line in the input, used in the error messages otherwise
+    :return: Report of the lines
+    """
+    report = Report()
+    for i, line in enumerate(lines):
+        if first_line is not None:
+            where = "line %d" % (first_line + i)
+        elif offset is not None:
+            where = "byte %d" % (offset + report.get_bytes())
+        else:
+            where = "line"
+        report.add_bytes(len(line))
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            report.add_invalid("%s: not JSON (%s)" % (where, error))
+            continue
+        if not isinstance(record, dict):
+            report.add_invalid("%s: not an object" % where)
+            continue
+        report.add_game(record, where)
+
+    return report
+
+
+def analyze_task(task):
+    """
+    reads one part of the input, used as the task of a pool worker
+    :param task: tuple ("range", path, start, end) of a byte range that starts at a line and ends after one, or ("lines", list of bytes, number of the first line)
+    :return: Report of the part
+    """
+    if task[0] == "lines":
+        return analyze_lines(task[1], task[2])
+
+    path, start, end = task[1:]
+    with open(path, "rb") as export:
+        export.seek(start)
+        return analyze_lines(export.read(end - start).splitlines(keepends=True), offset=start)
+
+
+def iter_ranges(path, chunk_bytes):
+    """
+    cuts a file into byte ranges of about chunk_bytes, each ending after a newline, without reading the ranges themselves
+    :return: generator of ("range", path, start, end) tasks
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as export:
+        start = 0
+        while start < size:
+            end = size
+            if start + chunk_bytes < size:
+                export.seek(start + chunk_bytes)
+                export.readline()  # moves to the end of the line the cut falls in
+                end = export.tell()
+            yield ("range", path, start, end)
+            start = end
+
+
+def iter_chunks(stream, chunk_bytes):
+    """
+    reads a stream of lines in chunks of about chunk_bytes
+    :return: generator of ("lines", list of bytes, number of the first line) tasks
+    """
+    lines = []
+    size = 0
+    first = 1
+    for line in stream:
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield ("lines", lines, first)
+            first += len(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield ("lines", lines, first)
+
+
+def iter_tasks(path, chunk_bytes):
+    """
+    cuts an export into tasks for analyze_task: byte ranges of a plain file, chunks of lines read here for stdin (-) and .gz files
+    """
+    if path != "-" and not path.endswith(".gz"):
+        yield from iter_ranges(path, chunk_bytes)
+        return
+
+    stream = sys.stdin.buffer if path == "-" else gzip.open(path, "rb")
+    try:
+        yield from iter_chunks(stream, chunk_bytes)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+def analyze(path, processes=None, chunk_bytes=1 << 22):
+    """
+    reads an export and generates the report so far after every finished chunk, the last one covers the whole export
+    :param path: export file, .gz for a compressed one, - for stdin
+    :param processes: default parameter, number of worker processes, all cpus if None, 1 reads in this process
+    :param chunk_bytes: default parameter, bytes of input in each task, at most processes * 2 tasks are read ahead
+    :return: generator of Report objects, the same object updated each time
+    """
+    total = Report()
+    tasks = iter_tasks(path, chunk_bytes)
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes == 1:
+        for task in tasks:
+            total.merge(analyze_task(task))
+            yield total
+        return
+
+    with multiprocessing.Pool(processes) as pool:
+        batch = processes * 2  # tasks handed to the pool at a time, so the chunks read ahead stay bounded
+        while True:
+            pending = [task for _, task in zip(range(batch), tasks)]
+            if not pending:
+                return
+            for report in pool.imap_unordered(analyze_task, pending):
+                total.merge(report)
+                yield total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="reports on JSON-lines exports of finished games")
+    parser.add_argument("input", help="export file, .gz for a compressed one, - for stdin")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-bytes", type=int, default=1 << 22)
+    parser.add_argument("--output", help="file the JSON report is written to, printed if not given")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    total = Report()
+    for total in analyze(args.input, args.processes, args.chunk_bytes):
+        elapsed = time.perf_counter() - start
+        print("%d games, %.1f MB, %.0f games/s, %.2f MB/s" % (
+            total.get_games(), total.get_bytes() / 1e6, total.get_games() / elapsed,
+            total.get_bytes() / 1e6 / elapsed), file=sys.stderr)
+
+    report = total.get_report()
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
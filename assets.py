@@ -0,0 +1,120 @@
+# Description: loads the images and fonts of the pygame front end on first use, with a disk cache of scaled images
+
+import hashlib
+import io
+import os
+import threading
+
+import pygame
+
+
+class AssetManager:
+    """
+    Represents the images and fonts of the front end. Nothing is read before it is first asked for. Images are converted to the pixel format of the display so blitting them needs no conversion, and scaled images are also saved in a cache directory, named after the hash of the source file and the size, so a later start loads the small image instead of decoding and scaling the source again. Images that are not needed right away can be loaded by a background thread with preload.
+    """
+    def __init__(self, base_dir="", cache_dir=None):
+        """
+        :param base_dir: default parameter, directory of the asset files
+        :param cache_dir: default parameter, directory of the scaled images, nothing is cached on disk if None
+        """
+        self._base_dir = base_dir
+        self._cache_dir = cache_dir
+        self._images = {}  # (name, size) -> converted surface
+        self._loaded = {}  # (name, size) -> surface loaded by the background thread, not converted yet
+        self._pending = set()  # (name, size) the background thread has still to load
+        self._fonts = {}  # (name, size) -> font
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def get_image(self, name, size=None):
+        """
+        returns an image converted to the display format, it must not be called before the display mode is set
+        :param name: file name of the image
+        :param size: default parameter, (width, height) the image is scaled to, the size of the file if None
+        """
+        key = (name, size)
+        image = self._images.get(key)
+        if image is not None:
+            return image
+
+        with self._condition:
+            while key in self._pending:
+                self._condition.wait()
+            image = self._loaded.pop(key, None)
+        if image is None:
+            image = self.load_image(name, size)
+
+        if image.get_flags() & pygame.SRCALPHA:
+            image = image.convert_alpha()
+        else:
+            image = image.convert()
+        self._images[key] = image
+        return image
+
+    def load_image(self, name, size=None):
+        """
+        reads an image, from the disk cache if it was scaled to that size before, and does not convert it
+        """
+        path = os.path.join(self._base_dir, name)
+        if size is None:
+            return pygame.image.load(path)
+
+        with open(path, "rb") as source:
+            data = source.read()
+        cache_path = None
+        if self._cache_dir is not None:
+            digest = hashlib.sha1(data).hexdigest()[:16]
+            cache_path = os.path.join(self._cache_dir, "%s-%dx%d.png" % (digest, size[0], size[1]))
+            if os.path.exists(cache_path):
+                try:
+                    return pygame.image.load(cache_path)
+                except pygame.error:
+                    pass  # unreadable cache file, it is written again below
+
+        image = pygame.transform.scale(pygame.image.load(io.BytesIO(data), name), size)
+        if cache_path is not None:
+            try:
+                os.makedirs(self._cache_dir, exist_ok=True)
+                temp_path = "%s.%d.tmp.png" % (cache_path, os.getpid())
+                pygame.image.save(image, temp_path)
+                os.replace(temp_path, cache_path)
+            except (OSError, pygame.error):
+                pass  # the cache only saves time, the game runs without it
+
+        return image
+
+    def preload(self, images):
+        """
+        starts loading images in a background thread, get_image waits for the ones that are not loaded yet
+        :param images: list of (name, size) as they will be passed to get_image
+        """
+        with self._condition:
+            images = [key for key in images if key not in self._images and key not in self._loaded]
+            self._pending.update(images)
+        self._thread = threading.Thread(target=self.run_preload, args=(images,), daemon=True)
+        self._thread.start()
+
+    def run_preload(self, images):
+        for key in images:
+            try:
+                image = self.load_image(key[0], key[1])
+            except (OSError, pygame.error):
+                image = None  # get_image loads it again and raises the error where the image is used
+            with self._condition:
+                if image is not None:
+                    self._loaded[key] = image
+                self._pending.discard(key)
+                self._condition.notify_all()
+
+    def is_loading(self):
+        with self._condition:
+            return bool(self._pending)
+
+    def get_font(self, name, size):
+        """
+        returns a font, opened the first time it is asked for
+        """
+        key = (name, size)
+        if key not in self._fonts:
+            self._fonts[key] = pygame.font.Font(os.path.join(self._base_dir, name), size)
+        return self._fonts[key]
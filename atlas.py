@@ -0,0 +1,84 @@
+# Description: many small sprites packed into one surface, drawn with area blits
+
+import pygame
+
+
+class SpriteAtlas:
+    """
+    Represents sprites packed in rows (shelves) of one surface with per-pixel alpha. Drawing a sprite is a blit of an area of that surface, so a whole layer of sprites can be drawn with one Surface.blits call. Sprites can be removed, and the room they leave is reused for the next sprite of the same size. It must be created after the display mode is set.
+    """
+    def __init__(self, width=512, height=128):
+        """
+        :param width: default parameter, width of the surface, a wider sprite widens it
+        :param height: default parameter, starting height of the surface, it doubles whenever it is full
+        """
+        self._surface = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
+        self._surface.fill((0, 0, 0, 0))
+        self._areas = {}  # key -> rect of the sprite in the surface
+        self._free = []  # rects of removed sprites
+        self._shelf_x = 0
+        self._shelf_y = 0
+        self._shelf_h = 0
+
+    def __contains__(self, key):
+        return key in self._areas
+
+    def __len__(self):
+        return len(self._areas)
+
+    def get_surface(self):
+        return self._surface
+
+    def get_area(self, key):
+        return self._areas[key]
+
+    def get_blit(self, key, dest):
+        """
+        returns the (source, dest, area) sequence Surface.blits expects for drawing a sprite at dest
+        """
+        return (self._surface, dest, self._areas[key])
+
+    def blit(self, target, key, dest):
+        target.blit(self._surface, dest, self._areas[key])
+
+    def add(self, key, image):
+        """
+        copies an image into the atlas, its pixels and alpha are kept as they are
+        """
+        if key in self._areas:
+            self.remove(key)
+        area = self.allocate(image.get_width(), image.get_height())
+        self._surface.fill((0, 0, 0, 0), area)
+        self._surface.blit(image, area, special_flags=pygame.BLEND_RGBA_MAX)  # copies instead of blending
+        self._areas[key] = area
+
+    def remove(self, key):
+        self._free.append(self._areas.pop(key))
+
+    def allocate(self, width, height):
+        """
+        finds room for a sprite, first among the removed sprites of that size, then at the end of the last shelf
+        :return: rect of the room in the surface
+        """
+        for i, area in enumerate(self._free):
+            if area.size == (width, height):
+                return self._free.pop(i)
+
+        if self._shelf_x + width > self._surface.get_width():  # starts a new shelf
+            self._shelf_y += self._shelf_h
+            self._shelf_x = 0
+            self._shelf_h = 0
+        while (self._shelf_y + height > self._surface.get_height() or
+               width > self._surface.get_width()):
+            self.grow(max(width, self._surface.get_width()), self._surface.get_height() * 2)
+
+        area = pygame.Rect(self._shelf_x, self._shelf_y, width, height)
+        self._shelf_x += width
+        self._shelf_h = max(self._shelf_h, height)
+        return area
+
+    def grow(self, width, height):
+        surface = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
+        surface.fill((0, 0, 0, 0))
+        surface.blit(self._surface, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        self._surface = surface
@@ -0,0 +1,121 @@
+# Description: NumPy tracer that shoots rays on many boards at once, following the same rules as Board.find_exit
+
+import numpy as np
+
+# outcome codes returned by trace
+HIT = 0
+REFLECT = 1
+EXIT = 2
+
+
+def border_entries(size=10):
+    """
+    returns every legal ray origin of a size x size board as an (E, 2) array of (row, col), in the same order as Board.get_border_entries
+    """
+    entries = []
+    for i in range(1, size - 1):
+        entries += [(0, i), (size - 1, i), (i, 0), (i, size - 1)]
+
+    return np.array(entries, dtype=np.intp)
+
+
+def layouts_to_boards(layouts, size=10):
+    """
+    turns atom layouts into an occupancy array
+    :param layouts: sequence of lists of (row, col) tuples
+    :param size: number of squares on each side of the board, border included
+    :return: boolean array of shape (N, size, size), True where there is an atom
+    """
+    boards = np.zeros((len(layouts), size, size), dtype=bool)
+    for i, layout in enumerate(layouts):
+        for row, col in layout:
+            boards[i, row, col] = True
+
+    return boards
+
+
+def trace(boards, entries):
+    """
+    shoots one ray on every board and moves all the rays one square at a time in lock-step until each of them hits an atom, is reflected or exits
+    :param boards: boolean array of shape (N, size, size), True where there is an atom, atoms are only on the non-border squares
+    :param entries: ray origins, either one (row, col) shared by every board or an (N, 2) array with one origin per board
+    :return: a tuple (codes, exits), codes is an (N,) array of HIT, REFLECT or EXIT and exits is an (N, 2) array of exit squares, (-1, -1) for a hit and the entry for a reflection
+    """
+    boards = np.asarray(boards, dtype=bool)
+    n, size = boards.shape[0], boards.shape[1]
+    last = size - 1
+    entries = np.broadcast_to(np.asarray(entries, dtype=np.intp), (n, 2))
+    row = entries[:, 0].copy()
+    col = entries[:, 1].copy()
+
+    on_border = (row == 0) | (row == last) | (col == 0) | (col == last)
+    on_board = (row >= 0) & (row <= last) & (col >= 0) & (col <= last)
+    corner = ((row == 0) | (row == last)) & ((col == 0) | (col == last))
+    if not np.all(on_board & on_border & ~corner):
+        raise ValueError("every ray origin must be a non-corner border square")
+
+    # initial direction, same order of checks as Ray.get_init_dir
+    d_row = np.where(row == 0, 1, np.where(row == last, -1, 0))
+    d_col = np.where(d_row != 0, 0, np.where(col == 0, 1, -1))
+
+    counter = np.zeros(n, dtype=np.intp)
+    exits = np.full((n, 2), -1, dtype=np.intp)
+    limit = 4 * size * size  # same limit as Board.find_exit for a ray trapped between atoms
+    active = np.arange(n)
+
+    while active.size:
+        next_row = row[active] + d_row[active]
+        next_col = col[active] + d_col[active]
+        in_bound = (next_row >= 1) & (next_row < last) & (next_col >= 1) & (next_col < last)
+
+        # rays whose next square is on the border leave the board, a ray that only ran the loop once was reflected
+        done = active[~in_bound]
+        reflected = counter[done] == 1
+        exits[done[reflected]] = entries[done[reflected]]
+        exits[done[~reflected], 0] = next_row[~in_bound][~reflected]
+        exits[done[~reflected], 1] = next_col[~in_bound][~reflected]
+
+        active = active[in_bound]
+        next_row = next_row[in_bound]
+        next_col = next_col[in_bound]
+        counter[active] += 1
+
+        # trapped rays keep the (-1, -1) exit of a hit
+        free = counter[active] <= limit
+        active = active[free]
+        next_row = next_row[free]
+        next_col = next_col[free]
+
+        # the two squares beside the next square, left/right when moving vertically and top/bottom when moving horizontally
+        side_row = np.abs(d_col[active])
+        side_col = np.abs(d_row[active])
+        low = boards[active, next_row - side_row, next_col - side_col]
+        high = boards[active, next_row + side_row, next_col + side_col]
+
+        move = ~low & ~high
+        moved = active[move]
+        row[moved] = next_row[move]
+        col[moved] = next_col[move]
+        hit = boards[moved, row[moved], col[moved]]
+
+        # double deflection means exit is the same as entry
+        double = low & high
+        exits[active[double]] = entries[active[double]]
+
+        # a ray deflected by one atom turns away from it without moving
+        deflected = low ^ high
+        turn = np.where(low[deflected], 1, -1)
+        turned = active[deflected]
+        d_row[turned] = turn * side_row[deflected]
+        d_col[turned] = turn * side_col[deflected]
+
+        still_moving = np.zeros(active.size, dtype=bool)
+        still_moving[move] = ~hit
+        still_moving |= deflected
+        active = active[still_moving]
+
+    codes = np.full(n, EXIT, dtype=np.int8)
+    codes[exits[:, 0] < 0] = HIT
+    codes[(exits[:, 0] == entries[:, 0]) & (exits[:, 1] == entries[:, 1])] = REFLECT
+
+    return codes, exits
@@ -0,0 +1,218 @@
+# Description: benchmarks of the BlackBox engine hot paths on a fixed seeded corpus of boards
+#
+#   python bench.py --output new.json               runs every benchmark and writes the results as JSON
+#   python bench.py --compare old.json new.json     prints the change of each benchmark, exits with 1 on a regression
+#
+# Memory is measured with tracemalloc, which only knows the blocks alive at a given time and not how many
+# allocations were made, so allocations are reported as the peak of traced bytes above the start of a round
+# (peak_bytes_per_op) and the blocks still alive after it (retained_blocks). Python has no public count of the
+# allocations a piece of code made, so there is no allocations per operation figure.
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import BlackBox
+
+
+def get_corpus(seed=0, boards=200, atom_count=4, size=10):
+    """
+    returns a reproducible list of atom layouts
+    """
+    rng = random.Random(seed)
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    return [rng.sample(squares, atom_count) for _ in range(boards)]
+
+
+def get_script(seed=0, rays=8):
+    """
+    returns a reproducible list of ray origins that every scripted game shoots
+    """
+    rng = random.Random(seed)
+    return rng.sample(BlackBox.Board([]).get_border_entries(), rays)
+
+
+def bench_ray(corpus):
+    entries = BlackBox.Board([]).get_border_entries()
+
+    def run():
+        for entry in entries:
+            BlackBox.Ray(entry[0], entry[1])
+    return run, len(entries)
+
+
+def make_find_exit(board_class):
+    def bench_find_exit(corpus):
+        boards = [board_class(layout) for layout in corpus]
+        entries = boards[0].get_border_entries()
+
+        def run():
+            for board in boards:
+                for entry in entries:
+                    board.find_exit(BlackBox.Ray(entry[0], entry[1]))
+        return run, len(boards) * len(entries)
+    return bench_find_exit
+
+
+def make_shoot_ray(board_class):
+    def bench_shoot_ray(corpus):
+        entries = BlackBox.Board([]).get_border_entries()
+
+        def run():
+            for layout in corpus:
+                game = BlackBox.BlackBoxGame(list(layout), board_class)
+                for entry in entries:
+                    game.shoot_ray(entry[0], entry[1])
+        return run, len(corpus) * len(entries)
+    return bench_shoot_ray
+
+
+def bench_guess_atom(corpus):
+    guesses = [(1, 1), (2, 2)]
+
+    def run():
+        for layout in corpus:
+            game = BlackBox.BlackBoxGame(list(layout))
+            for guess in guesses + layout[:2]:
+                game.guess_atom(guess[0], guess[1])
+    return run, len(corpus) * 4
+
+
+def bench_scripted_game(corpus):
+    script = get_script()
+
+    def run():
+        for layout in corpus:
+            game = BlackBox.BlackBoxGame(list(layout))
+            for entry in script:
+                game.shoot_ray(entry[0], entry[1])
+            for guess in layout:
+                game.guess_atom(guess[0], guess[1])
+            game.get_score()
+            game.get_status()
+    return run, len(corpus)
+
+
+# name -> function that takes the corpus and returns (function running one round, operations per round)
+BENCHMARKS = {
+    "ray_construction": bench_ray,
+    "find_exit_32_board": make_find_exit(BlackBox.Board),
+    "find_exit_32_bitboard": make_find_exit(BlackBox.BitBoard),
+    "find_exit_32_sparseboard": make_find_exit(BlackBox.SparseBoard),
+    "shoot_ray_board": make_shoot_ray(BlackBox.Board),
+    "shoot_ray_bitboard": make_shoot_ray(BlackBox.BitBoard),
+    "guess_atom_status": bench_guess_atom,
+    "scripted_game": bench_scripted_game,
+}
+
+
+def measure(run, ops, min_time=0.2, repeat=5):
+    """
+    times a benchmark round and measures its memory use with tracemalloc: the peak of the bytes allocated during a round, per operation, and the number of blocks a round leaves allocated
+    :param run: function running one round
+    :param ops: number of operations in one round
+    :param min_time: default parameter, each timing repeats the round until this many seconds have passed
+    :param repeat: default parameter, number of timings, the fastest one is kept
+    :return: dictionary of the results
+    """
+    run()  # warm up caches such as the BitBoard tables
+    timings = []
+    for _ in range(repeat):
+        rounds = 0
+        start = time.perf_counter()
+        while True:
+            run()
+            rounds += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        timings.append(elapsed / rounds)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+    best = min(timings)
+    return {
+        "ops_per_round": ops,
+        "ops_per_sec": round(ops / best, 1),
+        "us_per_op": round(best / ops * 1e6, 4),
+        "peak_bytes_per_op": round(peak / ops, 1),
+        "retained_blocks": retained_blocks,
+    }
+
+
+def run_benchmarks(names=None, seed=0, boards=200, min_time=0.2, repeat=5):
+    """
+    runs the benchmarks and returns the results with a description of the machine
+    """
+    corpus = get_corpus(seed, boards)
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        run, ops = bench(corpus)
+        results[name] = measure(run, ops, min_time, repeat)
+        print("%-26s %12.1f ops/s" % (name, results[name]["ops_per_sec"]), file=sys.stderr)
+
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": seed,
+        "boards": boards,
+        "results": results,
+    }
+
+
+def compare(old, new, tolerance=0.1):
+    """
+    prints the change in ops/sec of every benchmark found in both runs
+    :param tolerance: default parameter, slowdown fraction above which a benchmark counts as a regression
+    :return: list of the names of the regressed benchmarks
+    """
+    regressions = []
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        before = old["results"][name]["ops_per_sec"]
+        after = new["results"][name]["ops_per_sec"]
+        change = after / before - 1
+        flag = ""
+        if change < -tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print("%-26s %12.1f -> %12.1f ops/s %+7.1f%%%s" % (name, before, after, change * 100, flag))
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BlackBox engine benchmarks")
+    parser.add_argument("--output", help="file the JSON results are written to, printed if not given")
+    parser.add_argument("--only", nargs="*", help="names of the benchmarks to run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--boards", type=int, default=200)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as old_file, open(args.compare[1]) as new_file:
+            regressed = compare(json.load(old_file), json.load(new_file), args.tolerance)
+        sys.exit(1 if regressed else 0)
+
+    report = run_benchmarks(args.only, args.seed, args.boards, args.min_time, args.repeat)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,254 @@
+# Description: BlackBoxGame state packed into a few integers, with a fixed-size binary encoding
+#
+# to_bytes writes HEADER followed by six little-endian bitsets:
+#   version (8 bits), board size (16 bits), status (index in STATUSES, 8 bits), score (signed 16 bits)
+#   atoms, guesses:                   bit (row - 1) * (size - 2) + (col - 1) of each non-border square, square_bytes each
+#   used, shot, hits, reflects:       bit i of the border square get_border_entries()[i], border_bytes each
+# used is every border square a ray entered or left by, shot the squares rays were shot from, hits and reflects
+# the squares of the rays that hit an atom or came back out where they entered. A board of size 10 takes 38 bytes.
+# Version 1 stored the board size in 8 bits, its bytes are still read.
+
+import struct
+
+import BlackBox
+
+VERSION = 2
+HEADER = struct.Struct("<BHBh")
+HEADERS = {1: struct.Struct("<BBBh"), VERSION: HEADER}  # version -> header, for reading older bytes
+MAX_SIZE = (1 << 16) - 1
+STATUSES = ("started", "You won! Play again!", "You lost! Try again!")
+
+
+class CompactGame:
+    """
+    Represents a game with the same rules, scores and methods as BlackBoxGame, but its whole state is a few integers used as bitsets, so it takes a small fraction of the memory of a BlackBoxGame. The rays are traced on a board built for each shot instead of one kept with the game. The lists returned by the getters are built from the bitsets, so they are in board order and hold each square once, where BlackBoxGame keeps the order the rays were shot in. Only non-border squares can be guessed.
+    """
+    __slots__ = ("_size", "_status", "_score", "_atoms", "_guesses", "_used", "_shot", "_hits", "_reflects")
+
+    _tables = {}  # board size -> (border squares, border square -> bit, byte lengths), shared by every game of that size
+
+    def __init__(self, pos_list, size=10):
+        """
+        :param pos_list: a list of tuples that represents the locations of atoms, all on non-border squares
+        :param size: default parameter, number of squares on each side of the board, border included, from 3 to MAX_SIZE
+        """
+        if type(size) is not int or not 3 <= size <= MAX_SIZE:
+            raise ValueError("board size must be an integer from 3 to %d" % MAX_SIZE)
+        self._size = size
+        self._status = 0
+        self._score = 100
+        self._atoms = 0
+        for pos in pos_list:
+            self._atoms |= 1 << self.get_square_bit(pos)
+        self._guesses = 0
+        self._used = 0
+        self._shot = 0
+        self._hits = 0
+        self._reflects = 0
+
+    @classmethod
+    def get_tables(cls, size):
+        if size not in cls._tables:
+            border = BlackBox.Board([], size).get_border_entries()
+            square_bytes = ((size - 2) * (size - 2) + 7) // 8
+            border_bytes = (len(border) + 7) // 8
+            cls._tables[size] = (border, {pos: i for i, pos in enumerate(border)}, square_bytes, border_bytes)
+        return cls._tables[size]
+
+    def get_square_bit(self, pos):
+        """
+        returns the bit of a non-border square in the atoms and guesses bitsets, raises ValueError for other squares
+        """
+        inner = self._size - 2
+        if not (0 < pos[0] <= inner and 0 < pos[1] <= inner):
+            raise ValueError("%s is not a non-border square" % (pos,))
+        return (pos[0] - 1) * inner + pos[1] - 1
+
+    def get_squares(self, mask):
+        inner = self._size - 2
+        squares = []
+        while mask:
+            low = mask & -mask
+            bit = low.bit_length() - 1
+            squares.append((bit // inner + 1, bit % inner + 1))
+            mask ^= low
+        return squares
+
+    def get_border_squares(self, mask):
+        border = self.get_tables(self._size)[0]
+        return [border[i] for i in range(len(border)) if mask >> i & 1]
+
+    def shoot_ray(self, row, col):
+        """
+        takes as parameter row and col of ray origin, same as BlackBoxGame.shoot_ray
+        :return: False for a corner, non-border or off-board square, otherwise the tuple (entry, exit), exit is None for a hit
+        """
+        entry = (row, col)
+        bits = self.get_tables(self._size)[1]
+        if entry not in bits:
+            return False
+
+        exit = self.get_board().get_exit(entry)
+        entry_bit = 1 << bits[entry]
+        deduction = 0
+        if not self._used & entry_bit:
+            self._used |= entry_bit
+            deduction += 1
+        if exit is not None and not self._used >> bits[exit] & 1:
+            self._used |= 1 << bits[exit]
+            deduction += 1
+        self._score = max(self._score - deduction, 0)
+
+        self._shot |= entry_bit
+        if exit is None:
+            self._hits |= entry_bit
+        elif exit == entry:
+            self._reflects |= entry_bit
+
+        return (entry, exit)
+
+    def guess_atom(self, row, col):
+        """
+        takes as parameter row and col of the player's guess, same as BlackBoxGame.guess_atom
+        :return: True if guess is right, otherwise it should return False
+        """
+        guess = 1 << self.get_square_bit((row, col))
+        if not self._guesses & guess:
+            self._guesses |= guess
+            if not self._atoms & guess:
+                self._score = max(self._score - 5, 0)
+
+        if bin(self._guesses).count("1") == bin(self._atoms).count("1"):
+            self._status = 1 if self._guesses == self._atoms else 2
+
+        return bool(self._atoms & guess)
+
+    def get_score(self):
+        return self._score
+
+    def get_status(self):
+        return STATUSES[self._status]
+
+    def atoms_left(self):
+        """
+        :return: the number of atoms that haven't been guessed yet
+        """
+        return bin(self._atoms).count("1") - bin(self._atoms & self._guesses).count("1")
+
+    def get_size(self):
+        return self._size
+
+    def get_atoms(self):
+        return self.get_squares(self._atoms)
+
+    def get_board(self):
+        """
+        builds a board of the atoms, a BitBoard for standard sized boards and a SparseBoard for large ones
+        """
+        if self._size <= 16:
+            return BlackBox.BitBoard(self.get_atoms(), self._size)
+        return BlackBox.SparseBoard(self.get_atoms(), self._size)
+
+    def get_guesses(self):
+        """
+        :return: list of the guessed squares, None if there was no guess, like BlackBoxGame.get_guesses
+        """
+        return self.get_squares(self._guesses) if self._guesses else None
+
+    def get_hits(self):
+        return self.get_border_squares(self._hits) if self._shot else None
+
+    def get_reflects(self):
+        return self.get_border_squares(self._reflects) if self._shot else None
+
+    def get_entries_exits(self):
+        return self.get_border_squares(self._used) if self._shot else None
+
+    def get_rays(self):
+        """
+        traces the rays again from the squares they were shot from
+        :return: list of (entry, exit), None if no ray was shot
+        """
+        if not self._shot:
+            return None
+        board = self.get_board()
+        return [(entry, board.get_exit(entry)) for entry in self.get_border_squares(self._shot)]
+
+    def to_bytes(self):
+        """
+        takes no parameters and returns the state as bytes, the length only depends on the board size
+        """
+        square_bytes, border_bytes = self.get_tables(self._size)[2:]
+        return b"".join((
+            HEADER.pack(VERSION, self._size, self._status, self._score),
+            self._atoms.to_bytes(square_bytes, "little"),
+            self._guesses.to_bytes(square_bytes, "little"),
+            self._used.to_bytes(border_bytes, "little"),
+            self._shot.to_bytes(border_bytes, "little"),
+            self._hits.to_bytes(border_bytes, "little"),
+            self._reflects.to_bytes(border_bytes, "little"),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        rebuilds a game from the bytes returned by to_bytes, raises ValueError if they do not hold a game
+        """
+        header = HEADERS.get(data[0]) if data else None
+        if header is None:
+            raise ValueError("not a game encoded by version %s" % " or ".join(map(str, HEADERS)))
+        if len(data) < header.size:
+            raise ValueError("%d bytes is too short for a game" % len(data))
+        version, size, status, score = header.unpack_from(data)
+        if size < 3 or status >= len(STATUSES):
+            raise ValueError("not a game encoded by version %d" % version)
+        square_bytes, border_bytes = cls.get_tables(size)[2:]
+        if len(data) != header.size + 2 * square_bytes + 4 * border_bytes:
+            raise ValueError("%d bytes is the wrong length for a game of size %d" % (len(data), size))
+
+        game = cls.__new__(cls)
+        game._size = size
+        game._status = status
+        game._score = score
+        fields = []
+        offset = header.size
+        for length in (square_bytes, square_bytes, border_bytes, border_bytes, border_bytes, border_bytes):
+            fields.append(int.from_bytes(data[offset:offset + length], "little"))
+            offset += length
+        game._atoms, game._guesses, game._used, game._shot, game._hits, game._reflects = fields
+        return game
+
+    @classmethod
+    def from_game(cls, game):
+        """
+        packs the state of a BlackBoxGame, raises ValueError if it has a guess on a border square
+        """
+        game_size = game.get_board().get_size()
+        compact = cls(game.get_atoms(), game_size)
+        bits = cls.get_tables(game_size)[1]
+        for pos in game.get_guesses() or []:
+            compact._guesses |= 1 << compact.get_square_bit(pos)
+        for pos in game.get_entries_exits() or []:
+            compact._used |= 1 << bits[pos]
+        for entry, exit in game.get_rays() or []:
+            compact._shot |= 1 << bits[entry]
+        for pos in game.get_hits() or []:
+            compact._hits |= 1 << bits[pos]
+        for pos in game.get_reflects() or []:
+            compact._reflects |= 1 << bits[pos]
+        compact._score = game.get_score()
+        compact._status = STATUSES.index(game.get_status())
+        return compact
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactGame):
+            return NotImplemented
+        return self.to_bytes() == other.to_bytes()
+
+    __hash__ = None
+
+    def __reduce__(self):
+        """
+        pickles the game as its bytes
+        """
+        return (type(self).from_bytes, (self.to_bytes(),))
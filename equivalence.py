@@ -0,0 +1,168 @@
+# Description: finds the groups of atom layouts that no set of rays can tell apart
+#
+#   python equivalence.py --index signatures4.bin --output classes.json
+#
+# Two layouts are indistinguishable when every ray has the same exit on both, so they have the same signature
+# in the index built by signatures.py. The signatures are hashed into partitions and each partition is grouped
+# by a pool worker, which only keeps its own partition in memory.
+
+import argparse
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+import BlackBox
+import signatures
+
+# state of a pool worker, set once by init_worker instead of being sent with every task
+_worker = {}
+
+
+def are_indistinguishable(guess, answer, size=10, index=None):
+    """
+    checks if a guessed layout sends every ray to the same exit as the real one, in which case no ray could have told them apart
+    :param guess: list of (row, col) tuples
+    :param answer: list of (row, col) tuples
+    :param index: default parameter, signatures.SignatureIndex to read the exits from instead of tracing, used when both layouts have its atom count
+    :return: True if the layouts cannot be told apart, otherwise False
+    """
+    if sorted(guess) == sorted(answer):
+        return True
+
+    if index is not None and index.get_size() == size and len(guess) == len(answer) == index.get_atom_count():
+        return index.get_row(signatures.get_rank(guess, size)) == index.get_row(signatures.get_rank(answer, size))
+
+    guess_board = BlackBox.BitBoard(list(guess), size)
+    answer_board = BlackBox.BitBoard(list(answer), size)
+    return all(guess_board.get_exit(entry) == answer_board.get_exit(entry)
+               for entry in answer_board.get_border_entries())
+
+
+def get_partitions(rows, partitions):
+    """
+    hashes signature rows into partitions, equal rows always land in the same one
+    :param rows: (n, entries) array of exit bytes
+    :return: (n,) array of partition numbers
+    """
+    weights = np.random.default_rng(0).integers(1, 1 << 31, rows.shape[1], dtype=np.uint64) | 1
+    return (rows.astype(np.uint64) * weights).sum(axis=1) % np.uint64(partitions)
+
+
+def init_worker(path, partitions, block):
+    """
+    opens the index in a pool worker, its pages are shared with the other workers through the page cache
+    """
+    _worker["index"] = signatures.SignatureIndex(path)
+    _worker["partitions"] = partitions
+    _worker["block"] = block
+
+
+def group_partition(partition):
+    """
+    groups the layouts of one partition by signature, used as the task of a pool worker
+    :return: list of classes with more than one layout, each a sorted list of ranks
+    """
+    index = _worker["index"]
+    ranks = []
+    rows = []
+    for first, block in index.scan(block=_worker["block"]):
+        mine = np.flatnonzero(get_partitions(block, _worker["partitions"]) == partition)
+        ranks.append(mine + first)
+        rows.append(np.array(block[mine]))
+    ranks = np.concatenate(ranks)
+    rows = np.concatenate(rows)
+    if not len(rows):
+        return []
+
+    keys = rows.view(np.dtype((np.void, rows.shape[1]))).ravel()
+    inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)[1:]
+    inverse = inverse.ravel()
+    shared = counts[inverse] > 1
+    order = np.argsort(inverse[shared], kind="stable")
+    members = ranks[shared][order]
+    labels = inverse[shared][order]
+    bounds = np.flatnonzero(np.diff(labels)) + 1
+    return [group.tolist() for group in np.split(members, bounds)] if len(members) else []
+
+
+def find_classes(path, partitions=16, processes=None, block=65536):
+    """
+    generates every class of two or more indistinguishable layouts of an index
+    :param path: index file built by signatures.build_index
+    :param partitions: default parameter, number of tasks, a task holds about 1 / partitions of the signatures
+    :param processes: default parameter, number of worker processes, all cpus if None, 1 groups in this process
+    :param block: default parameter, rows read at a time while scanning the index
+    :return: generator of classes, each a list of layouts sorted by rank
+    """
+    with signatures.SignatureIndex(path) as index:
+        atom_count, size = index.get_atom_count(), index.get_size()
+
+    def to_layouts(found):
+        for group in found:
+            yield [signatures.get_layout(rank, atom_count, size) for rank in group]
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes == 1:
+        init_worker(path, partitions, block)
+        try:
+            for partition in range(partitions):
+                yield from to_layouts(group_partition(partition))
+        finally:
+            _worker.pop("index").close()
+        return
+
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(path, partitions, block)) as pool:
+        for found in pool.imap_unordered(group_partition, range(partitions)):
+            yield from to_layouts(found)
+
+
+def get_report(path, partitions=16, processes=None):
+    """
+    groups every layout of an index and summarizes the classes
+    :return: dictionary with the number of layouts, the number of classes of each size and every class of two or more layouts
+    """
+    with signatures.SignatureIndex(path) as index:
+        total = len(index)
+        atom_count, size = index.get_atom_count(), index.get_size()
+
+    classes = sorted(find_classes(path, partitions, processes), key=lambda group: (-len(group), group))
+    sizes = {}
+    for group in classes:
+        sizes[len(group)] = sizes.get(len(group), 0) + 1
+    ambiguous = sum(len(group) for group in classes)
+    sizes[1] = total - ambiguous
+
+    return {
+        "atoms": atom_count,
+        "size": size,
+        "layouts": total,
+        "distinguishable": total - ambiguous,
+        "classes": total - ambiguous + len(classes),
+        "class_sizes": {str(length): sizes[length] for length in sorted(sizes)},
+        "groups": classes,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="finds the layouts no set of rays can tell apart")
+    parser.add_argument("--index", required=True, help="signature index built by signatures.py, built first if missing")
+    parser.add_argument("--atoms", type=int, default=4, help="atoms per layout when the index is built")
+    parser.add_argument("--size", type=int, default=10, help="board size when the index is built")
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--output", help="file the JSON report is written to, a summary is printed if not given")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.index):
+        signatures.build_index(args.index, args.atoms, args.size)
+
+    report = get_report(args.index, args.partitions, args.processes)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output)
+    else:
+        print(json.dumps({key: value for key, value in report.items() if key != "groups"}, indent=2))
@@ -0,0 +1,201 @@
+# Description: append-only binary log of BlackBoxGame events, and a memory-mapped reader that replays it
+#
+# Every event is one little-endian record of RECORD.size (20) bytes:
+#   game id (unsigned 64 bits), event type (8 bits), padding (8 bits),
+#   entry row, entry col, exit row, exit col, score after the event (signed 16 bits each)
+# CREATE:  entry is (board size, number of atoms), exit row is the board class (see BOARD_CLASSES)
+# ATOM:    entry is the position of one atom, one record per atom right after CREATE
+# SHOOT:   entry and exit of the ray, exit is (-1, -1) for a hit
+# GUESS:   entry is the guess, exit row is 1 if the guess was right, otherwise 0
+# UNDO:    the last move was taken back, entry and exit are unused
+# REDO:    the last move taken back was played again, entry and exit are unused
+# A game whose board size or guesses do not fit in 16 bits cannot be logged: the game checks before it changes.
+
+import collections
+import mmap
+import os
+import struct
+
+import BlackBox
+
+RECORD = struct.Struct("<QBxhhhhh")
+POS_MIN = -(1 << 15)  # range of the coordinates and the score in a record
+POS_MAX = (1 << 15) - 1
+
+CREATE = 0
+ATOM = 1
+SHOOT = 2
+GUESS = 3
+UNDO = 4
+REDO = 5
+
+BOARD_CLASSES = [BlackBox.Board, BlackBox.BitBoard, BlackBox.SparseBoard]
+
+Event = collections.namedtuple("Event", ["game_id", "type", "entry", "exit", "score"])
+
+
+class EventLog:
+    """
+    Represents the writing end of a log file. Records are packed with struct and appended through a buffered file, so logging an event costs one pack and one buffered write. A BlackBoxGame created with event_log set to an EventLog records itself in it.
+    """
+    def __init__(self, path, buffer_size=1 << 16):
+        """
+        :param path: log file, records are appended to it if it exists
+        :param buffer_size: default parameter, bytes buffered before they are written to the file
+        """
+        self._file = open(path, "ab", buffering=buffer_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def pack(self, game_id, event_type, entry, exit, score):
+        """
+        returns the bytes of one record, exit is None for a hit
+        :raise ValueError: if a field does not fit in the record
+        """
+        if exit is None:
+            exit = (-1, -1)
+        try:
+            return RECORD.pack(game_id, event_type, entry[0], entry[1], exit[0], exit[1], score)
+        except struct.error as error:
+            raise ValueError("game %s: event does not fit in a record (%s)" % (game_id, error))
+
+    def append(self, game_id, event_type, entry, exit, score):
+        """
+        appends one record, exit is None for a hit
+        """
+        self._file.write(self.pack(game_id, event_type, entry, exit, score))
+
+    def check_pos(self, pos):
+        """
+        raises ValueError if a position does not fit in a record, so a game can check a move before making it
+        """
+        if not all(type(x) is int and POS_MIN <= x <= POS_MAX for x in pos):
+            raise ValueError("%s does not fit in an event log record" % (pos,))
+
+    def record_create(self, game_id, atoms, size, board_class, score):
+        """
+        appends the CREATE record and the ATOM records of a game, nothing is written if one of them does not fit
+        """
+        records = [self.pack(game_id, CREATE, (size, len(atoms)), (BOARD_CLASSES.index(board_class), 0), score)]
+        for pos in atoms:
+            records.append(self.pack(game_id, ATOM, pos, None, score))
+        self._file.write(b"".join(records))
+
+    def record_shot(self, game_id, entry, exit, score):
+        self.append(game_id, SHOOT, entry, exit, score)
+
+    def record_guess(self, game_id, pos, correct, score):
+        self.append(game_id, GUESS, pos, (int(correct), 0), score)
+
+    def record_undo(self, game_id, score):
+        self.append(game_id, UNDO, (0, 0), (0, 0), score)
+
+    def record_redo(self, game_id, score):
+        self.append(game_id, REDO, (0, 0), (0, 0), score)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class EventLogReader:
+    """
+    Represents the reading end of a log file. The file is memory-mapped and the records are unpacked one at a time while iterating, so a log larger than memory can be scanned or replayed. A partly written last record is ignored.
+    """
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._count = size // RECORD.size
+        self._map = None
+        if self._count:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        """
+        unpacks the record at the given position without reading the ones before it
+        """
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self.make_event(RECORD.unpack_from(self._map, index * RECORD.size))
+
+    def __iter__(self):
+        """
+        unpacks the records in blocks copied out of the map, so an iteration that is left unfinished does not keep the map from being closed
+        """
+        end = self._count * RECORD.size
+        block_size = RECORD.size * 4096
+        for start in range(0, end, block_size):
+            for fields in RECORD.iter_unpack(self._map[start:min(start + block_size, end)]):
+                yield self.make_event(fields)
+
+    def make_event(self, fields):
+        game_id, event_type, entry_row, entry_col, exit_row, exit_col, score = fields
+        exit = None if exit_row == -1 and event_type == SHOOT else (exit_row, exit_col)
+        return Event(game_id, event_type, (entry_row, entry_col), exit, score)
+
+    def filter(self, game_id=None, event_type=None):
+        """
+        generates the events of one game and/or of one type
+        """
+        for event in self:
+            if (game_id is None or event.game_id == game_id) and (event_type is None or event.type == event_type):
+                yield event
+
+    def replay(self, game_ids=None):
+        """
+        rebuilds games by running their logged events again, checking the score after every event
+        :param game_ids: default parameter, set of the ids of the games to rebuild, every game if None
+        :return: dictionary of game id -> BlackBoxGame
+        """
+        games = {}
+        pending = {}  # game id -> (size, number of atoms, board class, atoms read so far)
+        for event in self:
+            if game_ids is not None and event.game_id not in game_ids:
+                continue
+
+            if event.type == CREATE:
+                pending[event.game_id] = (event.entry[0], event.entry[1], BOARD_CLASSES[event.exit[0]], [])
+            elif event.type == ATOM:
+                pending[event.game_id][3].append(event.entry)
+            else:
+                game = games[event.game_id]
+                if event.type == SHOOT:
+                    result = game.shoot_ray(event.entry[0], event.entry[1])
+                    if result is False or result[1] != event.exit:
+                        raise ValueError("game %d: logged ray %s does not replay" % (event.game_id, event))
+                elif event.type == GUESS:
+                    game.guess_atom(event.entry[0], event.entry[1])
+                elif event.type == UNDO:
+                    game.undo()
+                else:
+                    game.redo()
+                if game.get_score() != event.score:
+                    raise ValueError("game %d: score %d after replaying %s" % (event.game_id, game.get_score(), event))
+
+            if event.game_id in pending:
+                size, atom_count, board_class, atoms = pending[event.game_id]
+                if len(atoms) == atom_count:
+                    del pending[event.game_id]
+                    games[event.game_id] = BlackBox.BlackBoxGame(atoms, board_class, size, game_id=event.game_id)
+
+        return games
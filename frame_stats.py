@@ -0,0 +1,74 @@
+# Description: rolling record of frame times for the pygame front end
+
+import collections
+import json
+
+# upper bounds of the histogram buckets, in milliseconds
+BUCKETS = [0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, 133, float("inf")]
+
+
+class FrameStats:
+    """
+    Represents the timings of the last frames: for each frame, the time spent handling events and updating the game, and the time spent rendering. Only the last window frames are kept, so it can run for as long as the game does.
+    """
+    def __init__(self, window=3600):
+        """
+        :param window: default parameter, number of frames kept
+        """
+        self._frames = collections.deque(maxlen=window)
+        self._count = 0
+
+    def record(self, update_time, render_time):
+        """
+        records one frame, times are in seconds
+        """
+        self._frames.append((update_time * 1000, render_time * 1000))
+        self._count += 1
+
+    def get_histogram(self, index):
+        """
+        counts the kept frames in each bucket
+        :param index: 0 for the update times, 1 for the render times
+        :return: list of counts, one for each bound in BUCKETS
+        """
+        counts = [0] * len(BUCKETS)
+        for frame in self._frames:
+            for i, bound in enumerate(BUCKETS):
+                if frame[index] <= bound:
+                    counts[i] += 1
+                    break
+
+        return counts
+
+    def get_summary(self, index):
+        """
+        returns the percentiles of the kept update (index 0) or render (index 1) times in milliseconds
+        """
+        times = sorted(frame[index] for frame in self._frames)
+        if not times:
+            return {}
+
+        def percentile(fraction):
+            return round(times[min(len(times) - 1, int(fraction * len(times)))], 3)
+
+        return {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99), "max": round(times[-1], 3)}
+
+    def get_report(self):
+        """
+        takes no parameters and returns a dictionary of the histograms and percentiles
+        """
+        bounds = [str(bound) for bound in BUCKETS]
+        return {
+            "frames": self._count,
+            "window": len(self._frames),
+            "bucket_ms": bounds,
+            "update": {"histogram": self.get_histogram(0), "summary": self.get_summary(0)},
+            "render": {"histogram": self.get_histogram(1), "summary": self.get_summary(1)},
+        }
+
+    def dump(self, path):
+        """
+        writes the report to a JSON file
+        """
+        with open(path, "w") as report_file:
+            json.dump(self.get_report(), report_file, indent=2)
@@ -0,0 +1,228 @@
+# Description: generates reproducible streams of vetted atom layouts (puzzles) in a pool of worker processes
+#
+#   python generator.py --count 100000 --seed 7 --output puzzles.jsonl
+#
+# A layout is kept if no other layout with the same number of atoms sends every ray to the same exit, so the
+# player can tell it apart with enough rays, and if its difficulty is within the requested range. Each output
+# line is {"atoms": [[row, col], ...], "size": n, "difficulty": d}, lines without a size are for a 10 x 10 board.
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+
+import numpy as np
+
+import BlackBox
+import signatures
+from signatures import get_rank
+
+# state of a pool worker, set once by init_worker instead of being sent with every task
+_worker = {}
+
+
+def get_signature_counts(atom_count=4, size=10, cache_path=None, chunk=50000, index=None):
+    """
+    counts, for each layout, the layouts that send every ray to the same exit. Without an index every ray is traced on every layout, which takes about 20 seconds for 4 atoms on a size 10 board.
+    :param cache_path: default parameter, .npy file the counts are loaded from if it exists, and saved to otherwise
+    :param chunk: default parameter, number of layouts traced at once
+    :param index: default parameter, signatures.SignatureIndex of the same atom count and size to read the signatures from instead of tracing
+    :return: array of counts indexed by get_rank, 1 for the layouts no other layout can be mistaken for
+    """
+    if cache_path is not None and os.path.exists(cache_path):
+        return np.load(cache_path)
+
+    if index is not None:
+        if (index.get_atom_count(), index.get_size()) != (atom_count, size):
+            raise ValueError("the index does not hold layouts of %d atoms on a size %d board" % (atom_count, size))
+        rows = index.get_array()
+        ranks = None
+    else:
+        blocks = list(signatures.iter_signatures(atom_count, size, chunk))
+        ranks = np.concatenate([block[0] for block in blocks])
+        rows = np.concatenate([block[1] for block in blocks])
+
+    keys = np.ascontiguousarray(rows).view(np.dtype((np.void, rows.shape[1]))).ravel()
+    inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)[1:]
+    del keys, rows
+    by_rank = counts[inverse.ravel()].astype(np.uint32)
+    if ranks is not None:  # traced layouts come in combinations order, not rank order
+        ordered = np.empty_like(by_rank)
+        ordered[ranks] = by_rank
+        by_rank = ordered
+
+    if cache_path is not None:
+        np.save(cache_path, by_rank)
+    return by_rank
+
+
+def get_difficulty(board):
+    """
+    rates a layout between 0 and 1 from its ray outcomes: the share of the rays that come out neither where they went in nor straight across. Hits, reflections and straight rays tell the player directly where atoms are or are not, the rays that turn have to be worked out.
+    :param board: Board object of the layout
+    """
+    last = board.get_size() - 1
+    exits = board.get_exits()
+    turned = 0
+    for (row, col), exit in exits.items():
+        if exit is None or exit == (row, col):
+            continue
+        straight = (last - row, col) if row in (0, last) else (row, last - col)
+        if exit != straight:
+            turned += 1
+
+    return turned / len(exits)
+
+
+def vet(layout, counts, size=10, min_difficulty=0.0, max_difficulty=1.0):
+    """
+    checks a layout against the filters
+    :param counts: array returned by get_signature_counts, or None to keep layouts other layouts can be mistaken for
+    :return: the difficulty of the layout, or None if it is filtered out
+    """
+    if counts is not None and counts[get_rank(layout, size)] != 1:
+        return None
+
+    difficulty = get_difficulty(BlackBox.BitBoard(layout, size))
+    if not min_difficulty <= difficulty <= max_difficulty:
+        return None
+    return difficulty
+
+
+def init_worker(counts, seed, atom_count, size, min_difficulty, max_difficulty, chunk_size):
+    """
+    stores the generator parameters in a pool worker
+    """
+    _worker.update(counts=counts, seed=seed, atom_count=atom_count, size=size, min_difficulty=min_difficulty,
+                   max_difficulty=max_difficulty, chunk_size=chunk_size)
+
+
+def generate_chunk(index):
+    """
+    draws chunk_size random layouts and vets them, used as the task of a pool worker. Every chunk has its own random stream, seeded from the seed and the chunk index, so the output does not depend on the number of workers or on which worker runs which chunk.
+    :return: list of (layout, difficulty) of the layouts kept
+    """
+    size = _worker["size"]
+    rng = random.Random("%d:%d" % (_worker["seed"], index))
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    kept = []
+    for _ in range(_worker["chunk_size"]):
+        layout = sorted(rng.sample(squares, _worker["atom_count"]))
+        difficulty = vet(layout, _worker["counts"], size, _worker["min_difficulty"], _worker["max_difficulty"])
+        if difficulty is not None:
+            kept.append((layout, difficulty))
+
+    return kept
+
+
+def generate(count, seed=0, atom_count=4, size=10, min_difficulty=0.0, max_difficulty=1.0, unique=True,
+             processes=None, chunk_size=256, counts=None, max_chunks=None):
+    """
+    generates vetted layouts, the same arguments always give the same layouts in the same order. Fewer than count layouts are generated if the filters keep fewer than that among the layouts drawn in max_chunks chunks.
+    :param count: number of layouts, each is yielded once
+    :param unique: default parameter, if True only layouts no other layout can be mistaken for are kept
+    :param processes: default parameter, number of worker processes, all cpus if None, 1 generates in this process
+    :param chunk_size: default parameter, number of layouts drawn by each task
+    :param counts: default parameter, array returned by get_signature_counts, computed here if unique and None
+    :param max_chunks: default parameter, number of chunks after which it stops, if None enough to draw three times as many layouts as there are, which finds about 95% of the layouts the filters keep
+    :return: generator of (layout, difficulty), layouts are sorted lists of (row, col) tuples
+    """
+    if min_difficulty > max_difficulty:
+        raise ValueError("min_difficulty %s is above max_difficulty %s" % (min_difficulty, max_difficulty))
+    if max_chunks is None:
+        max_chunks = -(-3 * math.comb((size - 2) ** 2, atom_count) // chunk_size)
+    if unique and counts is None:
+        counts = get_signature_counts(atom_count, size)
+    args = (counts if unique else None, seed, atom_count, size, min_difficulty, max_difficulty, chunk_size)
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    seen = set()
+
+    def take(found):
+        for layout, difficulty in found:
+            key = tuple(layout)
+            if key not in seen and len(seen) < count:
+                seen.add(key)
+                yield layout, difficulty
+
+    if processes == 1:
+        init_worker(*args)
+        for index in range(max_chunks):
+            if len(seen) >= count:
+                return
+            yield from take(generate_chunk(index))
+        return
+
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=args) as pool:
+        batch = processes * 4  # chunks handed to the pool at a time, so it never runs far past count
+        for start in range(0, max_chunks, batch):
+            for found in pool.imap(generate_chunk, range(start, min(start + batch, max_chunks))):
+                yield from take(found)
+            if len(seen) >= count:
+                return
+
+
+def load_puzzles(path, atom_count=None, size=None):
+    """
+    reads the layouts written by this module, raises ValueError if one is not for the given atom count and board size
+    :param atom_count: default parameter, number of atoms every layout must have, any if None
+    :param size: default parameter, board size every layout must be for, any if None
+    :return: list of layouts, each a list of (row, col) tuples
+    """
+    layouts = []
+    with open(path) as puzzle_file:
+        for number, line in enumerate(puzzle_file, 1):
+            if not line.strip():
+                continue
+            puzzle = json.loads(line)
+            layout = [tuple(pos) for pos in puzzle["atoms"]]
+            puzzle_size = puzzle.get("size", 10)
+            if (atom_count is not None and len(layout) != atom_count) or (size is not None and puzzle_size != size):
+                raise ValueError("%s line %d: a puzzle of %d atoms on a board of size %d does not fit a game of %s atoms "
+                                 "on a board of size %s" % (path, number, len(layout), puzzle_size,
+                                                            atom_count or "any", size or "any"))
+            layouts.append(layout)
+
+    return layouts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BlackBox puzzle generator")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--atoms", type=int, default=4)
+    parser.add_argument("--size", type=int, default=10)
+    parser.add_argument("--min-difficulty", type=float, default=0.0)
+    parser.add_argument("--max-difficulty", type=float, default=1.0)
+    parser.add_argument("--allow-ambiguous", action="store_true", help="keep layouts other layouts can be mistaken for")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--max-chunks", type=int, default=None, help="chunks drawn before giving up on reaching count")
+    parser.add_argument("--counts-cache", help=".npy file the signature counts are kept in between runs")
+    parser.add_argument("--index", help="signature index built by signatures.py, read instead of tracing every layout")
+    parser.add_argument("--output", help="file the layouts are written to, printed if not given")
+    args = parser.parse_args()
+
+    counts = None
+    if not args.allow_ambiguous:
+        index = signatures.SignatureIndex(args.index) if args.index else None
+        counts = get_signature_counts(args.atoms, args.size, args.counts_cache, index=index)
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    written = 0
+    try:
+        for layout, difficulty in generate(args.count, args.seed, args.atoms, args.size, args.min_difficulty,
+                                           args.max_difficulty, not args.allow_ambiguous, args.processes,
+                                           args.chunk_size, counts, args.max_chunks):
+            output.write(json.dumps({"atoms": layout, "size": args.size, "difficulty": round(difficulty, 4)}) + "\n")
+            written += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if written < args.count:
+        print("only %d layouts pass the filters, %d were asked for" % (written, args.count), file=sys.stderr)
@@ -0,0 +1,276 @@
+# Description: probability that each square holds an atom given the rays shot so far, computed in a worker process
+#
+# The front end sends the rays shot so far with a version number each time they change, and polls for the
+# probabilities without ever waiting. The worker only works on the newest rays it was sent, and results for an
+# older version are dropped when they arrive. With a signature index (see signatures.py) of the same atom count
+# and board size, the probabilities are exact over every layout; without one they are estimated from a growing
+# sample of the layouts that explain the rays.
+
+import itertools
+import math
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+import numpy as np
+
+import signatures
+import solver
+
+STOP = None  # request that ends the worker
+RESULT_INTERVAL = 0.25  # seconds after which a growing sample sends its probabilities again
+RESULT_GROWTH = 1.5  # a growing sample also sends them once it holds this many times the layouts of the last result
+
+
+class LayoutTable:
+    """
+    Represents every layout of an index with a mask of the ones that explain the rays so far. Rays shot after the last update are applied to the mask, so each new ray costs one comparison over one column of the index. Rays taken back (by undo) start the mask over.
+    """
+    def __init__(self, index):
+        """
+        :param index: signatures.SignatureIndex object
+        """
+        self._size = index.get_size()
+        self._rows = np.array(index.get_array())  # read once, the columns are compared for every ray
+        # row * size + col passes 255 on boards larger than 16 x 16, an index holds boards of up to 65 x 65 (see signatures.HIT)
+        self._squares = np.empty((len(index), index.get_atom_count()), dtype=np.uint16)
+        inner = self._size - 2
+        for ranks, block in signatures.iter_layouts(index.get_atom_count(), self._size):
+            self._squares[ranks] = (block // inner + 1) * self._size + block % inner + 1  # row * size + col
+        self._columns = {entry: i for i, entry in enumerate(index.get_entries())}
+        self._codes = dict(self._columns)
+        self._codes[None] = signatures.HIT
+        self._observations = []
+        self._mask = np.ones(len(index), dtype=bool)
+
+    def set_observations(self, observations):
+        """
+        :param observations: list of distinct (entry, exit) pairs, in the order the rays were shot
+        """
+        if observations[:len(self._observations)] != self._observations:
+            self._observations = []
+            self._mask = np.ones(len(self._rows), dtype=bool)
+
+        for entry, exit in observations[len(self._observations):]:
+            self._mask &= self._rows[:, self._columns[entry]] == self._codes[exit]
+        self._observations = list(observations)
+
+    def get_probabilities(self):
+        """
+        :return: tuple (list of size * size probabilities indexed by row * size + col, number of layouts)
+        """
+        count = int(self._mask.sum())
+        if not count:
+            return [0.0] * (self._size * self._size), 0
+        counts = np.bincount(self._squares[self._mask].ravel(), minlength=self._size * self._size)
+        return (counts / count).tolist(), count
+
+
+class LayoutSampler:
+    """
+    Represents a sample of distinct layouts that explain the rays so far, grown a batch at a time by trying random layouts and layouts one atom away from the ones already found, the same way as advisor.Advisor. New rays drop the samples they rule out, rays taken back start the sample over. Once the rays leave few enough candidate squares, every layout of them is checked instead, so late in a game the probabilities are exact.
+    """
+    def __init__(self, atom_count=4, size=10, max_samples=3000, max_tries=50000, exact_limit=20000, seed=0):
+        """
+        :param max_samples: default parameter, number of samples after which the estimate is final
+        :param max_tries: default parameter, number of layouts tried for the same rays after which the estimate is final
+        :param exact_limit: default parameter, number of layouts of the candidate squares below which they are all checked
+        """
+        self._atom_count = atom_count
+        self._size = size
+        self._max_samples = max_samples
+        self._max_tries = max_tries
+        self._tries = 0
+        self._exact_limit = exact_limit
+        self._exact = False
+        self._rng = random.Random(seed)
+        self._observations = []
+        self._candidates = solver.get_candidate_squares([], size)
+        self._samples = {}  # sorted tuple of atoms -> None, kept in a dict so a random one can be drawn from _order
+        self._order = []
+
+    def set_observations(self, observations):
+        if observations[:len(self._observations)] != self._observations:
+            self._observations = []
+            self._order = []
+
+        new = observations[len(self._observations):]
+        self._order = [layout for layout in self._order if solver.is_consistent(list(layout), new, self._size)]
+        self._samples = dict.fromkeys(self._order)
+        self._observations = list(observations)
+        self._candidates = solver.get_candidate_squares(self._observations, self._size)
+        self._tries = 0
+
+        self._exact = math.comb(len(self._candidates), self._atom_count) <= self._exact_limit
+        if self._exact:
+            self._order = [layout for layout in itertools.combinations(self._candidates, self._atom_count)
+                           if solver.is_consistent(list(layout), self._observations, self._size)]
+            self._samples = dict.fromkeys(self._order)
+
+    def get_sample_count(self):
+        return len(self._samples)
+
+    def is_final(self):
+        return self._exact or len(self._samples) >= self._max_samples or self._tries >= self._max_tries
+
+    def draw(self, tries=200):
+        """
+        tries more layouts and keeps the new ones that explain every ray
+        """
+        if self._exact:
+            return
+        self._tries += tries
+        for _ in range(tries):
+            if self._samples and self._rng.random() < 0.5:
+                layout = list(self._rng.choice(self._order))
+                square = self._rng.choice(self._candidates)
+                if square in layout:
+                    continue
+                layout[self._rng.randrange(len(layout))] = square
+            else:
+                layout = self._rng.sample(self._candidates, self._atom_count)
+            key = tuple(sorted(layout))
+            if key not in self._samples and solver.is_consistent(layout, self._observations, self._size):
+                self._samples[key] = None
+                self._order.append(key)
+
+    def get_probabilities(self):
+        counts = [0] * (self._size * self._size)
+        for layout in self._samples:
+            for row, col in layout:
+                counts[row * self._size + col] += 1
+        if not self._samples:
+            return [0.0] * len(counts), 0
+        return [count / len(self._samples) for count in counts], len(self._samples)
+
+
+def open_model(index_path, atom_count, size):
+    """
+    returns a LayoutTable if the index file exists and holds layouts of atom_count atoms on a board of this size, otherwise a LayoutSampler
+    """
+    if index_path and os.path.exists(index_path):
+        with signatures.SignatureIndex(index_path) as index:
+            if (index.get_atom_count(), index.get_size()) == (atom_count, size):
+                return LayoutTable(index)
+    return LayoutSampler(atom_count, size)
+
+
+def run_worker(requests, results, index_path, atom_count, size):
+    """
+    answers requests until STOP, the body of the worker process
+    :param requests: queue of (version, observations) or STOP
+    :param results: queue the (version, probabilities, number of layouts, final) tuples are put on, final is False while a sample is still growing. A growing sample only sends a result every RESULT_INTERVAL seconds or once it grew by RESULT_GROWTH, so the front end does not unpickle one after every batch.
+    """
+    model = open_model(index_path, atom_count, size)
+    version = None
+    final = True
+    sent_at = 0.0
+    sent_count = 0
+    while True:
+        try:
+            request = requests.get(block=final)  # a growing sample keeps working until a request comes
+        except queue.Empty:
+            request = False
+        if request is not False:
+            while True:  # only the newest request is worth answering
+                if request is STOP:
+                    return
+                try:
+                    request = requests.get_nowait()
+                except queue.Empty:
+                    break
+            version, observations = request
+            model.set_observations(observations)
+
+        if isinstance(model, LayoutSampler):
+            model.draw()
+            final = model.is_final()
+            count = model.get_sample_count()
+            grown = count > sent_count and count >= sent_count * RESULT_GROWTH
+            if request is False and not final and not grown and time.monotonic() - sent_at < RESULT_INTERVAL:
+                continue  # the result of a new request and the final one are always sent
+        probabilities, count = model.get_probabilities()
+        results.put((version, probabilities, count, final))
+        sent_at = time.monotonic()
+        sent_count = count
+
+
+class Heatmap:
+    """
+    Represents the front end's side of the worker process. update and poll never wait on the worker, so they can be called from the render loop.
+    """
+    def __init__(self, atom_count=4, size=10, index_path=None):
+        """
+        :param index_path: default parameter, signature index built by signatures.py, the probabilities are estimated without one
+        """
+        self._size = size
+        # a spawned worker would run main.py again to import it, so fork is used where there is fork
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        self._requests = context.Queue()
+        self._results = context.Queue()
+        self._process = context.Process(target=run_worker, daemon=True,
+                                        args=(self._requests, self._results, index_path, atom_count, size))
+        self._process.start()
+        self._version = 0
+        self._observations = None
+        self._probabilities = None  # of the current version, None until its first result arrives
+        self._count = 0
+        self._final = True
+
+    def update(self, game):
+        """
+        sends the rays of a game to the worker if they changed since the last call, the probabilities of the old rays are forgotten
+        :param game: BlackBoxGame object
+        """
+        observations = solver.get_observations(game)
+        if observations == self._observations:
+            return
+        self._observations = observations
+        self._version += 1
+        self._probabilities = None
+        self._final = False
+        self._requests.put((self._version, observations))
+
+    def poll(self):
+        """
+        takes the results that arrived, without waiting
+        :return: True if the probabilities changed, otherwise False
+        """
+        changed = False
+        while True:
+            try:
+                version, probabilities, count, final = self._results.get_nowait()
+            except queue.Empty:
+                return changed
+            if version != self._version:
+                continue  # computed for rays that have changed since
+            self._probabilities, self._count, self._final = probabilities, count, final
+            changed = True
+
+    def is_pending(self):
+        """
+        takes no parameters and returns True until the final probabilities of the current rays have arrived
+        """
+        return not self._final
+
+    def get_probability(self, row, col):
+        """
+        returns the probability that a square holds an atom, None if it is not known yet
+        """
+        if self._probabilities is None:
+            return None
+        return self._probabilities[row * self._size + col]
+
+    def get_layout_count(self):
+        return self._count
+
+    def close(self):
+        self._requests.put(STOP)
+        self._process.join(1)
+        if self._process.is_alive():
+            self._process.terminate()
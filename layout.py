@@ -0,0 +1,100 @@
+# Description: arithmetic mapping between screen coordinates and board squares, and a grid for finding the widget under a point
+
+class BoardLayout:
+    """
+    Represents where a board of size x size square tiles is drawn on screen. Screen coordinates and board positions are converted with one division or multiplication instead of searching the tiles.
+    """
+    def __init__(self, x, y, width, height, size=10):
+        """
+        :param x, y: screen coordinates of the top left of the board
+        :param width, height: size of the board on screen in pixels
+        :param size: default parameter, number of tiles on each side
+        """
+        self._x = x
+        self._y = y
+        self._size = size
+        self._tile_w = width // size
+        self._tile_h = height // size
+
+    def get_tile_size(self):
+        return (self._tile_w, self._tile_h)
+
+    def to_board(self, pos):
+        """
+        takes screen coordinates and returns the (row, col) of the tile they fall in, rows and cols outside the board are negative or size and above
+        """
+        return ((pos[1] - self._y) // self._tile_h, (pos[0] - self._x) // self._tile_w)
+
+    def to_screen(self, row, col):
+        """
+        returns the screen coordinates of the top left of a tile
+        """
+        return (self._x + col * self._tile_w, self._y + row * self._tile_h)
+
+    def get_tile(self, pos):
+        """
+        returns the (row, col) of the tile under the screen coordinates, or None if they are off the board
+        """
+        row, col = self.to_board(pos)
+        if 0 <= row < self._size and 0 <= col < self._size:
+            return (row, col)
+        return None
+
+    def is_corner(self, tile):
+        last = self._size - 1
+        return tile[0] in (0, last) and tile[1] in (0, last)
+
+
+class HitGrid:
+    """
+    Represents the widgets of a screen for hit testing. The screen is cut into square cells, and each cell lists the widgets whose rect overlaps it, so finding the widget under a point only tests the few widgets of one cell however many widgets there are.
+    """
+    def __init__(self, width, height, cell_size=32):
+        """
+        :param width, height: size of the screen in pixels
+        :param cell_size: default parameter, side of a cell in pixels
+        """
+        self._cell_size = cell_size
+        self._cols = (width + cell_size - 1) // cell_size
+        self._rows = (height + cell_size - 1) // cell_size
+        self._cells = [[] for _ in range(self._cols * self._rows)]  # widgets of each cell, the last added first
+        self._rects = {}  # widget -> rect
+
+    def get_cells(self, rect):
+        """
+        returns the indexes of the cells a rect overlaps
+        """
+        first_col = max(0, rect.left // self._cell_size)
+        last_col = min(self._cols - 1, (rect.right - 1) // self._cell_size)
+        first_row = max(0, rect.top // self._cell_size)
+        last_row = min(self._rows - 1, (rect.bottom - 1) // self._cell_size)
+        return [row * self._cols + col for row in range(first_row, last_row + 1)
+                for col in range(first_col, last_col + 1)]
+
+    def add(self, widget, rect):
+        """
+        registers a widget, it is found before the widgets added earlier where their rects overlap
+        :param rect: pygame.Rect of the points that are over the widget
+        """
+        if widget in self._rects:
+            self.remove(widget)
+        self._rects[widget] = rect
+        for index in self.get_cells(rect):
+            self._cells[index].insert(0, widget)
+
+    def remove(self, widget):
+        for index in self.get_cells(self._rects.pop(widget)):
+            self._cells[index].remove(widget)
+
+    def get_widget(self, pos):
+        """
+        returns the widget under a point, or None
+        """
+        col = pos[0] // self._cell_size
+        row = pos[1] // self._cell_size
+        if not (0 <= col < self._cols and 0 <= row < self._rows):
+            return None
+        for widget in self._cells[row * self._cols + col]:
+            if self._rects[widget].collidepoint(pos):
+                return widget
+        return None
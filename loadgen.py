@@ -0,0 +1,122 @@
+# Description: load generator for server.py, reports requests per second and latency percentiles
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import server
+
+
+def percentile(values, fraction):
+    """
+    returns the value below which the given fraction of the sorted values fall
+    """
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(fraction * len(values)))
+    return values[index]
+
+
+async def run_connection(host, port, games, pipeline, deadline, seed, latencies):
+    """
+    opens one connection, creates games on it and keeps up to pipeline requests in flight until the deadline
+    :param latencies: list the latency of every answered request is appended to, in seconds
+    :return: number of requests answered
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    sent = {}  # request id -> time it was sent
+    next_id = 0
+
+    def send(request):
+        nonlocal next_id
+        next_id += 1
+        request["id"] = next_id
+        sent[next_id] = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b"\n")
+
+    async def receive():
+        answer = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - sent.pop(answer["id"]))
+        return answer
+
+    game_ids = []
+    for _ in range(games):
+        send({"op": "create"})
+        game_ids.append((await receive())["result"])
+
+    done = 0
+    ops = ["shoot", "shoot", "shoot", "guess", "score", "status"]
+    while time.perf_counter() < deadline:
+        for _ in range(pipeline - len(sent)):
+            op = rng.choice(ops)
+            side = rng.randrange(4)
+            i = rng.randint(1, 8)
+            row, col = [(0, i), (9, i), (i, 0), (i, 9)][side] if op == "shoot" else (i, rng.randint(1, 8))
+            send({"op": op, "game": rng.choice(game_ids), "row": row, "col": col})
+        await writer.drain()
+        await receive()
+        done += 1
+
+    while sent:
+        await receive()
+        done += 1
+
+    for game_id in game_ids:
+        send({"op": "close", "game": game_id})
+        await receive()
+
+    writer.close()
+    await writer.wait_closed()
+    return done
+
+
+async def run(host, port, connections, games, pipeline, duration, seed):
+    """
+    runs the load and returns a dictionary with the request rate and latency percentiles in milliseconds
+    """
+    latencies = []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(run_connection(host, port, games, pipeline, deadline, seed + i, latencies)
+                                    for i in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "connections": connections,
+        "games": connections * games,
+        "requests": sum(counts),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(sum(counts) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(percentile(latencies, 1.0) * 1000, 3),
+    }
+
+
+async def main(args):
+    local = None
+    host, port = args.host, args.port
+    if port == 0:  # no server given, start one in this process on a free localhost port
+        local = server.GameServer()
+        await local.start("127.0.0.1", 0)
+        host, port = "127.0.0.1", local.get_port()
+
+    report = await run(host, port, args.connections, args.games, args.pipeline, args.duration, args.seed)
+    if local is not None:
+        await local.stop()
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="load generator for the BlackBoxGame server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="server port, 0 starts a server in this process")
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--games", type=int, default=10, help="games per connection")
+    parser.add_argument("--pipeline", type=int, default=8, help="requests in flight per connection")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
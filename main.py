@@ -1,6 +1,14 @@
+import os
+import time
 import pygame
 import BlackBox
 import random
+from assets import AssetManager
+from atlas import SpriteAtlas
+from layout import BoardLayout, HitGrid
+from renderer import DirtyRenderer
+from frame_stats import FrameStats, BUCKETS
+import metrics
 
 # colors:
 white = (255, 255, 255)
@@ -19,27 +27,33 @@ HEIGHT = 400
 tile_size = WIDTH // 10
 button_align_w = 500
 button_align_h = 150
-
-# images and surfaces
-w_page = pygame.image.load("welcomebg.jpg")
-about_image = pygame.image.load("aboutpage.jpg")
-flower_outline = pygame.image.load("outlineflower.png")
-atom = pygame.image.load("smallflower.png")  # "Icon made by Freepik from www.flaticon.com"
-atom = pygame.transform.scale(atom, (WIDTH // 10 - 4, HEIGHT // 10 - 4))
-wrong = pygame.image.load("wrong.png")  # "Icon made by Pixelmeetup from www.flaticon.com"
-wrong = pygame.transform.scale(wrong, (WIDTH // 10 - 4, HEIGHT // 10 - 4))
-correct = pygame.image.load("correct.png")  # "Icon made by Pixelmeetup from www.flaticon.com"
-correct = pygame.transform.scale(correct, (WIDTH // 10 - 4, HEIGHT // 10 - 4))
-gray_out_atom = pygame.Surface((WIDTH // 10, HEIGHT // 10))
-gray_out_atom.set_alpha(128)
-gray_out_atom.fill(white)
+max_fps = 60  # frame rate cap while the screen keeps changing
+idle_timeout = 1000  # milliseconds the loop sleeps waiting for an event when nothing changes
+intro_time = 500  # milliseconds the welcome page is shown at least, a click or a key press skips it
+marker_size = (WIDTH // 10 - 4, HEIGHT // 10 - 4)
+
+# images and surfaces, the image files are loaded by assets when they are first drawn
+# smallflower.png: "Icon made by Freepik from www.flaticon.com"
+# wrong.png, correct.png: "Icon made by Pixelmeetup from www.flaticon.com"
+asset_dir = os.path.dirname(os.path.abspath(__file__))
+asset_cache = os.environ.get("BLACKBOX_ASSET_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "blackbox"))
+assets = AssetManager(asset_dir, asset_cache)
 main_bg_fill = pygame.Surface((WIDTH + 345, HEIGHT + 130))
 main_bg_fill.set_alpha(220)
 main_bg_fill.fill(screen_color)
-icon = pygame.image.load("smallflower.png")
 board_fill = pygame.Surface((WIDTH - tile_size, HEIGHT - tile_size))
 board_fill.set_alpha(200)
 board_fill.fill(white)
+static_layers = {}  # board position and size -> (background layer, grid layer), composited once
+grid_key = (255, 0, 255)  # transparent color of the grid layer
+sprites = None  # atlas of the markers, ray circles and hover overlays, built by get_sprites
+heat_color = win_color  # color of the tiles likely to hold an atom
+heat_levels = 16  # number of shades of the heatmap
+heatmap = None  # Heatmap of the rays shot so far, while the heatmap is shown, turned on and off with the h key
+puzzles = []  # layouts written by generator.py, read from the file named by BLACKBOX_PUZZLES
+if os.environ.get("BLACKBOX_PUZZLES"):
+    from generator import load_puzzles
+    puzzles = load_puzzles(os.environ["BLACKBOX_PUZZLES"], atom_count=4, size=10)  # the front end plays 4 atoms on 10 x 10
 
 
 class Button:
@@ -68,6 +82,10 @@ class Button:
     def get_height(self):
         return self._height
 
+    def get_rect(self):
+        # rect covered by the button and its outline
+        return pygame.Rect(self._x - 2, self._y - 2, self._width + 4, self._height + 4)
+
     def draw(self, win, outline=None):
         # Call this method to draw the button on the screen
         if outline:
@@ -81,6 +99,10 @@ class Button:
                 self._x + (self._width // 2 - text.get_width() // 2),
                 self._y + (self._height // 2 - text.get_height() // 2)))
 
+    def get_hit_rect(self):
+        # rect of the points is_over is true for, the edges are not part of it
+        return pygame.Rect(self._x + 1, self._y + 1, self._width - 1, self._height - 1)
+
     def is_over(self, pos):
         # Pos is the mouse position or a tuple of (x,y) coordinates
         if pos[0] > self._x and pos[0] < self._x + self._width:
@@ -102,62 +124,87 @@ class BoardDisplay:
         self._height = height
         self._tile_w = width // 10
         self._tile_h = height // 10
+        self._layout = BoardLayout(x, y, width, height)
         self._hover_active = True
         self._deflect_color = None
         self._end_game = False
 
+    def get_layers(self):
+        """
+        returns the background layer (background, flowers and colored border) and the grid layer, they are composited the first time a board of this position and size is drawn
+        """
+        key = (self._x, self._y, self._width, self._height)
+        if key not in static_layers:
+            background = screen.copy()
+            self.compose_background(background)
+            grid = screen.copy()
+            grid.fill(grid_key)
+            self.compose_grid(grid)
+            grid.set_colorkey(grid_key)
+            static_layers[key] = (background, grid)
+
+        return static_layers[key]
+
     def draw_board(self):
-        screen.fill(white)
-        screen.blit(flower_outline, (500, 5))
-        screen.blit(flower_outline, (-100, -150))
-        screen.blit(flower_outline, (100, 400))
-        screen.blit(main_bg_fill, (0, 0))
-        screen.blit(board_fill, (self._x + tile_size, self._y + tile_size))
+        screen.blit(self.get_layers()[0], (0, 0))
+
+    def compose_background(self, surface):
+        flower_outline = assets.get_image("outlineflower.png")
+        surface.fill(white)
+        surface.blit(flower_outline, (500, 5))
+        surface.blit(flower_outline, (-100, -150))
+        surface.blit(flower_outline, (100, 400))
+        surface.blit(main_bg_fill, (0, 0))
+        surface.blit(board_fill, (self._x + tile_size, self._y + tile_size))
 
         # color border
         top = pygame.Rect(self._x, self._y, self._width, self._height // 10)
         left = pygame.Rect(self._x, self._y, self._width // 10, self._height)
         bottom = pygame.Rect(self._x, self._y + self._height // 10 * 9, self._width, self._height // 10)
         right = pygame.Rect(self._x + self._width // 10 * 9, self._y, self._width // 10, self._height)
-        screen.fill(border, top)
-        screen.fill(border, left)
-        screen.fill(border, bottom)
-        screen.fill(border, right)
+        surface.fill(border, top)
+        surface.fill(border, left)
+        surface.fill(border, bottom)
+        surface.fill(border, right)
 
     def draw_grid(self):
+        screen.blit(self.get_layers()[1], (0, 0))
+
+    def compose_grid(self, surface):
         for i in range(11):
-            pygame.draw.line(screen, grid_color, [self._x + (i * self._width // 10), self._y],
+            pygame.draw.line(surface, grid_color, [self._x + (i * self._width // 10), self._y],
                              [self._x + (i * self._width // 10), self._y + self._height], 1)
-            pygame.draw.line(screen, grid_color, [self._x, (i * self._height // 10) + self._y],
+            pygame.draw.line(surface, grid_color, [self._x, (i * self._height // 10) + self._y],
                              [self._x + self._width, (i * self._width // 10) + self._y], 1)
 
     def show_guessed_atoms(self):
         """
         shows guess selection on board
         """
+        atlas = get_sprites()
+        markers = []  # drawn with one blits call, in this order
         if guess_box.get_pre_guesses() is not None:  # shows guesses before confirming
             for pre_guess in guess_box.get_pre_guesses():
-                coord_h = get_screen_coord("y", pre_guess[0])
-                coord_w = get_screen_coord("x", pre_guess[1])
-                screen.blit(atom, (coord_w + 3, coord_h + 3))
+                coord_w, coord_h = self._layout.to_screen(pre_guess[0], pre_guess[1])
+                markers.append(atlas.get_blit("atom", (coord_w + 3, coord_h + 3)))
 
         if game.get_guesses() is not None:  # shows guesses after confirming
             for pos in game.get_atoms():  # shows all flowers
-                coord_h = get_screen_coord("y", pos[0])
-                coord_w = get_screen_coord("x", pos[1])
+                coord_w, coord_h = self._layout.to_screen(pos[0], pos[1])
                 if pos in guess_box.get_pre_guesses():  # shows correct guess
-                    screen.blit(gray_out_atom, (coord_w + 3, coord_h + 3))
-                    screen.blit(correct, (coord_w + 3, coord_h + 3))
+                    markers.append(atlas.get_blit("gray_out", (coord_w + 3, coord_h + 3)))
+                    markers.append(atlas.get_blit("correct", (coord_w + 3, coord_h + 3)))
 
                 else:
-                    screen.blit(atom, (coord_w + 3, coord_h + 3))  # shows flower that wasn't guessed
+                    markers.append(atlas.get_blit("atom", (coord_w + 3, coord_h + 3)))  # shows flower that wasn't guessed
 
             for guess in game.get_guesses():  # shows wrong guesses
-                coord_h = get_screen_coord("y", guess[0])
-                coord_w = get_screen_coord("x", guess[1])
+                coord_w, coord_h = self._layout.to_screen(guess[0], guess[1])
                 if guess not in game.get_atoms():
-                    screen.blit(gray_out_atom, (coord_w + 3, coord_h + 3))
-                    screen.blit(wrong, (coord_w + 3, coord_h + 3))
+                    markers.append(atlas.get_blit("gray_out", (coord_w + 3, coord_h + 3)))
+                    markers.append(atlas.get_blit("wrong", (coord_w + 3, coord_h + 3)))
+
+        screen.blits(markers, False)
 
     def show_ray_hits(self):
         """
@@ -165,8 +212,7 @@ class BoardDisplay:
         """
         if game.get_hits() is not None:
             if len(game.get_hits()) > 0:
-                for hit in game.get_hits():
-                    self.draw_ray(hit[1], hit[0], black)
+                screen.blits([self.get_ray_blit(hit[1], hit[0], black) for hit in game.get_hits()], False)
 
     def show_ray_reflects(self):
         """
@@ -174,58 +220,49 @@ class BoardDisplay:
         """
         if game.get_reflects() is not None:
             if len(game.get_reflects()) > 0:
-                for reflect in game.get_reflects():
-                    self.draw_ray(reflect[1], reflect[0], white)
+                screen.blits([self.get_ray_blit(reflect[1], reflect[0], white) for reflect in game.get_reflects()], False)
 
     def show_deflect(self):
         """
         shows entry and exit of ray as random color if ray was deflected
         """
         if self._deflect_color is not None:
-            for pos in self._deflect_color:
-                self.draw_ray(pos[1], pos[0], self._deflect_color[pos])
+            screen.blits([self.get_ray_blit(pos[1], pos[0], self._deflect_color[pos]) for pos in self._deflect_color],
+                         False)
+
+    def get_hover_tile(self, pos):
+        """
+        finds the tile that gets the hover effect
+        :return: screen coordinates of the top left of the tile, or None if the mouse is not over a non-corner tile or hover is inactive
+        """
+        if self._hover_active is True:
+            tile = self._layout.get_tile(pos)
+            if tile is not None and not self._layout.is_corner(tile):
+                return self._layout.to_screen(tile[0], tile[1])
+
+        return None
 
     def show_hover(self, pos):
         """
         shows hover effect if mouse is over button or board
         """
-        w_start = 2000
-        h_start = 2000
-        tl = (self._x, self._y)
-        tr = (self._x + (9 * self._width // 10), self._y)
-        bl = (self._x, self._y + (9 * self._height // 10))
-        br = (self._x + (9 * self._width // 10), self._y + (9 * self._height // 10))
-        corner_coords = [tl, tr, bl, br]
-
-        if new_game_b.is_over(pos):
-            my_rect = pygame.Surface((new_game_b.get_width(), new_game_b.get_height()))
-            my_rect.set_alpha(50)
-            screen.blit(my_rect, (new_game_b.get_x(), new_game_b.get_y()))
-
-        if about_b.is_over(pos):
-            my_rect = pygame.Surface((about_b.get_width(), about_b.get_height()))
-            my_rect.set_alpha(50)
-            screen.blit(my_rect, (about_b.get_x(), about_b.get_y()))
+        atlas = get_sprites()
+        widget = widgets.get_widget(pos)
+        if widget is new_game_b:
+            atlas.blit(screen, ("hover", new_game_b.get_width(), new_game_b.get_height()),
+                       (new_game_b.get_x(), new_game_b.get_y()))
+
+        if widget is about_b or widget is back_to_game_b:
+            atlas.blit(screen, ("hover", about_b.get_width(), about_b.get_height()), (about_b.get_x(), about_b.get_y()))
 
         if self._hover_active is True:  # shows hover effect on board
-            for i in range(10):
-                if self._x + i * self._width // 10 <= pos[0] < self._x + (i + 1) * self._width // 10:
-                    w_start = self._x + i * self._width // 10
-                if self._y + i * self._height // 10 <= pos[1] < self._y + (i + 1) * self._height // 10:
-                    h_start = self._y + i * self._height // 10
-
-            if (w_start, h_start) not in corner_coords:
-                screen_w = pygame.display.get_surface().get_width()
-                screen_h = pygame.display.get_surface().get_height()
-                if w_start < screen_w and h_start < screen_h:
-                    my_rect = pygame.Surface((self._tile_w, self._tile_h))
-                    my_rect.set_alpha(50)
-                    screen.blit(my_rect, (w_start, h_start))
-
-            if make_guess_b.is_over(pos):
-                my_rect = pygame.Surface((make_guess_b.get_width(), make_guess_b.get_height()))
-                my_rect.set_alpha(50)
-                screen.blit(my_rect, (make_guess_b.get_x(), make_guess_b.get_y()))
+            hover_tile = self.get_hover_tile(pos)
+            if hover_tile is not None:
+                atlas.blit(screen, ("hover", self._tile_w, self._tile_h), hover_tile)
+
+            if widget is make_guess_b:
+                atlas.blit(screen, ("hover", make_guess_b.get_width(), make_guess_b.get_height()),
+                           (make_guess_b.get_x(), make_guess_b.get_y()))
 
     def inactive_hover(self):
         """
@@ -233,28 +270,106 @@ class BoardDisplay:
         """
         self._hover_active = False
 
-    def draw_ray(self, x, y, color):
+    def is_hover_active(self):
+        return self._hover_active
+
+    def get_ray_blit(self, x, y, color):
+        """
+        returns the blit of the circle on a ray entry or exit, used in show_ray_hits, show_deflects, and show_ray_reflect methods
+        """
+        coord_w, coord_h = self._layout.to_screen(y, x)
+        atlas = get_sprites()
+        if ("ray", color) not in atlas:
+            atlas.add(("ray", color), make_ray_sprite(color))
+        return atlas.get_blit(("ray", color), (coord_w, coord_h))
+
+    def release_sprites(self):
         """
-        draws circle on ray entries and exits, used in show_ray_hits, show_deflects, and show_ray_reflect methods
+        removes the circles of the deflection colors from the atlas, called when the board is replaced
         """
-        coord_h = get_screen_coord("y", y)
-        coord_w = get_screen_coord("x", x)
-        my_rect = pygame.Rect(coord_w, coord_h, self._tile_w, self._tile_h)
-        pygame.draw.rect(screen, border, my_rect)
-        pygame.draw.circle(screen, color,
-                           (coord_w + tile_size // 2, coord_h + tile_size // 2),
-                           tile_size // 2 - 5)
-        pygame.draw.circle(screen, black,
-                           (coord_w + tile_size // 2, coord_h + tile_size // 2),
-                           tile_size // 2 - 4, 1)
+        if self._deflect_color is not None and sprites is not None:
+            for color in set(self._deflect_color.values()) - {black, white}:
+                if ("ray", color) in sprites:
+                    sprites.remove(("ray", color))
+
+    def get_heat_level(self, row, col):
+        """
+        returns the shade of a tile in the heatmap, 0 when the heatmap is off, the game is over or the tile cannot hold an atom
+        """
+        if heatmap is None or self._end_game or not game.get_board().is_in_bound((row, col)):
+            return 0
+        probability = heatmap.get_probability(row, col)
+        if probability is None:
+            return 0
+        return min(heat_levels - 1, int(probability * heat_levels))
+
+    def show_heatmap(self):
+        """
+        shades every non-border tile by the probability that it holds an atom, given the rays shot so far
+        """
+        if heatmap is None or self._end_game:
+            return
+        atlas = get_sprites()
+        blits = []
+        for row in range(1, 9):
+            for col in range(1, 9):
+                level = self.get_heat_level(row, col)
+                if level:
+                    if ("heat", level) not in atlas:
+                        shade = pygame.Surface((self._tile_w, self._tile_h), pygame.SRCALPHA)
+                        shade.fill(heat_color + (level * 160 // (heat_levels - 1),))
+                        atlas.add(("heat", level), shade)
+                    blits.append(atlas.get_blit(("heat", level), self._layout.to_screen(row, col)))
+        screen.blits(blits, False)
 
     def update_board(self):
+        self.show_heatmap()
         self.show_guessed_atoms()
         self.show_ray_hits()
         self.show_ray_reflects()
         self.show_deflect()
         self.draw_grid()
 
+    def get_tile_keys(self, pos):
+        """
+        describes what is drawn on every tile, used by the renderer to find the tiles that changed
+        :param pos: mouse position
+        :return: dictionary of (row, col) -> tuple that changes whenever the drawing of the tile changes
+        """
+        hover_tile = self.get_hover_tile(pos)
+        pre_guesses = guess_box.get_pre_guesses() or []
+        revealed = game.get_guesses() is not None
+        guesses = game.get_guesses() or []
+        atoms = game.get_atoms()
+        hits = game.get_hits() or []
+        reflects = game.get_reflects() or []
+        deflects = self._deflect_color or {}
+
+        keys = {}
+        for row in range(10):
+            for col in range(10):
+                tile = (row, col)
+                # the last marker drawn covers the ones under it
+                if tile in deflects:
+                    marker = deflects[tile]
+                elif tile in reflects:
+                    marker = white
+                elif tile in hits:
+                    marker = black
+                else:
+                    marker = None
+                hover = hover_tile == (self._x + col * self._tile_w, self._y + row * self._tile_h)
+                keys[tile] = (hover, marker, tile in pre_guesses,
+                              revealed and tile in atoms, revealed and tile in guesses, self.get_heat_level(row, col))
+
+        return keys
+
+    def get_tile_rect(self, row, col):
+        """
+        returns the rect drawn on for a tile, the grayed out marker overlaps the next tiles by 3 pixels
+        """
+        return pygame.Rect(self._x + col * self._tile_w, self._y + row * self._tile_h, self._tile_w + 3, self._tile_h + 3)
+
     def get_x(self):
         return self._x
 
@@ -264,6 +379,12 @@ class BoardDisplay:
     def get_width(self):
         return self._width
 
+    def get_height(self):
+        return self._height
+
+    def get_layout(self):
+        return self._layout
+
     def set_deflect_color(self, pos, color):
         if self._deflect_color is None:
             self._deflect_color = {}
@@ -271,6 +392,23 @@ class BoardDisplay:
         if pos not in self._deflect_color:
             self._deflect_color[pos] = color
 
+    def sync_deflect_colors(self, rays):
+        """
+        keeps the colors of the squares of the deflected rays still in the game, after undo or redo took rays back or shot them again
+        :param rays: list of (entry, exit) returned by BlackBoxGame.get_rays
+        """
+        old = self._deflect_color or {}
+        colors = {}
+        for entry, exit in rays or []:
+            if exit is None or exit == entry:
+                continue
+            color = get_rand_color()
+            for pos in (entry, exit):
+                if pos not in colors:
+                    colors[pos] = old.get(pos, color)
+
+        self._deflect_color = colors or None
+
     def set_end_game(self, ended):
         self._end_game = ended
 
@@ -285,15 +423,17 @@ class AtomsBox:
         self._pre_guesses = None
         self._invalid_guess = False
 
+    def get_rect(self, x, y):
+        return pygame.Rect(x - 5, y - 5, tile_size * 4 - 5, tile_size + 5)
+
     def draw(self, x, y):
-        box = pygame.Rect(x - 5, y - 5, tile_size * 4 - 5, tile_size + 5)
+        box = self.get_rect(x, y)
         pygame.draw.rect(screen, white, box)
         pygame.draw.rect(screen, black, box, 2)
         if self._pre_guesses is not None:
             self._atoms_left = 4 - len(self._pre_guesses)
-        for i in range(self._atoms_left):
-            screen.blit(atom, (x, y))
-            x += atom.get_width()
+        atlas = get_sprites()
+        screen.blits([atlas.get_blit("atom", (x + i * marker_size[0], y)) for i in range(self._atoms_left)], False)
 
     def set_pre_guesses(self, pos):
         if self._pre_guesses is None:
@@ -311,10 +451,59 @@ class AtomsBox:
         self._invalid_guess = validity
 
 
+def make_ray_sprite(color):
+    """
+    draws the circle on a ray entry or exit on a surface of one tile
+    """
+    surface = pygame.Surface((tile_size, tile_size), pygame.SRCALPHA)
+    surface.fill(border)
+    pygame.draw.circle(surface, color, (tile_size // 2, tile_size // 2), tile_size // 2 - 5)
+    pygame.draw.circle(surface, black, (tile_size // 2, tile_size // 2), tile_size // 2 - 4, 1)
+    return surface
+
+
+def get_sprites():
+    """
+    returns the sprite atlas, the markers, the hit and reflect circles and the hover overlays are drawn into it the first time
+    """
+    global sprites
+    if sprites is None:
+        sprites = SpriteAtlas()
+        sprites.add("atom", assets.get_image("smallflower.png", marker_size))
+        sprites.add("wrong", assets.get_image("wrong.png", marker_size))
+        sprites.add("correct", assets.get_image("correct.png", marker_size))
+        gray_out_atom = pygame.Surface((tile_size, tile_size), pygame.SRCALPHA)
+        gray_out_atom.fill(white + (128,))
+        sprites.add("gray_out", gray_out_atom)
+        for color in (black, white):
+            sprites.add(("ray", color), make_ray_sprite(color))
+        for button in (new_game_b, make_guess_b, about_b):
+            size = (button.get_width(), button.get_height())
+            hover = pygame.Surface(size, pygame.SRCALPHA)
+            hover.fill(black + (50,))
+            sprites.add(("hover",) + size, hover)
+        hover = pygame.Surface((tile_size, tile_size), pygame.SRCALPHA)
+        hover.fill(black + (50,))
+        sprites.add(("hover", tile_size, tile_size), hover)
+
+    return sprites
+
+
+def start_heatmap(game):
+    """
+    starts the worker process of the heatmap for the atom count and board size of a game, it reads the signature index named by BLACKBOX_SIGNATURES if there is one. heatmap is imported here so numpy is only needed when the heatmap is shown.
+    """
+    from heatmap import Heatmap
+    return Heatmap(len(game.get_atoms()), game.get_board().get_size(), os.environ.get("BLACKBOX_SIGNATURES"))
+
+
 def get_init_pos():
     """
-    generates random flower positions on board
+    generates random flower positions on board, or picks a vetted layout if a puzzle file was loaded
     """
+    if puzzles:
+        return list(random.choice(puzzles))
+
     atoms_pos = []
     while len(atoms_pos) < 4:
         row = random.randint(1, 8)
@@ -335,57 +524,16 @@ def get_rand_color():
     return (R, G, B)
 
 
-def get_board_coord(x_or_y, screen_coord):
-    """
-    takes in screen coordinates and returns position on board
-    """
-    if x_or_y == "x":
-        start = game_board.get_x()
-    else:
-        start = game_board.get_y()
-    stop = start + game_board.get_width() // 10
-    found = False
-    board_coord = 0
-    while not found:
-        if screen_coord in range(start, stop):
-            found = True
-            return board_coord
-        else:
-            board_coord += 1
-            start = stop
-            stop += game_board.get_width() // 10
-
-
-def get_screen_coord(x_or_y, board_coord):
-    """ takes board position and returns screen coordinates"""
-    if x_or_y == "x":
-        screen_coord = game_board.get_x()
-    else:
-        screen_coord = game_board.get_y()
-
-    start = 0
-    stop = 1
-    found = False
-    while not found:
-        if board_coord in range(start, stop):
-            found = True
-            return screen_coord
-        else:
-            screen_coord += game_board.get_width() // 10
-            start = stop
-            stop += 1
-
-
 def eval_board_click(x, y):
     """evaluates mouse click"""
-    row = get_board_coord("y", y)
-    col = get_board_coord("x", x)
+    row, col = game_board.get_layout().to_board((x, y))
+    widget = widgets.get_widget((x, y))
     guess_box.set_invalid_guess(False)
     deflect_color = get_rand_color()
     # print("color", game_board._deflect_color)
 
     if not game_board.get_end_game() and not show_about:
-        if make_guess_b.is_over((x, y)):  # if guess button is clicked
+        if widget is make_guess_b:  # if guess button is clicked
             if guess_box.get_pre_guesses() is None or len(guess_box.get_pre_guesses()) < 4:
                 guess_box.set_invalid_guess(True)
             else:
@@ -395,7 +543,7 @@ def eval_board_click(x, y):
                 game_board.inactive_hover()  # disable hover
                 game_board.set_end_game(True)
         else:
-            if x < game_board.get_x() + game_board.get_width() and y < game_board.get_y() + game_board.get_width():
+            if widget == "board":
                 if game.get_board().is_in_bound((row, col)):
                     guess = (row, col)
                     if guess_box.get_pre_guesses() is None:
@@ -406,7 +554,7 @@ def eval_board_click(x, y):
                                 guess_box.set_pre_guesses(guess)
                         else:
                             guess_box.get_pre_guesses().remove(guess)
-                else:
+                elif not game_board.get_layout().is_corner((row, col)):
                     shoot = game.shoot_ray(row, col)
                     if shoot[0] != shoot[1] and shoot[1] is not None:  # set color for deflection
                         game_board.set_deflect_color(shoot[0], deflect_color)
@@ -420,13 +568,21 @@ def eval_board_click(x, y):
 
 
 def game_intro():
-    intro = True
+    """
+    shows the welcome page while the images that are not needed yet load in the background
+    """
+    assets.preload([("outlineflower.png", None), ("aboutpage.jpg", None)])
+    screen.blit(assets.get_image("welcomebg.jpg"), (0, 0))
+    pygame.display.update()
 
-    while intro:
-        screen.blit(w_page, (0, 0))
-        pygame.display.update()
-        pygame.time.wait(2000)
-        intro = False
+    end = pygame.time.get_ticks() + intro_time
+    while pygame.time.get_ticks() < end or assets.is_loading():
+        event = pygame.event.wait(max(10, end - pygame.time.get_ticks()))
+        if event.type == pygame.QUIT:
+            pygame.event.post(event)  # left for the main loop
+            return
+        if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
+            return
 
 
 def message_to_screen(msg, font, color, pos):
@@ -435,7 +591,7 @@ def message_to_screen(msg, font, color, pos):
 
 
 def about_page():
-    screen.blit(about_image, (0, 0))
+    screen.blit(assets.get_image("aboutpage.jpg"), (0, 0))
     back_to_game_b.draw(screen, black)
 
 
@@ -452,21 +608,72 @@ def draw_buttons():
     about_b.draw(screen, button_outline)
 
 
+def draw_frame(pos):
+    """
+    draws the whole frame, the renderer calls it with the screen clipped to the parts that changed
+    """
+    game_board.draw_board()
+    draw_buttons()
+    game_board.show_hover(pos)
+
+    if game.get_status() != "started":
+        message_to_screen(game.get_status(), win_font, black,
+                          (button_align_w - 15, button_align_h + 160))
+    else:
+        guess_box.draw(button_align_w + 28, button_align_h + 160)
+
+    if guess_box.invalid_guess() is True:
+        message_to_screen(invalid_msg, guess_font, black,
+                          (game_board.get_x(), game_board.get_y() + game_board.get_width() + 10))
+
+    game_board.update_board()
+
+    if show_about:
+        about_page()
+
+
+def get_regions(pos):
+    """
+    describes the screen for the renderer as named regions, each with a key that changes whenever what is drawn in the region changes, and the rect it covers
+    """
+    regions = {"about_page": (show_about, screen.get_rect())}
+
+    for tile, key in game_board.get_tile_keys(pos).items():
+        regions[tile] = (key, game_board.get_tile_rect(tile[0], tile[1]))
+
+    widget = widgets.get_widget(pos)
+    regions["new_game"] = (widget is new_game_b, new_game_b.get_rect())
+    regions["about"] = (widget is about_b or widget is back_to_game_b, about_b.get_rect())
+    regions["make_guess"] = (game_board.is_hover_active() and widget is make_guess_b, make_guess_b.get_rect())
+    regions["score"] = (update_score(), pygame.Rect(button_align_w - 2, button_align_h + 98, 204, 44))
+
+    if game.get_status() != "started":
+        status_pos = (button_align_w - 15, button_align_h + 160)
+        regions["status"] = (game.get_status(), pygame.Rect(status_pos, win_font.size(game.get_status())))
+    else:
+        pre_guesses = guess_box.get_pre_guesses() or []
+        regions["status"] = (len(pre_guesses), guess_box.get_rect(button_align_w + 28, button_align_h + 160))
+
+    invalid_pos = (game_board.get_x(), game_board.get_y() + game_board.get_width() + 10)
+    regions["invalid"] = (guess_box.invalid_guess(), pygame.Rect(invalid_pos, guess_font.size(invalid_msg)))
+
+    return regions
+
+
 pygame.init()
 
 game = BlackBox.BlackBoxGame(get_init_pos())
 game_board = BoardDisplay(50, 50, WIDTH, HEIGHT)
 
 # fonts
-font = pygame.font.Font("IndieFlower-Regular.ttf", 25)
-guess_font = pygame.font.Font("Raleway-Medium.ttf", 15)
-win_font = pygame.font.Font("IndieFlower-Regular.ttf", 30)
-about_font = pygame.font.Font("IndieFlower-Regular.ttf", 15)
-welcome_font = pygame.font.Font("IndieFlower-Regular.ttf", 75)
+font = assets.get_font("IndieFlower-Regular.ttf", 25)
+guess_font = assets.get_font("Raleway-Medium.ttf", 15)
+win_font = assets.get_font("IndieFlower-Regular.ttf", 30)
+about_font = assets.get_font("IndieFlower-Regular.ttf", 15)
 
 # title and icon
 pygame.display.set_caption("Black Box Game")
-pygame.display.set_icon(icon)
+pygame.display.set_icon(assets.load_image("smallflower.png"))
 
 # Buttons
 new_game_b = Button(button_background, button_align_w, button_align_h, 200, 40, font, "New Game")
@@ -474,52 +681,104 @@ make_guess_b = Button(button_background, button_align_w, button_align_h + 50, 20
 about_b = Button(button_background, WIDTH + 243, 2, 100, 20, about_font, "About")
 back_to_game_b = Button(button_background, WIDTH + 243, 2, 100, 20, about_font, "Back to Game")
 
+# hit testing, "board" stands for the tiles of whichever BoardDisplay is shown
+widgets = HitGrid(WIDTH + 345, HEIGHT + 130)
+widgets.add("board", pygame.Rect(game_board.get_x(), game_board.get_y(), game_board.get_width(), game_board.get_height()))
+for button in (new_game_b, make_guess_b, about_b, back_to_game_b):
+    widgets.add(button, button.get_hit_rect())
+
 # Flower box
 guess_box = AtomsBox(game_board)
+invalid_msg = "Place all four guesses on board before confirming guesses!"
 
 running = True
 
 intro = True
 show_about = False
 
-while running:
-    screen = pygame.display.set_mode((WIDTH + 345, HEIGHT + 130))
+screen = pygame.display.set_mode((WIDTH + 345, HEIGHT + 130))
+renderer = DirtyRenderer(screen)
+clock = pygame.time.Clock()
+frame_stats = FrameStats()
+metrics_path = os.environ.get("BLACKBOX_METRICS")  # file the engine and frame metrics are written to on exit, .prom for the Prometheus format
+frame_metrics = None
+if metrics_path:
+    metrics.instrument()
+    frame_buckets = [bound / 1000 for bound in BUCKETS]
+    frame_metrics = (
+        metrics.registry.histogram("blackbox_frame_update_seconds", "time handling the events of a frame", frame_buckets),
+        metrics.registry.histogram("blackbox_frame_render_seconds", "time rendering a frame", frame_buckets),
+    )
+animating = False  # True while the last frame changed something on screen
+if os.environ.get("BLACKBOX_HEATMAP"):
+    heatmap = start_heatmap(game)
 
+while running:
     if intro:
         game_intro()
         intro = False
+        renderer.invalidate()
+        animating = True
 
-    game_board.draw_board()
-    draw_buttons()
-    game_board.show_hover((pygame.mouse.get_pos()[0], pygame.mouse.get_pos()[1]))
-
-    if game.get_status() != "started":
-        message_to_screen(game.get_status(), win_font, black,
-                          (button_align_w - 15, button_align_h + 160))
+    if animating:
+        clock.tick(max_fps)  # caps the frame rate while the screen is changing
+        events = pygame.event.get()
     else:
-        guess_box.draw(button_align_w + 28, button_align_h + 160)
-
-    if guess_box.invalid_guess() is True:
-        message_to_screen("Place all four guesses on board before confirming guesses!", guess_font, black,
-                          (game_board.get_x(), game_board.get_y() + game_board.get_width() + 10))
+        events = [pygame.event.wait(idle_timeout)] + pygame.event.get()  # sleeps until something happens
+        clock.tick()
 
-    for event in pygame.event.get():
+    update_start = time.perf_counter()
+    for event in events:
         if event.type == pygame.QUIT:
             running = False
 
-        if pygame.mouse.get_pressed()[0]:
-            if new_game_b.is_over(pygame.mouse.get_pos()):
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            widget = widgets.get_widget(event.pos)
+            if widget is new_game_b:
+                game_board.release_sprites()
                 game = BlackBox.BlackBoxGame(get_init_pos())
                 game_board = BoardDisplay(50, 50, WIDTH, HEIGHT)
                 guess_box = AtomsBox(game_board)
-            elif about_b.is_over(pygame.mouse.get_pos()) or back_to_game_b.is_over(pygame.mouse.get_pos()):
+            elif widget is about_b or widget is back_to_game_b:
                 show_about = not show_about
             else:
-                eval_board_click(pygame.mouse.get_pos()[0], pygame.mouse.get_pos()[1])
+                eval_board_click(event.pos[0], event.pos[1])
 
-    game_board.update_board()
-
-    if show_about:
-        about_page()
-
-    pygame.display.update()
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_h and not event.mod & pygame.KMOD_CTRL:
+            if heatmap is None:
+                heatmap = start_heatmap(game)
+            else:
+                heatmap.close()
+                heatmap = None
+
+        # ctrl+z takes back the last ray, ctrl+y or ctrl+shift+z shoots it again, until the guesses are confirmed
+        if event.type == pygame.KEYDOWN and event.mod & pygame.KMOD_CTRL and not (show_about or game_board.get_end_game()):
+            changed = False
+            if event.key == pygame.K_z and not event.mod & pygame.KMOD_SHIFT:
+                changed = game.undo()
+            elif event.key in (pygame.K_y, pygame.K_z):
+                changed = game.redo()
+            if changed:
+                game_board.sync_deflect_colors(game.get_rays())
+
+    if heatmap is not None:
+        heatmap.update(game)
+        heatmap.poll()
+
+    render_start = time.perf_counter()
+    mouse_pos = pygame.mouse.get_pos()
+    animating = bool(renderer.render(get_regions(mouse_pos), lambda: draw_frame(mouse_pos)))
+    if heatmap is not None and heatmap.is_pending():
+        animating = True  # keeps polling every frame until the worker has answered
+    render_end = time.perf_counter()
+    frame_stats.record(render_start - update_start, render_end - render_start)
+    if frame_metrics is not None:
+        frame_metrics[0].observe(render_start - update_start)
+        frame_metrics[1].observe(render_end - render_start)
+
+if os.environ.get("BLACKBOX_FRAME_STATS"):  # path to write the frame time histograms to on exit
+    frame_stats.dump(os.environ["BLACKBOX_FRAME_STATS"])
+if metrics_path:
+    metrics.registry.dump(metrics_path)
+if heatmap is not None:
+    heatmap.close()
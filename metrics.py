@@ -0,0 +1,297 @@
+# Description: opt-in counters and latency histograms for the game engine and the pygame front end
+#
+# Nothing is measured until instrument() is called: it wraps the engine methods in place, and uninstrument()
+# puts the original methods back, so the engine runs its own code when metrics are off. The registry can be
+# written as JSON or as the Prometheus text format:
+#
+#   import metrics
+#   metrics.instrument()
+#   ...
+#   metrics.registry.dump("metrics.prom")
+
+import bisect
+import functools
+import json
+import math
+import os
+import time
+
+import BlackBox
+
+# upper bounds of the histogram buckets, the last bucket counts everything
+LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, float("inf"))  # seconds
+SQUARE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, float("inf"))  # squares checked by one ray
+
+
+class Counter:
+    """
+    Represents a number that only goes up, like the calls of a method
+    """
+    def __init__(self):
+        self._value = 0
+
+    def inc(self, amount=1):
+        self._value += amount
+
+    def get_value(self):
+        return self._value
+
+
+class Histogram:
+    """
+    Represents the distribution of observed values as counts in buckets with fixed upper bounds, plus their sum, so it takes the same memory however many values are observed
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        :param buckets: default parameter, increasing upper bounds, the last one should be infinity
+        """
+        self._bounds = tuple(buckets)
+        self._counts = [0] * len(self._bounds)
+        self._sum = 0
+        self._count = 0
+
+    def observe(self, value):
+        """
+        adds one value, a value above the last bound is counted in the last bucket
+        """
+        self._counts[min(bisect.bisect_left(self._bounds, value), len(self._bounds) - 1)] += 1
+        self._sum += value
+        self._count += 1
+
+    def get_bounds(self):
+        return self._bounds
+
+    def get_counts(self):
+        """
+        :return: list of the values in each bucket, not cumulative
+        """
+        return list(self._counts)
+
+    def get_sum(self):
+        return self._sum
+
+    def get_count(self):
+        return self._count
+
+
+class Registry:
+    """
+    Represents every metric of the program by name and labels. A metric is created the first time it is asked for and the same object is returned afterwards, so callers can keep it instead of looking it up on every use.
+    """
+    def __init__(self):
+        self._families = {}  # name -> (type, help text, {label tuple: metric})
+
+    def get_metric(self, kind, name, help_text, labels, make):
+        family = self._families.setdefault(name, (kind, help_text, {}))
+        if family[0] != kind:
+            raise ValueError("%s is already a %s" % (name, family[0]))
+        key = tuple(sorted(labels.items()))
+        if key not in family[2]:
+            family[2][key] = make()
+        return family[2][key]
+
+    def counter(self, name, help_text="", **labels):
+        """
+        returns the counter of a name and labels
+        :param labels: label names and values that tell apart the counters of one name, like board="BitBoard"
+        """
+        return self.get_metric("counter", name, help_text, labels, Counter)
+
+    def histogram(self, name, help_text="", buckets=LATENCY_BUCKETS, **labels):
+        """
+        returns the histogram of a name and labels, buckets is only used when it is created
+        """
+        return self.get_metric("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def reset(self):
+        """
+        removes every metric, the metrics kept by callers are no longer part of the registry
+        """
+        self._families.clear()
+
+    def get_snapshot(self):
+        """
+        takes no parameters and returns the current value of every metric as a dictionary that can be written as JSON
+        """
+        snapshot = {}
+        for name, (kind, help_text, series) in sorted(self._families.items()):
+            entries = []
+            for key, metric in sorted(series.items()):
+                entry = {"labels": dict(key)}
+                if kind == "counter":
+                    entry["value"] = metric.get_value()
+                else:
+                    entry["buckets"] = [str(bound) for bound in metric.get_bounds()]
+                    entry["counts"] = metric.get_counts()
+                    entry["sum"] = metric.get_sum()
+                    entry["count"] = metric.get_count()
+                entries.append(entry)
+            snapshot[name] = {"type": kind, "help": help_text, "series": entries}
+        return snapshot
+
+    def to_prometheus(self):
+        """
+        takes no parameters and returns every metric in the Prometheus text exposition format, histogram buckets are cumulative there
+        """
+        def format_labels(pairs):
+            if not pairs:
+                return ""
+            return "{%s}" % ",".join('%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                                     for key, value in pairs)
+
+        def format_bound(bound):
+            return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+        lines = []
+        for name, (kind, help_text, series) in sorted(self._families.items()):
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s %s" % (name, kind))
+            for key, metric in sorted(series.items()):
+                if kind == "counter":
+                    lines.append("%s%s %s" % (name, format_labels(key), metric.get_value()))
+                    continue
+                total = 0
+                for bound, count in zip(metric.get_bounds(), metric.get_counts()):
+                    total += count
+                    lines.append("%s_bucket%s %d" % (name, format_labels(key + (("le", format_bound(bound)),)), total))
+                lines.append("%s_sum%s %r" % (name, format_labels(key), float(metric.get_sum())))
+                lines.append("%s_count%s %d" % (name, format_labels(key), metric.get_count()))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        writes the metrics to a file, in the Prometheus text format if its name ends with .prom or .txt and as JSON otherwise. The file is written under a temporary name and renamed, so a reader never sees half of it.
+        """
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as metrics_file:
+            if path.endswith((".prom", ".txt")):
+                metrics_file.write(self.to_prometheus())
+            else:
+                json.dump(self.get_snapshot(), metrics_file, indent=2)
+        os.replace(temp_path, path)
+
+
+registry = Registry()  # the registry instrument() records to unless given another one
+_originals = {}  # (class, method name) -> method replaced by instrument
+
+
+def wrap_counted(cls, name, target):
+    """
+    wraps a method so each call adds one to a counter
+    """
+    method = getattr(cls, name)
+    calls = target.counter("blackbox_%s_calls_total" % name,
+                           "calls of %s, only made by Board.find_exit, the other boards move rays without it" % name,
+                           board=cls.__name__)
+
+    @functools.wraps(method)
+    def counted(self, *args):
+        calls.inc()
+        return method(self, *args)
+
+    return counted
+
+
+def wrap_find_exit(cls, target):
+    """
+    wraps find_exit so each ray records its latency and the number of squares it checked, the steps of the ray on every board class
+    """
+    method = cls.find_exit
+    latency = target.histogram("blackbox_find_exit_seconds", "time to trace one ray", board=cls.__name__)
+    squares = target.histogram("blackbox_find_exit_squares", "squares one ray checked for atoms", SQUARE_BUCKETS,
+                               board=cls.__name__)
+    steps = target.counter("blackbox_find_exit_steps_total", "squares rays moved into or jumped over",
+                           board=cls.__name__)
+
+    @functools.wraps(method)
+    def find_exit(self, ray, path=None):
+        if path is None:
+            path = []
+        start_length = len(path)
+        start = time.perf_counter()
+        method(self, ray, path)
+        latency.observe(time.perf_counter() - start)
+        squares.observe(len(path) - start_length)
+        steps.inc(len(path) - start_length)
+
+    return find_exit
+
+
+def wrap_shoot_ray(target):
+    method = BlackBox.BlackBoxGame.shoot_ray
+    latency = target.histogram("blackbox_shoot_ray_seconds", "time of BlackBoxGame.shoot_ray")
+    outcomes = {outcome: target.counter("blackbox_shots_total", "rays shot by outcome", outcome=outcome)
+                for outcome in ("rejected", "hit", "reflect", "exit")}
+
+    @functools.wraps(method)
+    def shoot_ray(self, row, col):
+        start = time.perf_counter()
+        result = method(self, row, col)
+        latency.observe(time.perf_counter() - start)
+        if result is False:
+            outcomes["rejected"].inc()
+        elif result[1] is None:
+            outcomes["hit"].inc()
+        elif result[1] == result[0]:
+            outcomes["reflect"].inc()
+        else:
+            outcomes["exit"].inc()
+        return result
+
+    return shoot_ray
+
+
+def wrap_guess_atom(target):
+    method = BlackBox.BlackBoxGame.guess_atom
+    latency = target.histogram("blackbox_guess_atom_seconds", "time of BlackBoxGame.guess_atom")
+    outcomes = {correct: target.counter("blackbox_guesses_total", "guesses by outcome", correct=str(correct).lower())
+                for correct in (True, False)}
+
+    @functools.wraps(method)
+    def guess_atom(self, row, col):
+        start = time.perf_counter()
+        correct = method(self, row, col)
+        latency.observe(time.perf_counter() - start)
+        outcomes[correct].inc()
+        return correct
+
+    return guess_atom
+
+
+def instrument(target=None):
+    """
+    starts recording engine metrics by replacing the engine methods with measuring wrappers, does nothing if they are already replaced. Every game and board, existing or new, is measured until uninstrument is called. The steps of the rays are counted in find_exit for every board class (blackbox_find_exit_steps_total). The can_move and update_direction call counters only move for Board: BitBoard.find_exit and SparseBoard.find_exit never call them.
+    :param target: default parameter, Registry to record to, the module registry if None
+    """
+    if _originals:
+        return
+    if target is None:
+        target = registry
+
+    replacements = {
+        (BlackBox.BlackBoxGame, "shoot_ray"): wrap_shoot_ray(target),
+        (BlackBox.BlackBoxGame, "guess_atom"): wrap_guess_atom(target),
+    }
+    for cls in (BlackBox.Board, BlackBox.BitBoard, BlackBox.SparseBoard):
+        replacements[(cls, "find_exit")] = wrap_find_exit(cls, target)
+        # only the methods a class defines itself, the inherited ones are counted under the class that defines them
+        for name in ("can_move", "update_direction"):
+            if name in vars(cls):
+                replacements[(cls, name)] = wrap_counted(cls, name, target)
+
+    for (cls, name), wrapper in replacements.items():
+        _originals[(cls, name)] = vars(cls)[name]
+        setattr(cls, name, wrapper)
+
+
+def uninstrument():
+    """
+    puts back the methods replaced by instrument, the recorded metrics are kept
+    """
+    for (cls, name), method in _originals.items():
+        setattr(cls, name, method)
+    _originals.clear()
+
+
+def is_instrumented():
+    return bool(_originals)
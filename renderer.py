@@ -0,0 +1,68 @@
+# Description: retained-mode renderer for the pygame front end, repaints and updates only the parts of the screen that changed
+
+import pygame
+
+
+class DirtyRenderer:
+    """
+    Represents the renderer. Every frame the caller describes the screen as named regions, each with a key (any value that changes whenever what is drawn in the region changes) and the rect it covers. Only the regions whose key changed are repainted: the whole frame is drawn once with the screen clipped to the rect around every changed rect, so the pixels come out exactly as a full repaint would, and only the changed rects are passed to pygame.display.update. Nothing is drawn or updated when nothing changed.
+    """
+    def __init__(self, screen, max_rects=8):
+        """
+        :param screen: display surface
+        :param max_rects: default parameter, above this many changed rects a single rect around all of them is updated on the display instead
+        """
+        self._screen = screen
+        self._max_rects = max_rects
+        self._regions = {}  # name -> (key, rect) as of the last frame drawn
+        self._full = True
+
+    def invalidate(self):
+        """
+        makes the next frame repaint the whole screen
+        """
+        self._full = True
+
+    def get_dirty_rects(self, regions):
+        """
+        compares the regions with the ones of the last frame
+        :param regions: dictionary of name -> (key, pygame.Rect)
+        :return: list of the rects to repaint
+        """
+        if self._full:
+            return [self._screen.get_rect()]
+
+        dirty = []
+        for name, (key, rect) in regions.items():
+            old = self._regions.get(name)
+            if old is None:
+                dirty.append(rect)
+            elif old[0] != key:
+                dirty.append(rect.union(old[1]))
+        for name, (key, rect) in self._regions.items():
+            if name not in regions:
+                dirty.append(rect)
+
+        if len(dirty) > self._max_rects:
+            dirty = [dirty[0].unionall(dirty[1:])]
+        return dirty
+
+    def render(self, regions, draw):
+        """
+        repaints the changed regions and updates them on the display
+        :param regions: dictionary of name -> (key, pygame.Rect)
+        :param draw: function that draws the whole frame on the screen
+        :return: list of the rects that were repainted
+        """
+        dirty = self.get_dirty_rects(regions)
+        self._regions = dict(regions)
+        self._full = False
+        if not dirty:
+            return dirty
+
+        # one draw however many rects changed, the squares between them are drawn again with the pixels they already have
+        self._screen.set_clip(dirty[0].unionall(dirty[1:]))
+        draw()
+        self._screen.set_clip(None)
+        pygame.display.update(dirty)
+        return dirty
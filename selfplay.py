@@ -0,0 +1,363 @@
+# Description: plays complete BlackBoxGame games with automated strategies and aggregates their scores
+#
+#   python selfplay.py --games 100000 --strategy random sweep --seed 7
+#
+# Game i is played on the same random layout by every strategy, drawn from the seed and i, so the results only
+# depend on the arguments and not on the number of workers. Workers send back aggregates of their games instead of
+# one result per game, and the aggregates are merged and reported as they come in.
+
+import argparse
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import BlackBox
+import advisor
+import solver
+
+# state of a pool worker, set once by init_worker instead of being sent with every task
+_worker = {}
+
+MAX_SCORE = 100
+
+
+class Strategy:
+    """
+    Represents a way of playing: which rays to shoot, one at a time, and which squares to guess once it stops shooting. A strategy object plays one game at a time and start is called before each game. The guesses of this class are the layout that explains the most rays among random layouts of the squares the rays have not ruled out.
+    """
+    name = "base"
+
+    def __init__(self, rays=8, tries=64):
+        """
+        :param rays: default parameter, most rays shot in a game
+        :param tries: default parameter, random layouts tried when choosing the guesses
+        """
+        self._rays = rays
+        self._tries = tries
+        self._game = None
+        self._rng = None
+
+    def start(self, game, rng):
+        """
+        :param game: BlackBoxGame object about to be played
+        :param rng: random.Random object the strategy draws from, seeded for this game
+        """
+        self._game = game
+        self._rng = rng
+
+    def get_shot(self):
+        """
+        takes no parameters and returns the next ray origin to shoot, or None to stop shooting
+        """
+        return None
+
+    def get_guesses(self):
+        """
+        takes no parameters and returns the list of squares to guess, one for each atom
+        """
+        size = self._game.get_board().get_size()
+        atom_count = len(self._game.get_atoms())
+        observations = solver.get_observations(self._game)
+        candidates = solver.get_candidate_squares(observations, size)
+        if len(candidates) < atom_count:
+            candidates = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+
+        best, best_matches = None, -1
+        for _ in range(self._tries):
+            layout = self._rng.sample(candidates, atom_count)
+            board = BlackBox.BitBoard(layout, size)
+            matches = sum(board.get_exit(entry) == exit for entry, exit in observations)
+            if matches > best_matches:
+                best, best_matches = layout, matches
+                if matches == len(observations):
+                    break
+
+        return best
+
+
+class RandomStrategy(Strategy):
+    """
+    Represents shooting rays from random border squares that have not been shot yet
+    """
+    name = "random"
+
+    def start(self, game, rng):
+        super().start(game, rng)
+        entries = game.get_board().get_border_entries()
+        self._order = rng.sample(entries, min(self._rays, len(entries)))
+
+    def get_shot(self):
+        return self._order.pop() if self._order else None
+
+
+class SweepStrategy(Strategy):
+    """
+    Represents shooting rays from border squares evenly spaced around the board, starting from a random one
+    """
+    name = "sweep"
+
+    def start(self, game, rng):
+        super().start(game, rng)
+        entries = game.get_board().get_border_entries()
+        first = rng.randrange(len(entries))
+        rays = min(self._rays, len(entries))
+        self._order = [entries[(first + i * len(entries) // rays) % len(entries)] for i in range(rays)]
+        self._order.reverse()
+
+    def get_shot(self):
+        return self._order.pop() if self._order else None
+
+
+class GreedyStrategy(Strategy):
+    """
+    Represents shooting the ray the Advisor rates best after a fixed number of sampling rounds, so the same seed always gives the same rays. It stops when no ray is worth the points it is expected to cost, and guesses the squares that hold an atom in the most sampled layouts.
+    """
+    name = "greedy"
+
+    def __init__(self, rays=12, tries=64, rounds=8):
+        """
+        :param rounds: default parameter, sampling rounds of the Advisor before each shot
+        """
+        super().__init__(rays, tries)
+        self._rounds = rounds
+
+    def start(self, game, rng):
+        super().start(game, rng)
+        self._advisor = advisor.Advisor(game, seed=rng.random())
+        self._shots = 0
+
+    def get_shot(self):
+        if self._shots >= self._rays:
+            return None
+        move = None
+        for move in itertools.islice(self._advisor.iter_moves(), self._rounds):
+            pass
+        if move is None or self._advisor.rate(move) <= 0:
+            return None
+        self._shots += 1
+        return move
+
+    def get_guesses(self):
+        self._advisor.update()
+        samples = self._advisor.get_samples()
+        if not samples:
+            return super().get_guesses()
+
+        counts = {}
+        for layout in samples:
+            for pos in layout:
+                counts[pos] = counts.get(pos, 0) + 1
+        return sorted(counts, key=lambda pos: (-counts[pos], pos))[:len(self._game.get_atoms())]
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (RandomStrategy, SweepStrategy, GreedyStrategy)}
+
+
+def get_strategy(name):
+    """
+    returns the strategy class of a name in STRATEGIES, or of a "module:Class" name for a strategy defined elsewhere
+    """
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    if ":" not in name:
+        raise ValueError("unknown strategy %s, expected one of %s or module:Class" % (name, ", ".join(STRATEGIES)))
+    module, attribute = name.split(":", 1)
+    return getattr(importlib.import_module(module), attribute)
+
+
+def get_layout(seed, index, atom_count=4, size=10):
+    """
+    returns the layout of game index, the same for every strategy
+    """
+    rng = random.Random("%d:%d" % (seed, index))
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    return rng.sample(squares, atom_count)
+
+
+def play_game(strategy, layout, size, rng):
+    """
+    plays one game to the end. If the strategy guesses fewer distinct squares than there are atoms, the missing guesses are random squares.
+    :param strategy: Strategy object
+    :param layout: list of (row, col) tuples of the atoms
+    :param rng: random.Random object for the strategy
+    :return: tuple (score, won, rays shot)
+    """
+    game = BlackBox.BlackBoxGame(list(layout), BlackBox.BitBoard, size)
+    strategy.start(game, rng)
+    rays = 0
+    while True:
+        entry = strategy.get_shot()
+        if entry is None:
+            break
+        game.shoot_ray(entry[0], entry[1])
+        rays += 1
+
+    for pos in strategy.get_guesses():
+        if game.get_status() != "started":
+            break
+        game.guess_atom(pos[0], pos[1])
+
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    while game.get_status() == "started":
+        game.guess_atom(*rng.choice(squares))
+
+    return game.get_score(), game.get_status() == "You won! Play again!", rays
+
+
+class Aggregate:
+    """
+    Represents the results of any number of games in constant memory: counts of each final score and of each number of rays shot. Aggregates of separate games can be merged in any order and give the same result.
+    """
+    def __init__(self):
+        self._games = 0
+        self._wins = 0
+        self._scores = [0] * (MAX_SCORE + 1)  # number of games that ended with each score
+        self._win_scores = [0] * (MAX_SCORE + 1)
+        self._rays = {}  # number of rays shot -> number of games
+
+    def add(self, score, won, rays):
+        self._games += 1
+        self._scores[score] += 1
+        if won:
+            self._wins += 1
+            self._win_scores[score] += 1
+        self._rays[rays] = self._rays.get(rays, 0) + 1
+
+    def merge(self, other):
+        """
+        adds the games of another Aggregate to this one
+        """
+        self._games += other._games
+        self._wins += other._wins
+        for score in range(MAX_SCORE + 1):
+            self._scores[score] += other._scores[score]
+            self._win_scores[score] += other._win_scores[score]
+        for rays, count in other._rays.items():
+            self._rays[rays] = self._rays.get(rays, 0) + count
+
+    def get_games(self):
+        return self._games
+
+    def get_report(self):
+        """
+        takes no parameters and returns a dictionary of the win rate, the score distribution and percentiles and the rays shot
+        """
+        def percentile(fraction):
+            target = fraction * self._games
+            total = 0
+            for score, count in enumerate(self._scores):
+                total += count
+                if count and total >= target:
+                    return score
+            return None
+
+        total_score = sum(score * count for score, count in enumerate(self._scores))
+        total_rays = sum(rays * count for rays, count in self._rays.items())
+        return {
+            "games": self._games,
+            "wins": self._wins,
+            "win_rate": round(self._wins / self._games, 4) if self._games else None,
+            "mean_score": round(total_score / self._games, 3) if self._games else None,
+            "score_percentiles": {"p10": percentile(0.1), "p50": percentile(0.5), "p90": percentile(0.9)},
+            "mean_rays": round(total_rays / self._games, 3) if self._games else None,
+            "scores": {str(score): count for score, count in enumerate(self._scores) if count},
+            "win_scores": {str(score): count for score, count in enumerate(self._win_scores) if count},
+            "rays": {str(rays): self._rays[rays] for rays in sorted(self._rays)},
+        }
+
+
+def init_worker(seed, atom_count, size, options):
+    """
+    stores the simulation parameters in a pool worker
+    :param options: dictionary of strategy name -> keyword arguments of its class
+    """
+    _worker.update(seed=seed, atom_count=atom_count, size=size, options=options)
+
+
+def play_chunk(task):
+    """
+    plays a range of games with one strategy, used as the task of a pool worker
+    :param task: tuple (strategy name, first game index, number of games)
+    :return: tuple (strategy name, Aggregate of the games)
+    """
+    name, first, count = task
+    seed, atom_count, size = _worker["seed"], _worker["atom_count"], _worker["size"]
+    strategy = get_strategy(name)(**_worker["options"].get(name, {}))
+    aggregate = Aggregate()
+    for index in range(first, first + count):
+        rng = random.Random("%d:%d:%s" % (seed, index, name))
+        aggregate.add(*play_game(strategy, get_layout(seed, index, atom_count, size), size, rng))
+    return name, aggregate
+
+
+def simulate(games, strategies=("random",), seed=0, atom_count=4, size=10, processes=None, chunk_size=500,
+             options=None):
+    """
+    plays games with each strategy and generates the aggregates so far after every finished chunk, the last ones hold every game
+    :param games: number of games each strategy plays
+    :param strategies: default parameter, names accepted by get_strategy
+    :param processes: default parameter, number of worker processes, all cpus if None, 1 plays in this process
+    :param chunk_size: default parameter, number of games of each task
+    :param options: default parameter, dictionary of strategy name -> keyword arguments of its class
+    :return: generator of dictionaries of strategy name -> Aggregate, the same dictionary updated each time
+    """
+    for name in strategies:
+        get_strategy(name)  # fails here rather than in a worker
+    args = (seed, atom_count, size, options or {})
+    tasks = [(name, first, min(chunk_size, games - first)) for first in range(0, games, chunk_size)
+             for name in strategies]
+    totals = {name: Aggregate() for name in strategies}
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes == 1:
+        init_worker(*args)
+        for task in tasks:
+            name, aggregate = play_chunk(task)
+            totals[name].merge(aggregate)
+            yield totals
+        return
+
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=args) as pool:
+        for name, aggregate in pool.imap_unordered(play_chunk, tasks):
+            totals[name].merge(aggregate)
+            yield totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="plays BlackBox games with automated strategies")
+    parser.add_argument("--games", type=int, default=10000, help="games played by each strategy")
+    parser.add_argument("--strategy", nargs="+", default=["random", "sweep"],
+                        help="names of the strategies, %s or module:Class" % ", ".join(STRATEGIES))
+    parser.add_argument("--rays", type=int, help="most rays each strategy shoots in a game")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--atoms", type=int, default=4)
+    parser.add_argument("--size", type=int, default=10)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--output", help="file the JSON report is written to, printed if not given")
+    args = parser.parse_args()
+
+    options = {name: {"rays": args.rays} for name in args.strategy} if args.rays else {}
+    start = time.perf_counter()
+    totals = {}
+    for totals in simulate(args.games, args.strategy, args.seed, args.atoms, args.size, args.processes,
+                           args.chunk_size, options):
+        played = sum(aggregate.get_games() for aggregate in totals.values())
+        elapsed = time.perf_counter() - start
+        print("%d games, %.0f games/s, %s" % (played, played / elapsed, ", ".join(
+            "%s %.1f" % (name, aggregate.get_report()["mean_score"]) for name, aggregate in totals.items()
+            if aggregate.get_games())), file=sys.stderr)
+
+    report = {name: aggregate.get_report() for name, aggregate in totals.items()}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,229 @@
+# Description: headless asyncio server hosting many BlackBoxGame sessions over TCP with a line-delimited JSON protocol
+#
+# Every request is one JSON object on one line and gets exactly one JSON response line, in the same order:
+#   {"id": 1, "op": "create"}                            -> {"id": 1, "ok": true, "result": 7}  (the game id)
+#   {"id": 2, "op": "create", "atoms": [[1, 2], ...]}    -> places the atoms instead of drawing them at random
+#   {"id": 3, "op": "shoot", "game": 7, "row": 0, "col": 4} -> result is false or [[0, 4], [9, 4]], exit is null for a hit
+#   {"id": 4, "op": "guess", "game": 7, "row": 3, "col": 4} -> result is true or false
+#   {"id": 5, "op": "score", "game": 7}                  -> result is the score
+#   {"id": 6, "op": "status", "game": 7}                 -> result is the game status
+#   {"id": 7, "op": "close", "game": 7}                  -> drops the game
+# Errors are answered with {"id": ..., "ok": false, "error": "..."}. Clients may send many requests without waiting for
+# the answers; the server stops reading from a connection while the client is not reading its answers.
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+
+import BlackBox
+from sessions import SessionStore
+
+
+class GameServer:
+    """
+    Represents the server, holds the games by id and answers the requests of every connection. The games are plain BlackBoxGame objects and every request is handled synchronously, so one process can serve thousands of sessions as long as the requests are cheap.
+    """
+    def __init__(self, max_games=100000, max_line=65536, seed=None, sessions=None):
+        """
+        :param max_games: default parameter, number of games that can be open at the same time
+        :param max_line: default parameter, longest request line accepted, in bytes
+        :param seed: default parameter, seed of the random atom layouts
+        :param sessions: default parameter, mapping used to hold the games by id, a dict if None
+        """
+        self._sessions = {} if sessions is None else sessions
+        self._max_games = max_games
+        self._max_line = max_line
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._server = None
+        self._ops = {
+            "create": self.create,
+            "shoot": self.shoot,
+            "guess": self.guess,
+            "score": self.score,
+            "status": self.status,
+            "close": self.close,
+        }
+
+    def get_sessions(self):
+        return self._sessions
+
+    def get_port(self):
+        """
+        takes no parameters and returns the port the server listens on, useful when it was started on port 0
+        """
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        starts listening for connections
+        """
+        self._server = await asyncio.start_server(self.handle_connection, host, port, limit=self._max_line)
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        """
+        answers the requests of one connection in order. Requests can be pipelined, and nothing more is read from a client that is not reading its answers.
+        """
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # line longer than max_line
+                    writer.write(self.encode({"id": None, "ok": False, "error": "request too long"}))
+                    break
+                if not line:
+                    break
+
+                writer.write(self.handle_line(line))
+                await writer.drain()  # only waits when the client is not reading its answers
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def handle_line(self, line):
+        """
+        answers one request line
+        :param line: bytes of a JSON object
+        :return: bytes of the JSON answer, ending with a newline
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            request_id = request.get("id")
+            op = self._ops.get(request.get("op"))
+            if op is None:
+                raise ValueError("unknown op")
+            response = {"id": request_id, "ok": True, "result": op(request)}
+        except KeyError as error:
+            response = {"id": request_id, "ok": False, "error": "missing " + str(error.args[0])}
+        except (ValueError, TypeError) as error:
+            response = {"id": request_id, "ok": False, "error": str(error)}
+        except Exception as error:  # any other failure, e.g. RecursionError of a deeply nested line, still gets its answer
+            response = {"id": request_id, "ok": False, "error": "%s: %s" % (type(error).__name__, error)}
+
+        return self.encode(response)
+
+    def encode(self, response):
+        return json.dumps(response, separators=(",", ":")).encode() + b"\n"
+
+    def get_game(self, request):
+        game = self._sessions.get(request["game"])
+        if game is None:
+            raise ValueError("unknown game")
+        return game
+
+    def get_pos(self, request):
+        row, col = request["row"], request["col"]
+        if type(row) is not int or type(col) is not int:
+            raise TypeError("row and col must be integers")
+        return row, col
+
+    def create(self, request):
+        """
+        creates a game with the given atoms, or four random ones
+        :return: id of the new game
+        """
+        if len(self._sessions) >= self._max_games:
+            raise ValueError("too many games")
+
+        size = request.get("size", 10)
+        if type(size) is not int or not 3 <= size <= 1000:
+            raise ValueError("size must be an integer from 3 to 1000")
+
+        last = size - 1
+        if "atoms" in request:
+            atoms = [tuple(pos) for pos in request["atoms"]]
+            for pos in atoms:
+                if len(pos) != 2 or not all(type(x) is int and 0 < x < last for x in pos):
+                    raise ValueError("atoms must be non-border squares")
+            if len(set(atoms)) != len(atoms):
+                raise ValueError("atoms must be distinct")
+        else:
+            atoms = []
+            while len(atoms) < min(4, (size - 2) ** 2):
+                pos = (self._rng.randint(1, last - 1), self._rng.randint(1, last - 1))
+                if pos not in atoms:
+                    atoms.append(pos)
+
+        board_class = BlackBox.BitBoard if size <= 16 else BlackBox.SparseBoard
+        game_id = next(self._ids)
+        self._sessions[game_id] = BlackBox.BlackBoxGame(atoms, board_class, size)
+        return game_id
+
+    def shoot(self, request):
+        row, col = self.get_pos(request)
+        return self.get_game(request).shoot_ray(row, col)
+
+    def guess(self, request):
+        row, col = self.get_pos(request)
+        return self.get_game(request).guess_atom(row, col)
+
+    def score(self, request):
+        return self.get_game(request).get_score()
+
+    def status(self, request):
+        return self.get_game(request).get_status()
+
+    def close(self, request):
+        self.get_game(request)
+        del self._sessions[request["game"]]
+        return True
+
+
+async def evict_idle(sessions, max_idle, interval):
+    """
+    spills the games that have not been used for max_idle seconds to disk every interval seconds, until cancelled
+    :param sessions: SessionStore object
+    """
+    while True:
+        await asyncio.sleep(interval)
+        sessions.evict_idle(max_idle)
+
+
+async def main(host, port, max_games, max_resident, spill_path, max_idle):
+    sessions = None
+    evictor = None
+    if max_resident is not None:
+        sessions = SessionStore(spill_path, max_resident)
+        if max_idle is not None:
+            evictor = asyncio.create_task(evict_idle(sessions, max_idle, min(max_idle, 60)))
+    server = GameServer(max_games, sessions=sessions)
+    await server.start(host, port)
+    print("serving on", host, server.get_port())
+    try:
+        await server.serve_forever()
+    finally:
+        if evictor is not None:
+            evictor.cancel()
+        if sessions is not None:
+            sessions.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BlackBoxGame server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-games", type=int, default=100000)
+    parser.add_argument("--max-resident", type=int, default=None,
+                        help="games kept in memory, the least recently used ones are spilled to disk past that")
+    parser.add_argument("--spill-path", default="sessions.spill")
+    parser.add_argument("--max-idle", type=float, default=600,
+                        help="seconds after which a game that is not used is spilled to disk, with --max-resident")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.host, args.port, args.max_games, args.max_resident, args.spill_path, args.max_idle))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,189 @@
+# Description: bounded store of BlackBoxGame sessions that spills the least recently used ones to a file on disk
+
+import collections
+import os
+import pickle
+import time
+
+
+class SessionStore:
+    """
+    Represents a mapping from game id to BlackBoxGame that keeps at most max_entries games (and, if max_bytes is set, about max_bytes of pickled games) in memory. When it is full the least recently used game is pickled and appended to a spill file, and it is loaded back the next time it is looked up. Games must be looked up again for every use instead of being kept by the caller, since a game loaded back from disk is a new object.
+    """
+    def __init__(self, path, max_entries=10000, max_bytes=None):
+        """
+        :param path: spill file, it is created empty and removed by close
+        :param max_entries: default parameter, number of games kept in memory
+        :param max_bytes: default parameter, approximate pickled size of the games kept in memory, no limit if None
+        """
+        self._path = path
+        self._file = open(path, "w+b")
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._memory = collections.OrderedDict()  # game id -> game, least recently used first
+        self._last_used = {}  # game id -> time of last use, for evict_idle
+        self._sizes = {}  # game id -> pickled size when it was stored, only used with max_bytes
+        self._bytes = 0
+        self._disk = {}  # game id -> (offset, length) of its record in the spill file
+        self._end = 0  # offset where the next record is written
+        self._dead = 0  # bytes of the spill file that belong to records already loaded back
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._loads = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        closes and removes the spill file, the games that were on disk are lost
+        """
+        self._file.close()
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+    def __len__(self):
+        return len(self._memory) + len(self._disk)
+
+    def __contains__(self, game_id):
+        return game_id in self._memory or game_id in self._disk
+
+    def __getitem__(self, game_id):
+        game = self.get(game_id)
+        if game is None:
+            raise KeyError(game_id)
+        return game
+
+    def get(self, game_id, default=None):
+        """
+        looks a game up, loading it back from the spill file if it was evicted
+        :return: the game, or default if there is no game with that id
+        """
+        game = self._memory.get(game_id)
+        if game is not None:
+            self._hits += 1
+            self._memory.move_to_end(game_id)
+            self._last_used[game_id] = time.monotonic()
+            return game
+
+        self._misses += 1
+        if game_id not in self._disk:
+            return default
+
+        offset, length = self._disk.pop(game_id)
+        self._file.seek(offset)
+        data = self._file.read(length)
+        self._dead += length
+        self._loads += 1
+        game = pickle.loads(data)
+        self.store(game_id, game, length)
+        self.compact()
+        return game
+
+    def __setitem__(self, game_id, game):
+        if game_id in self._disk:
+            self._dead += self._disk.pop(game_id)[1]
+        self.store(game_id, game, None)
+
+    def __delitem__(self, game_id):
+        if game_id in self._memory:
+            del self._memory[game_id]
+            del self._last_used[game_id]
+            self._bytes -= self._sizes.pop(game_id, 0)
+        elif game_id in self._disk:
+            self._dead += self._disk.pop(game_id)[1]
+        else:
+            raise KeyError(game_id)
+
+    def store(self, game_id, game, size):
+        """
+        puts a game in memory as the most recently used one, then evicts games until the limits are met
+        :param size: pickled size of the game if it is already known
+        """
+        if game_id in self._memory:
+            self._bytes -= self._sizes.pop(game_id, 0)
+        self._memory[game_id] = game
+        self._memory.move_to_end(game_id)
+        self._last_used[game_id] = time.monotonic()
+        if self._max_bytes is not None:
+            if size is None:
+                size = len(pickle.dumps(game, pickle.HIGHEST_PROTOCOL))
+            self._sizes[game_id] = size
+            self._bytes += size
+
+        while len(self._memory) > 1 and (len(self._memory) > self._max_entries or
+                                         (self._max_bytes is not None and self._bytes > self._max_bytes)):
+            self.evict(next(iter(self._memory)))
+
+    def evict(self, game_id):
+        """
+        moves a game from memory to the end of the spill file
+        """
+        game = self._memory.pop(game_id)
+        del self._last_used[game_id]
+        self._bytes -= self._sizes.pop(game_id, 0)
+        data = pickle.dumps(game, pickle.HIGHEST_PROTOCOL)
+        self._file.seek(self._end)
+        self._file.write(data)
+        self._disk[game_id] = (self._end, len(data))
+        self._end += len(data)
+        self._evictions += 1
+
+    def evict_idle(self, max_idle):
+        """
+        evicts every game that has not been used for max_idle seconds
+        :return: number of games evicted
+        """
+        cutoff = time.monotonic() - max_idle
+        evicted = 0
+        while self._memory:
+            game_id = next(iter(self._memory))
+            if self._last_used[game_id] > cutoff:
+                break
+            self.evict(game_id)
+            evicted += 1
+
+        return evicted
+
+    def compact(self):
+        """
+        rewrites the spill file without the records already loaded back, once they take more room than the live ones
+        """
+        live = self._end - self._dead
+        if self._dead < 1 << 20 or self._dead < live:
+            return
+
+        new_path = self._path + ".tmp"
+        with open(new_path, "wb") as new_file:
+            disk = {}
+            end = 0
+            for game_id, (offset, length) in self._disk.items():
+                self._file.seek(offset)
+                new_file.write(self._file.read(length))
+                disk[game_id] = (end, length)
+                end += length
+        self._file.close()
+        os.replace(new_path, self._path)
+        self._file = open(self._path, "r+b")
+        self._disk = disk
+        self._end = end
+        self._dead = 0
+
+    def get_stats(self):
+        """
+        takes no parameters and returns a dictionary of counters for sizing the store
+        """
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "loads": self._loads,
+            "in_memory": len(self._memory),
+            "on_disk": len(self._disk),
+            "memory_bytes": self._bytes,
+            "file_bytes": self._end,
+        }
@@ -0,0 +1,206 @@
+# Description: file of the ray signature of every atom layout, indexed by the rank of the layout and read through a memory map
+#
+#   python signatures.py --output signatures4.bin      builds the index for 4 atoms on a size 10 board (about 20 seconds)
+#
+# The file is HEADER padded to DATA_OFFSET bytes, then one row of entry_count bytes per layout in rank order.
+# Byte i of a row is the exit of the ray shot from get_border_entries()[i], given as the index of the exit in
+# that same list, or HIT for a ray that hits an atom. A reflected ray has its own entry as exit.
+
+import argparse
+import itertools
+import math
+import mmap
+import os
+import struct
+
+import numpy as np
+
+import BlackBox
+import batch_tracer
+
+MAGIC = b"BBSG"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHQ")  # magic, version, board size, atom count, entry count, layout count
+DATA_OFFSET = 64
+HIT = 255
+
+
+def get_rank(layout, size=10):
+    """
+    returns the position of a layout in the colexicographic order of all the layouts with as many atoms, a number below comb((size - 2) ** 2, len(layout))
+    :param layout: list of (row, col) tuples on non-border squares
+    """
+    inner = size - 2
+    squares = sorted((row - 1) * inner + col - 1 for row, col in layout)
+    return sum(math.comb(square, i + 1) for i, square in enumerate(squares))
+
+
+def get_layout(rank, atom_count=4, size=10):
+    """
+    returns the layout of a rank, the inverse of get_rank
+    :return: sorted list of (row, col) tuples
+    """
+    inner = size - 2
+    squares = []
+    square = inner * inner
+    for i in range(atom_count, 0, -1):
+        square -= 1
+        while math.comb(square, i) > rank:
+            square -= 1
+        rank -= math.comb(square, i)
+        squares.append(square)
+
+    return [(square // inner + 1, square % inner + 1) for square in reversed(squares)]
+
+
+def iter_layouts(atom_count=4, size=10, chunk=50000):
+    """
+    generates every layout, chunk layouts at a time, in combinations order and not in rank order
+    :return: generator of (ranks, block), ranks is an (n,) array and block an (n, atom_count) array of the squares of each layout numbered (row - 1) * (size - 2) + col - 1, in increasing order
+    """
+    inner = size - 2
+    binomials = np.array([[math.comb(square, i + 1) for i in range(atom_count)] for square in range(inner * inner)],
+                         dtype=np.int64)
+
+    layouts = itertools.combinations(range(inner * inner), atom_count)
+    while True:
+        block = np.array(list(itertools.islice(layouts, chunk)), dtype=np.intp)
+        if not len(block):
+            return
+        yield binomials[block, np.arange(atom_count)].sum(axis=1), block
+
+
+def iter_signatures(atom_count=4, size=10, chunk=50000):
+    """
+    traces every ray on every layout with batch_tracer, chunk layouts at a time
+    :return: generator of (ranks, rows), ranks is an (n,) array and rows an (n, entry count) array of exit bytes
+    """
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    entries = batch_tracer.border_entries(size)
+    if len(entries) >= HIT:
+        raise ValueError("a board of size %d has too many border squares for one byte" % size)
+    exit_index = np.full((size + 1, size + 1), HIT, dtype=np.uint8)  # (-1, -1) of a hit wraps to the last row
+    for i, (row, col) in enumerate(entries):
+        exit_index[row, col] = i
+
+    for ranks, block in iter_layouts(atom_count, size, chunk):
+        boards = batch_tracer.layouts_to_boards([[squares[i] for i in layout] for layout in block], size)
+        rows = np.empty((len(block), len(entries)), dtype=np.uint8)
+        for i, entry in enumerate(entries):
+            exits = batch_tracer.trace(boards, entry)[1]
+            rows[:, i] = exit_index[exits[:, 0], exits[:, 1]]
+        yield ranks, rows
+
+
+def build_index(path, atom_count=4, size=10, chunk=50000):
+    """
+    writes the signature of every layout to a new index file, it is written under a temporary name and renamed when complete
+    """
+    entry_count = 4 * (size - 2)
+    total = math.comb((size - 2) ** 2, atom_count)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as index_file:
+        index_file.write(HEADER.pack(MAGIC, VERSION, size, atom_count, entry_count, total).ljust(DATA_OFFSET, b"\0"))
+        index_file.truncate(DATA_OFFSET + total * entry_count)
+
+    data = np.memmap(temp_path, dtype=np.uint8, mode="r+", offset=DATA_OFFSET, shape=(total, entry_count))
+    for ranks, rows in iter_signatures(atom_count, size, chunk):
+        data[ranks] = rows
+    data.flush()
+    del data
+    os.replace(temp_path, path)
+
+
+class SignatureIndex:
+    """
+    Represents an index file opened for reading. The file is memory-mapped, so a lookup reads one row and a scan reads the rows in order, and several processes opening the same file share its pages instead of each loading a copy.
+    """
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        header = self._file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("%s is not a signature index" % path)
+        magic, version, self._size, self._atom_count, self._entry_count, self._count = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d signature index" % (path, VERSION))
+        if os.fstat(self._file.fileno()).st_size < DATA_OFFSET + self._count * self._entry_count:
+            raise ValueError("%s is truncated" % path)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._path = path
+        self._array = None  # numpy map of the rows, made by get_array
+        self._entries = BlackBox.Board([], self._size).get_border_entries()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._array = None  # arrays still held by the caller keep their own map open
+        self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._count
+
+    def get_size(self):
+        return self._size
+
+    def get_atom_count(self):
+        return self._atom_count
+
+    def get_entries(self):
+        return self._entries
+
+    def get_row(self, rank):
+        """
+        returns the exit bytes of the layout of a rank
+        """
+        if not 0 <= rank < self._count:
+            raise IndexError(rank)
+        start = DATA_OFFSET + rank * self._entry_count
+        return self._map[start:start + self._entry_count]
+
+    def get_signature(self, layout):
+        """
+        returns the exits of a layout as a list in the order of get_entries, None for a hit, same as Board.get_exit for each entry
+        """
+        if len(layout) != self._atom_count:
+            raise ValueError("the index holds layouts of %d atoms" % self._atom_count)
+        return [None if code == HIT else self._entries[code] for code in self.get_row(get_rank(layout, self._size))]
+
+    def get_exits(self, layout):
+        """
+        returns the exits of a layout as a dictionary like Board.get_exits
+        """
+        return dict(zip(self._entries, self.get_signature(layout)))
+
+    def get_array(self):
+        """
+        returns every row as a read-only (layouts, entries) numpy array backed by a memory map of the file, nothing is read until it is used
+        """
+        if self._array is None:
+            self._array = np.memmap(self._path, dtype=np.uint8, mode="r", offset=DATA_OFFSET,
+                                    shape=(self._count, self._entry_count))
+        return self._array
+
+    def scan(self, start=0, stop=None, block=65536):
+        """
+        reads the rows in rank order, block rows at a time
+        :return: generator of (rank of the first row, (n, entries) array of rows)
+        """
+        array = self.get_array()
+        stop = self._count if stop is None else min(stop, self._count)
+        for first in range(start, stop, block):
+            yield first, array[first:min(first + block, stop)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="builds the index of the ray signatures of every layout")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--atoms", type=int, default=4)
+    parser.add_argument("--size", type=int, default=10)
+    parser.add_argument("--chunk", type=int, default=50000)
+    args = parser.parse_args()
+    build_index(args.output, args.atoms, args.size, args.chunk)
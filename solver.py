@@ -0,0 +1,162 @@
+# Description: finds every atom layout that explains the rays shot so far in a BlackBoxGame
+
+import itertools
+import multiprocessing
+import os
+import random
+
+import BlackBox
+
+# state of a pool worker, set once by init_worker instead of being sent with every task
+_worker = {}
+
+
+def get_observations(game):
+    """
+    takes a BlackBoxGame and returns the distinct (entry, exit) pairs of the rays shot so far, exit is None for a hit
+    """
+    observations = []
+    for ray in game.get_rays() or []:
+        if ray not in observations:
+            observations.append(ray)
+
+    return observations
+
+
+def get_candidate_squares(observations, size=10):
+    """
+    finds the non-border squares that can still hold an atom. A ray that came out somewhere other than its entry was neither hit nor reflected on its first step, so the first square it moved into and the two squares beside that square are empty.
+    :param observations: list of (entry, exit) pairs
+    :param size: number of squares on each side of the board, border included
+    :return: list of (row, col) tuples in row-major order
+    """
+    board = BlackBox.Board([], size)
+    empty = set()
+    for entry, exit in observations:
+        if exit is None or exit == entry:
+            continue
+        ray = BlackBox.Ray(entry[0], entry[1], size)
+        row, col = board.get_next_pos(ray)
+        empty.add((row, col))
+        if ray.get_dir() in ("move down", "move up"):
+            empty.update([(row, col - 1), (row, col + 1)])
+        else:
+            empty.update([(row - 1, col), (row + 1, col)])
+
+    return [(row, col) for row in range(1, size - 1) for col in range(1, size - 1) if (row, col) not in empty]
+
+
+def order_observations(observations, candidates, atom_count=4, size=10, samples=200, seed=0):
+    """
+    sorts the observations so the ones that reject the most layouts are checked first. How often each observation holds is measured on a fixed sample of random layouts.
+    :return: new list of (entry, exit) pairs, most restrictive first
+    """
+    if len(candidates) < atom_count:
+        return list(observations)
+
+    rng = random.Random(seed)
+    matches = [0] * len(observations)
+    for _ in range(samples):
+        board = BlackBox.BitBoard(rng.sample(candidates, atom_count), size)
+        for i, (entry, exit) in enumerate(observations):
+            if board.get_exit(entry) == exit:
+                matches[i] += 1
+
+    order = sorted(range(len(observations)), key=lambda i: matches[i])
+    return [observations[i] for i in order]
+
+
+def is_consistent(layout, observations, size=10):
+    """
+    checks if an atom layout explains every observation, stops at the first one it does not
+    :param layout: list of (row, col) tuples
+    :param observations: list of (entry, exit) pairs
+    :return: True if every ray would have the recorded exit with these atoms, otherwise False
+    """
+    board = BlackBox.BitBoard(layout, size)
+    for entry, exit in observations:
+        if board.get_exit(entry) != exit:
+            return False
+
+    return True
+
+
+def init_worker(observations, candidates, atom_count, size):
+    """
+    stores the search parameters in a pool worker
+    """
+    _worker["observations"] = observations
+    _worker["candidates"] = candidates
+    _worker["atom_count"] = atom_count
+    _worker["size"] = size
+
+
+def search_prefix(prefix):
+    """
+    checks every layout whose first atoms are the given candidate squares, used as the task of a pool worker
+    :param prefix: tuple of increasing indexes into the candidate squares
+    :return: list of the consistent layouts
+    """
+    observations = _worker["observations"]
+    candidates = _worker["candidates"]
+    size = _worker["size"]
+    first = [candidates[i] for i in prefix]
+    rest = candidates[prefix[-1] + 1:] if prefix else candidates
+
+    found = []
+    for others in itertools.combinations(rest, _worker["atom_count"] - len(prefix)):
+        layout = first + list(others)
+        if is_consistent(layout, observations, size):
+            found.append(layout)
+
+    return found
+
+
+def get_prefixes(candidate_count, atom_count):
+    """
+    splits the search into tasks, each fixing the first one or two atoms of the layouts
+    :return: list of tuples of candidate indexes
+    """
+    length = min(2, atom_count)
+    return list(itertools.combinations(range(candidate_count), length))
+
+
+def find_layouts(observations, atom_count=4, size=10, processes=None):
+    """
+    generates every layout of atom_count atoms on the non-border squares that explains all the observations. Layouts are sorted lists of (row, col) tuples and are yielded as soon as the part of the search that found them is done.
+    :param observations: list of (entry, exit) pairs, exit is None for a hit and the entry for a reflection
+    :param atom_count: default parameter, number of atoms on the board
+    :param size: default parameter, number of squares on each side of the board, border included
+    :param processes: default parameter, number of worker processes, all cpus if None, 1 searches in this process
+    """
+    observations = list(dict.fromkeys(observations))
+    candidates = get_candidate_squares(observations, size)
+    if len(candidates) < atom_count:
+        return
+
+    observations = order_observations(observations, candidates, atom_count, size)
+    prefixes = get_prefixes(len(candidates), atom_count)
+    args = (observations, candidates, atom_count, size)
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes == 1:
+        init_worker(*args)
+        for prefix in prefixes:
+            yield from search_prefix(prefix)
+        return
+
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=args) as pool:
+        for found in pool.imap(search_prefix, prefixes, chunksize=8):
+            yield from found
+
+
+def solve(game, processes=None):
+    """
+    generates every layout that explains the rays shot so far in a BlackBoxGame
+    :param game: BlackBoxGame object
+    :param processes: default parameter, number of worker processes, all cpus if None
+    """
+    size = game.get_board().get_size()
+    return find_layouts(get_observations(game), len(game.get_atoms()), size, processes)
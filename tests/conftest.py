@@ -0,0 +1,10 @@
+# Description: lets the tests import the modules at the top of the repository, run with python -m pytest tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the front-end tests draw on a display that is never shown
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
@@ -0,0 +1,61 @@
+# Description: tests of the ray advisor
+
+import time
+
+import BlackBox
+import advisor
+import solver
+
+ATOMS = [(2, 3), (5, 5), (7, 2), (4, 8)]
+
+
+def test_recommends_a_ray_not_shot_yet():
+    game = BlackBox.BlackBoxGame(list(ATOMS), BlackBox.BitBoard)
+    game.shoot_ray(0, 3)
+    game.shoot_ray(4, 0)
+    move = advisor.recommend(game, budget=0.05, seed=1)
+    assert game.get_board().is_border_entry(move)
+    assert move not in [(0, 3), (4, 0)]
+
+
+def test_samples_explain_every_ray():
+    game = BlackBox.BlackBoxGame(list(ATOMS), BlackBox.BitBoard)
+    helper = advisor.Advisor(game, seed=2)
+    for entry in [(0, 3), (9, 5), (4, 0), (2, 9)]:
+        helper.recommend(0.02)
+        game.shoot_ray(*entry)
+    helper.update()
+    observations = solver.get_observations(game)
+    assert helper.get_samples()
+    for layout in helper.get_samples():
+        assert solver.is_consistent(list(layout), observations)
+
+
+def test_budget_is_kept():
+    game = BlackBox.BlackBoxGame(list(ATOMS), BlackBox.BitBoard)
+    start = time.perf_counter()
+    advisor.Advisor(game, seed=3).recommend(0.05)
+    assert time.perf_counter() - start < 0.5
+
+
+def test_no_move_once_every_ray_is_shot():
+    game = BlackBox.BlackBoxGame(list(ATOMS), BlackBox.BitBoard)
+    for entry in game.get_board().get_border_entries():
+        game.shoot_ray(*entry)
+    assert advisor.recommend(game, budget=0.01, seed=4) is None
+
+
+def test_undone_ray_is_forgotten():
+    game = BlackBox.BlackBoxGame(list(ATOMS), BlackBox.BitBoard)
+    helper = advisor.Advisor(game, seed=5)
+    game.shoot_ray(0, 3)
+    game.shoot_ray(9, 5)
+    helper.recommend(0.02)
+    game.undo()
+    game.shoot_ray(4, 0)
+    helper.recommend(0.02)
+    observations = solver.get_observations(game)
+    assert (9, 5) in helper.get_moves() and (4, 0) not in helper.get_moves()
+    assert helper.get_samples()
+    for layout in helper.get_samples():
+        assert solver.is_consistent(list(layout), observations)
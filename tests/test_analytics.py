@@ -0,0 +1,108 @@
+# Description: tests of the reports over exports of finished games
+
+import gzip
+import io
+import json
+import sys
+
+import pytest
+
+import BlackBox
+import analytics
+
+
+def get_lines(count=30):
+    """
+    plays a few games and returns their export lines, the last one without a newline
+    """
+    lines = []
+    for i in range(count):
+        atoms = [(1 + i % 8, 2), (5, 1 + (i * 3) % 8)] if i % 8 != 4 else [(5, 2)]
+        game = BlackBox.BlackBoxGame(atoms, BlackBox.BitBoard)
+        for entry in [(0, 1 + i % 8), (4, 0), (9, 6)]:
+            game.shoot_ray(*entry)
+        for pos in atoms:
+            game.guess_atom(*pos)
+        lines.append(json.dumps(analytics.get_record(game)))
+    return "\n".join(lines).encode()
+
+
+def test_report_of_replayed_games():
+    report = analytics.analyze_lines(get_lines().splitlines(keepends=True), first_line=1).get_report()
+    assert report["games"] == 30 and report["wins"] == 30
+    assert report["invalid_lines"] == report["ray_mismatches"] == report["score_mismatches"] == 0
+    assert sum(report["scores"].values()) == 30
+    assert report["rays_per_game"] == {"3": 30}
+    assert report["cells"]["10:4,0"]["rays"] == 30
+    assert report["openings"][0]["size"] == 10
+
+
+@pytest.mark.parametrize("record", [
+    {"atoms": [[-1, -1]], "rays": [], "score": 100},
+    {"atoms": [[2, 2]], "rays": [], "guesses": [[1e400, 2]], "score": 100},
+    {"atoms": [[2, 2]], "rays": [], "guesses": [[2, 40]], "score": 100},
+    {"size": 10 ** 6, "atoms": [[2, 2]], "rays": [], "score": 100},
+    {"size": 2, "atoms": [], "rays": [], "score": 100},
+    {"atoms": [[2, 2], [2, 2]], "rays": [], "score": 100},
+    {"atoms": [[2, 2]], "rays": [[[0, 2]]], "score": 100},
+    {"atoms": [[2, 2]], "score": 100},
+])
+def test_malformed_records_are_invalid(record):
+    report = analytics.Report()
+    report.add_game(record)
+    assert report.get_report()["invalid_lines"] == 1
+    assert report.get_games() == 0
+
+
+def test_mismatches_are_left_out_of_the_statistics():
+    report = analytics.Report()
+    report.add_game({"atoms": [[2, 2]], "rays": [[[0, 2], [0, 7]], [[4, 0], [4, 9]]], "score": 12345})
+    report.add_game({"atoms": [[2, 2]], "rays": [[[4, 0], [4, 9]]], "guesses": [[2, 2]], "score": 12345})
+    result = report.get_report()
+    assert (result["games"], result["mismatched_games"]) == (0, 2)
+    assert (result["ray_mismatches"], result["score_mismatches"]) == (1, 2)
+    assert result["wins"] == 0 and result["rays_per_game"] == {}
+    assert result["scores"] == {} and result["openings"] == [] and result["cells"] == {}
+
+
+def test_boards_of_each_size_are_counted_apart():
+    report = analytics.Report()
+    for size in (10, 20):
+        game = BlackBox.BlackBoxGame([(2, 4)], BlackBox.Board, size)
+        game.shoot_ray(0, 4)
+        report.add_game(analytics.get_record(game))
+    result = report.get_report()
+    assert result["cells"] == {"10:0,4": {"rays": 1, "hit_rate": 1.0, "reflect_rate": 0.0},
+                               "20:0,4": {"rays": 1, "hit_rate": 1.0, "reflect_rate": 0.0}}
+    assert sorted(opening["size"] for opening in result["openings"]) == [10, 20]
+
+
+def test_same_report_for_every_input(tmp_path, monkeypatch):
+    data = get_lines()
+    plain = tmp_path / "games.jsonl"
+    plain.write_bytes(data)
+    packed = tmp_path / "games.jsonl.gz"
+    packed.write_bytes(gzip.compress(data))
+
+    def run(path, processes):
+        for report in analytics.analyze(path, processes, chunk_bytes=500):
+            pass
+        return report.get_report()
+
+    expected = run(str(plain), 1)
+    assert run(str(plain), 2) == expected
+    assert run(str(packed), 2) == expected
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(data)))
+    assert run("-", 1) == expected
+
+
+def test_ranges_cover_the_file(tmp_path):
+    data = get_lines()  # no newline at the end
+    path = tmp_path / "games.jsonl"
+    path.write_bytes(data)
+    ranges = list(analytics.iter_ranges(str(path), 300))
+    assert ranges[0][2] == 0 and ranges[-1][3] == len(data)
+    for first, second in zip(ranges, ranges[1:]):
+        assert first[3] == second[2]
+    lines = [line for task in ranges for line in data[task[2]:task[3]].splitlines()]
+    assert lines == data.splitlines()
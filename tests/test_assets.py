@@ -0,0 +1,51 @@
+# Description: tests of the lazy asset loader and its disk cache of scaled images
+
+import os
+
+import pygame
+import pytest
+
+from assets import AssetManager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def display():
+    pygame.display.init()
+    pygame.font.init()
+    yield pygame.display.set_mode((100, 100))
+    pygame.display.quit()
+
+
+def test_scaled_image_is_cached(display, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    first = AssetManager(BASE_DIR, cache_dir).get_image("correct.png", (20, 30))
+    assert first.get_size() == (20, 30)
+    assert len(os.listdir(cache_dir)) == 1
+
+    second = AssetManager(BASE_DIR, cache_dir).get_image("correct.png", (20, 30))
+    assert pygame.image.tostring(second, "RGBA") == pygame.image.tostring(first, "RGBA")
+
+
+def test_unreadable_cache_file_is_replaced(display, tmp_path):
+    cache_dir = tmp_path / "cache"
+    AssetManager(BASE_DIR, str(cache_dir)).get_image("correct.png", (20, 30))
+    (cache_path,) = cache_dir.iterdir()
+    cache_path.write_bytes(b"not a png")
+    assert AssetManager(BASE_DIR, str(cache_dir)).get_image("correct.png", (20, 30)).get_size() == (20, 30)
+
+
+def test_images_and_fonts_are_loaded_once(display):
+    assets = AssetManager(BASE_DIR)
+    assert assets.get_image("wrong.png") is assets.get_image("wrong.png")
+    assert assets.get_font("Raleway-Medium.ttf", 20) is assets.get_font("Raleway-Medium.ttf", 20)
+
+
+def test_preload(display):
+    assets = AssetManager(BASE_DIR)
+    assets.preload([("correct.png", (10, 10)), ("missing.png", None)])
+    assert assets.get_image("correct.png", (10, 10)).get_size() == (10, 10)
+    with pytest.raises(FileNotFoundError):
+        assets.get_image("missing.png")
+    assert not assets.is_loading()
@@ -0,0 +1,52 @@
+# Description: tests of the sprite atlas
+
+import pygame
+import pytest
+
+from atlas import SpriteAtlas
+
+
+@pytest.fixture
+def display():
+    pygame.display.init()
+    yield pygame.display.set_mode((100, 100))
+    pygame.display.quit()
+
+
+def make_sprite(color, size=(10, 10)):
+    sprite = pygame.Surface(size, pygame.SRCALPHA)
+    sprite.fill((0, 0, 0, 0))
+    pygame.draw.circle(sprite, color, (size[0] // 2, size[1] // 2), size[0] // 2 - 1)
+    return sprite
+
+
+def test_blits_give_the_pixels_of_the_sprites(display):
+    atlas = SpriteAtlas(32, 16)
+    sprites = {i: make_sprite((40 * i, 255 - 40 * i, 100, 128 + 20 * i)) for i in range(6)}
+    for key, sprite in sprites.items():
+        atlas.add(key, sprite)
+    assert atlas.get_surface().get_height() > 16  # grew to fit the sprites
+
+    target = pygame.Surface((100, 20), pygame.SRCALPHA)
+    expected = pygame.Surface((100, 20), pygame.SRCALPHA)
+    target.blits([atlas.get_blit(key, (key * 12, 0)) for key in sprites])
+    for key, sprite in sprites.items():
+        expected.blit(sprite, (key * 12, 0))
+    assert pygame.image.tostring(target, "RGBA") == pygame.image.tostring(expected, "RGBA")
+
+
+def test_removed_room_is_reused(display):
+    atlas = SpriteAtlas()
+    atlas.add("a", make_sprite((255, 0, 0, 255)))
+    atlas.add("b", make_sprite((0, 255, 0, 255)))
+    area = atlas.get_area("a")
+    atlas.remove("a")
+    assert "a" not in atlas and len(atlas) == 1
+    atlas.add("c", make_sprite((0, 0, 255, 255)))
+    assert atlas.get_area("c") == area
+
+
+def test_wide_sprite_widens_the_surface(display):
+    atlas = SpriteAtlas(16, 16)
+    atlas.add("wide", make_sprite((255, 255, 255, 255), (40, 10)))
+    assert atlas.get_surface().get_width() >= 40
@@ -0,0 +1,42 @@
+# Description: tests that the NumPy batch tracer gives the exits of Board.find_exit
+
+import random
+
+import numpy as np
+import pytest
+
+import BlackBox
+import batch_tracer
+
+
+def test_trace_matches_board():
+    rng = random.Random(3)
+    squares = [(row, col) for row in range(1, 9) for col in range(1, 9)]
+    layouts = [rng.sample(squares, rng.randint(1, 6)) for _ in range(200)] + [[(4, 4), (6, 6), (6, 7)]]
+    boards = batch_tracer.layouts_to_boards(layouts)
+
+    for entry in batch_tracer.border_entries():
+        codes, exits = batch_tracer.trace(boards, entry)
+        for layout, code, exit in zip(layouts, codes, exits):
+            expected = BlackBox.Board(layout).get_exit(tuple(entry))
+            if expected is None:
+                assert code == batch_tracer.HIT and tuple(exit) == (-1, -1)
+            elif expected == tuple(entry):
+                assert code == batch_tracer.REFLECT and tuple(exit) == expected
+            else:
+                assert code == batch_tracer.EXIT and tuple(exit) == expected
+
+
+def test_one_origin_per_board():
+    layouts = [[(2, 3)], [(5, 5)]]
+    codes, exits = batch_tracer.trace(batch_tracer.layouts_to_boards(layouts), np.array([[0, 3], [5, 9]]))
+    assert list(codes) == [batch_tracer.HIT, batch_tracer.HIT]
+
+
+def test_border_entries_order():
+    assert [tuple(entry) for entry in batch_tracer.border_entries(12)] == BlackBox.Board([], 12).get_border_entries()
+
+
+def test_illegal_origin():
+    with pytest.raises(ValueError):
+        batch_tracer.trace(batch_tracer.layouts_to_boards([[(2, 3)]]), (0, 0))
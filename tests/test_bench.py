@@ -0,0 +1,22 @@
+# Description: tests of the benchmark runner and the comparison of two runs
+
+import bench
+
+
+def test_every_benchmark_runs():
+    report = bench.run_benchmarks(boards=3, min_time=0, repeat=1)
+    assert set(report["results"]) == set(bench.BENCHMARKS)
+    for result in report["results"].values():
+        assert result["ops_per_sec"] > 0
+        assert set(result) == {"ops_per_round", "ops_per_sec", "us_per_op", "peak_bytes_per_op", "retained_blocks"}
+
+
+def test_corpus_is_reproducible():
+    assert bench.get_corpus(seed=4, boards=5) == bench.get_corpus(seed=4, boards=5)
+    assert bench.get_script(seed=4) == bench.get_script(seed=4)
+
+
+def test_compare_flags_slowdowns():
+    old = {"results": {"a": {"ops_per_sec": 100.0}, "b": {"ops_per_sec": 100.0}, "c": {"ops_per_sec": 1.0}}}
+    new = {"results": {"a": {"ops_per_sec": 95.0}, "b": {"ops_per_sec": 80.0}}}
+    assert bench.compare(old, new, tolerance=0.1) == ["b"]
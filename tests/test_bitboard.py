@@ -0,0 +1,43 @@
+# Description: tests that BitBoard follows the same rules as Board
+
+import pickle
+import random
+
+import BlackBox
+
+
+def get_layouts(count, size=10, seed=0):
+    rng = random.Random(seed)
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    return [rng.sample(squares, rng.randint(1, 6)) for _ in range(count)]
+
+
+def test_exits_match_board():
+    for atoms in get_layouts(300):
+        assert BlackBox.BitBoard(list(atoms)).get_exits() == BlackBox.Board(list(atoms)).get_exits()
+
+
+def test_trapped_ray_is_a_hit():
+    assert BlackBox.BitBoard([(4, 4), (6, 6), (6, 7)]).get_exit((0, 6)) is None
+
+
+def test_atoms_mask():
+    board = BlackBox.BitBoard([(1, 2), (8, 8)])
+    assert board.get_atoms_mask() == 1 << 12 | 1 << 88
+
+
+def test_pickle_leaves_out_shared_tables():
+    board = BlackBox.BitBoard([(2, 3), (5, 5)])
+    data = pickle.dumps(board)
+    copy = pickle.loads(data)
+    assert copy.get_exits() == board.get_exits()
+    assert len(data) < len(pickle.dumps(board.build_geometry(10)))
+
+
+def test_game_with_bitboard():
+    atoms = [(5, 5), (1, 6), (4, 5), (6, 2), (1, 1)]
+    game = BlackBox.BlackBoxGame(list(atoms), BlackBox.BitBoard)
+    expected = BlackBox.BlackBoxGame(list(atoms))
+    for entry in BlackBox.Board(atoms).get_border_entries():
+        assert game.shoot_ray(*entry) == expected.shoot_ray(*entry)
+    assert game.get_score() == expected.get_score()
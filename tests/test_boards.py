@@ -0,0 +1,74 @@
+# Description: tests of N x N boards: Board, BitBoard and SparseBoard give the same exits, traced one ray at a time
+
+import random
+
+import BlackBox
+
+BOARD_CLASSES = (BlackBox.Board, BlackBox.BitBoard, BlackBox.SparseBoard)
+
+
+class CountingBoard(BlackBox.Board):
+    """
+    Represents a Board that counts the rays it traces
+    """
+    def __init__(self, pos_list, size=10):
+        super().__init__(pos_list, size)
+        self.traced = 0
+
+    def find_exit(self, ray, path=None):
+        self.traced += 1
+        super().find_exit(ray, path)
+
+
+def test_exit_table_matches_find_exit():
+    rng = random.Random(5)
+    for size in (3, 5, 10, 13, 24):
+        squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+        for _ in range(40):
+            atoms = rng.sample(squares, rng.randint(0, min(8, len(squares))))
+            exits = [board_class(list(atoms), size).get_exits() for board_class in BOARD_CLASSES]
+            assert exits[0] == exits[1] == exits[2]
+            board = BlackBox.Board(list(atoms), size)
+            assert list(exits[0]) == board.get_border_entries()
+            for entry, exit in exits[0].items():
+                ray = BlackBox.Ray(entry[0], entry[1], size)
+                board.find_exit(ray)
+                assert ray.get_exit() == exit
+
+
+def test_shot_traces_only_its_ray():
+    game = BlackBox.BlackBoxGame([(30, 40), (70, 2)], CountingBoard, 100)
+    assert game.shoot_ray(0, 40) == ((0, 40), None)
+    assert game.shoot_ray(0, 40) == ((0, 40), None)
+    assert game.shoot_ray(0, 0) is False
+    assert game.get_board().traced == 1
+    assert len(game.get_board().get_exits()) == 4 * 98
+
+
+def test_border_entries():
+    board = BlackBox.Board([], 6)
+    entries = board.get_border_entries()
+    assert len(entries) == 16
+    for row in range(-1, 7):
+        for col in range(-1, 7):
+            assert board.is_border_entry((row, col)) == ((row, col) in entries)
+
+
+def test_update_atoms_after_some_rays():
+    rng = random.Random(6)
+    size = 12
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    for board_class in BOARD_CLASSES:
+        for _ in range(50):
+            atoms = rng.sample(squares, 5)
+            board = board_class(list(atoms), size)
+            shot = rng.sample(board.get_border_entries(), 6)
+            old = {entry: board.get_exit(entry) for entry in shot}
+            new_pos = rng.choice([pos for pos in squares if pos not in atoms])
+            changed = board.move_atom(atoms[0], new_pos)
+
+            expected = board_class(atoms[1:] + [new_pos], size).get_exits()
+            assert sorted(changed) == sorted(entry for entry in shot if old[entry] != expected[entry])
+            assert board.get_exits() == expected
+            board.remove_atom(new_pos)
+            assert board.get_exits() == board_class(atoms[1:], size).get_exits()
@@ -0,0 +1,73 @@
+# Description: tests of the compact game state and its binary encoding
+
+import pickle
+import random
+import struct
+
+import pytest
+
+import BlackBox
+import compact
+from compact import CompactGame
+
+
+def play_both(atoms, moves, size=10):
+    game = BlackBox.BlackBoxGame(list(atoms), BlackBox.BitBoard if size <= 16 else BlackBox.SparseBoard, size)
+    packed = CompactGame(atoms, size)
+    for kind, pos in moves:
+        if kind == "shoot":
+            assert packed.shoot_ray(*pos) == game.shoot_ray(*pos)
+        else:
+            assert packed.guess_atom(*pos) == game.guess_atom(*pos)
+        assert (packed.get_score(), packed.get_status()) == (game.get_score(), game.get_status())
+    return game, packed
+
+
+def get_moves(rng, size, count):
+    entries = BlackBox.Board([], size).get_border_entries()
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    return [("shoot", rng.choice(entries)) if rng.random() < 0.8 else ("guess", rng.choice(squares))
+            for _ in range(count)]
+
+
+def test_same_results_as_blackboxgame():
+    rng = random.Random(9)
+    squares = [(row, col) for row in range(1, 9) for col in range(1, 9)]
+    for _ in range(100):
+        atoms = rng.sample(squares, 4)
+        game, packed = play_both(atoms, get_moves(rng, 10, 15))
+        assert CompactGame.from_game(game) == packed
+        assert sorted(packed.get_rays()) == sorted(set(game.get_rays()))
+
+
+def test_binary_round_trip():
+    rng = random.Random(10)
+    for size in (3, 10, 300, 1000):
+        atoms = [(1, 1)] if size == 3 else [(1, 2), (size - 2, size - 3), (size // 2, size // 2)]
+        packed = play_both(atoms, get_moves(rng, size, 12), size)[1]
+        data = packed.to_bytes()
+        assert len(data) == len(CompactGame([], size).to_bytes())
+        copy = CompactGame.from_bytes(data)
+        assert copy == packed
+        assert copy.get_rays() == packed.get_rays()
+        assert pickle.loads(pickle.dumps(packed)) == packed
+    assert len(CompactGame([], 10).to_bytes()) == 38
+
+
+def test_version_1_bytes_are_read():
+    packed = play_both([(2, 3), (5, 5)], [("shoot", (0, 3)), ("guess", (5, 5))])[1]
+    data = packed.to_bytes()
+    old = struct.pack("<BBBh", 1, 10, 0, packed.get_score()) + data[compact.HEADER.size:]
+    assert CompactGame.from_bytes(old) == packed
+
+
+def test_bad_sizes_and_bytes():
+    for size in (2, compact.MAX_SIZE + 1, 10.0):
+        with pytest.raises(ValueError):
+            CompactGame([], size)
+    data = CompactGame([(2, 2)]).to_bytes()
+    for bad in (b"", b"\x07" + data[1:], data[:-1], data[:3]):
+        with pytest.raises(ValueError):
+            CompactGame.from_bytes(bad)
+    with pytest.raises(ValueError):
+        CompactGame([(0, 4)])
@@ -0,0 +1,44 @@
+# Description: tests of the indistinguishable layout classes
+
+import itertools
+
+import BlackBox
+import equivalence
+import signatures
+
+
+def get_brute_force_classes(atom_count, size):
+    groups = {}
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    for layout in itertools.combinations(squares, atom_count):
+        exits = BlackBox.Board(list(layout), size).get_exits()
+        groups.setdefault(tuple(exits.values()), []).append(list(layout))
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+
+def test_classes_match_brute_force(tmp_path):
+    path = str(tmp_path / "index.bin")
+    signatures.build_index(path, atom_count=3, size=6)
+    expected = get_brute_force_classes(3, 6)
+    assert expected
+    for processes in (1, 2):
+        found = sorted(sorted(group) for group in equivalence.find_classes(path, 4, processes, block=100))
+        assert found == expected
+
+    report = equivalence.get_report(path, 4, 1)
+    assert report["layouts"] == 560
+    assert report["classes"] == report["distinguishable"] + len(expected)
+    assert sum(int(length) * count for length, count in report["class_sizes"].items()) == 560
+
+
+def test_are_indistinguishable(tmp_path):
+    path = str(tmp_path / "index.bin")
+    signatures.build_index(path, atom_count=3, size=6)
+    classes = get_brute_force_classes(3, 6)
+    first, second = classes[0][:2]
+    other = classes[1][0]
+    with signatures.SignatureIndex(path) as index:
+        for source in (None, index):
+            assert equivalence.are_indistinguishable(first, second, 6, source)
+            assert equivalence.are_indistinguishable(first, list(reversed(first)), 6, source)
+            assert not equivalence.are_indistinguishable(first, other, 6, source)
@@ -0,0 +1,75 @@
+# Description: tests of the binary event log: round trip, replay and records that do not fit
+
+import pytest
+
+import BlackBox
+import eventlog
+
+
+def play(log, game_id, atoms, board_class=BlackBox.BitBoard, size=10):
+    game = BlackBox.BlackBoxGame(list(atoms), board_class, size, event_log=log, game_id=game_id)
+    for entry in [(0, 3), (9, 5), (4, 0), (2, 9)]:
+        game.shoot_ray(*entry)
+    game.guess_atom(2, 3)
+    game.guess_atom(1, 1)
+    return game
+
+
+def test_round_trip_and_replay(tmp_path):
+    path = str(tmp_path / "events.log")
+    with eventlog.EventLog(path) as log:
+        first = play(log, 1, [(2, 3), (5, 5), (7, 2)])
+        second = play(log, 2 ** 40, [(4, 4)], BlackBox.SparseBoard, 12)
+
+    with eventlog.EventLogReader(path) as reader:
+        assert len(reader) == (1 + 3 + 4 + 2) + (1 + 1 + 2 + 2)  # (9, 5) and (2, 9) are not origins on 12 x 12
+        assert reader[0] == eventlog.Event(1, eventlog.CREATE, (10, 3), (1, 0), 100)
+        shots = list(reader.filter(game_id=1, event_type=eventlog.SHOOT))
+        assert [(event.entry, event.exit) for event in shots] == first.get_rays()
+        games = reader.replay()
+
+    for game_id, game in [(1, first), (2 ** 40, second)]:
+        assert games[game_id].get_rays() == game.get_rays()
+        assert games[game_id].get_guesses() == game.get_guesses()
+        assert games[game_id].get_score() == game.get_score()
+
+
+def test_partial_last_record_is_ignored(tmp_path):
+    path = tmp_path / "events.log"
+    with eventlog.EventLog(str(path)) as log:
+        play(log, 1, [(2, 3)])
+    path.write_bytes(path.read_bytes() + b"\x01\x02\x03")
+    with eventlog.EventLogReader(str(path)) as reader:
+        assert len(reader) == 8
+        assert 1 in reader.replay()
+
+
+def test_out_of_range_guess_leaves_the_game_unchanged(tmp_path):
+    path = str(tmp_path / "events.log")
+    with eventlog.EventLog(path) as log:
+        game = play(log, 1, [(2, 3), (5, 5)])
+        before = game.get_snapshot()
+        for row in (40000, 1e400):
+            with pytest.raises(ValueError):
+                game.guess_atom(row, 2)
+        assert game.get_snapshot() == before
+    with eventlog.EventLogReader(path) as reader:
+        assert reader.replay()[1].get_score() == game.get_score()
+
+
+def test_board_too_large_is_not_logged(tmp_path):
+    path = tmp_path / "events.log"
+    with eventlog.EventLog(str(path)) as log:
+        with pytest.raises(ValueError):
+            BlackBox.BlackBoxGame([(2, 3)], BlackBox.SparseBoard, 40000, event_log=log, game_id=1)
+    assert path.read_bytes() == b""
+
+
+def test_close_during_iteration(tmp_path):
+    path = str(tmp_path / "events.log")
+    with eventlog.EventLog(path) as log:
+        play(log, 1, [(2, 3)])
+    reader = eventlog.EventLogReader(path)
+    events = iter(reader)
+    next(events)
+    reader.close()  # the unfinished iteration must not keep the map open
@@ -0,0 +1,39 @@
+# Description: tests of shoot_ray and the exit table of Board
+
+import BlackBox
+
+
+def test_trapped_ray_is_a_hit():
+    # this ray bounces between the atoms forever
+    game = BlackBox.BlackBoxGame([(4, 4), (6, 6), (6, 7)])
+    assert game.shoot_ray(0, 6) == ((0, 6), None)
+    assert game.get_hits() == [(0, 6)]
+    assert game.get_score() == 99
+
+
+def test_illegal_origins_are_rejected():
+    game = BlackBox.BlackBoxGame([(2, 3)])
+    for row, col in [(0, 0), (0, 9), (9, 0), (9, 9), (4, 4), (-1, 3), (3, 10), (10, 10)]:
+        assert game.shoot_ray(row, col) is False
+    assert game.get_score() == 100
+    assert game.get_rays() is None
+
+
+def test_shots_match_the_exit_table():
+    atoms = [(5, 5), (1, 6), (4, 5), (6, 2), (1, 1)]
+    exits = BlackBox.Board(list(atoms)).get_exits()
+    assert sorted(exits) == sorted(BlackBox.Board(atoms).get_border_entries())
+    assert len(exits) == 32
+
+    game = BlackBox.BlackBoxGame(list(atoms))
+    for entry, exit in exits.items():
+        assert game.shoot_ray(*entry) == (entry, exit)
+
+
+def test_score_counts_each_border_square_once():
+    game = BlackBox.BlackBoxGame([(5, 5), (1, 6), (4, 5), (6, 2), (1, 1)])
+    assert game.shoot_ray(0, 4) == ((0, 4), (3, 0))
+    assert game.get_score() == 98
+    game.shoot_ray(0, 4)
+    game.shoot_ray(3, 0)  # comes back out at (0, 4)
+    assert game.get_score() == 98
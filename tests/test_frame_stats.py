@@ -0,0 +1,32 @@
+# Description: tests of the frame-time record
+
+import json
+
+from frame_stats import BUCKETS, FrameStats
+
+
+def test_histogram_and_summary():
+    stats = FrameStats()
+    for i in range(100):
+        stats.record(0.001 * (i % 10), 0.02)
+    report = stats.get_report()
+    assert report["frames"] == 100
+    assert sum(report["update"]["histogram"]) == 100
+    assert report["render"]["histogram"][BUCKETS.index(33)] == 100
+    assert report["update"]["summary"]["max"] == 9.0
+    assert report["render"]["summary"]["p50"] == 20.0
+
+
+def test_window_keeps_the_last_frames(tmp_path):
+    stats = FrameStats(window=10)
+    for i in range(25):
+        stats.record(i, 0)
+    report = stats.get_report()
+    assert (report["frames"], report["window"]) == (25, 10)
+    assert report["update"]["summary"]["max"] == 24000.0
+    stats.dump(str(tmp_path / "frames.json"))
+    assert json.loads((tmp_path / "frames.json").read_text()) == report
+
+
+def test_empty():
+    assert FrameStats().get_summary(0) == {}
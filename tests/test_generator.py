@@ -0,0 +1,50 @@
+# Description: tests of the puzzle generator
+
+import BlackBox
+import generator
+import pytest
+
+
+def test_same_layouts_for_any_number_of_workers():
+    one = list(generator.generate(40, seed=3, atom_count=2, size=6, processes=1, chunk_size=8))
+    two = list(generator.generate(40, seed=3, atom_count=2, size=6, processes=2, chunk_size=8))
+    assert one == two
+    assert len(one) == 40
+    assert len(set(tuple(layout) for layout, difficulty in one)) == 40
+
+
+def test_layouts_pass_the_filters():
+    counts = generator.get_signature_counts(2, 6)
+    for layout, difficulty in generator.generate(30, atom_count=2, size=6, min_difficulty=0.2, max_difficulty=0.8,
+                                                 processes=1, chunk_size=16, counts=counts):
+        assert 0.2 <= difficulty <= 0.8
+        assert difficulty == generator.get_difficulty(BlackBox.Board(layout, 6))
+        assert counts[generator.get_rank(layout, 6)] == 1
+
+
+def test_stops_when_too_few_layouts_pass():
+    # a 5 x 5 board has 36 layouts of 2 atoms
+    for processes in (1, 2):
+        found = list(generator.generate(100, atom_count=2, size=5, unique=False, processes=processes, chunk_size=4))
+        assert 30 <= len(found) <= 36
+    assert list(generator.generate(5, atom_count=2, size=5, min_difficulty=0.99, unique=False, processes=1)) == []
+    assert len(list(generator.generate(100, atom_count=2, size=5, unique=False, processes=1, chunk_size=4,
+                                        max_chunks=2))) <= 8
+
+
+def test_empty_difficulty_range():
+    with pytest.raises(ValueError):
+        list(generator.generate(5, min_difficulty=0.6, max_difficulty=0.4, unique=False))
+
+
+def test_puzzles_must_fit_the_front_end(tmp_path):
+    path = tmp_path / "puzzles.jsonl"
+    path.write_text('{"atoms": [[1, 2], [3, 4]], "difficulty": 0.5}\n\n{"atoms": [[2, 2], [5, 5]], "size": 10}\n')
+    assert generator.load_puzzles(str(path), atom_count=2, size=10) == [[(1, 2), (3, 4)], [(2, 2), (5, 5)]]
+    for atom_count, size in [(4, 10), (2, 12)]:
+        with pytest.raises(ValueError):
+            generator.load_puzzles(str(path), atom_count, size)
+    path.write_text('{"atoms": [[1, 2], [3, 4]], "size": 6}\n')
+    with pytest.raises(ValueError):
+        generator.load_puzzles(str(path), size=10)
+    assert generator.load_puzzles(str(path)) == [[(1, 2), (3, 4)]]
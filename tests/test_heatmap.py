@@ -0,0 +1,99 @@
+# Description: tests of the atom probabilities, exact from a signature index and estimated from a sample
+
+import itertools
+import queue
+import threading
+import time
+
+import pytest
+
+import BlackBox
+import heatmap
+import signatures
+import solver
+
+
+def get_exact(atom_count, size, observations):
+    """
+    counts how many of the layouts that explain the observations hold an atom on each square
+    """
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    counts = [0] * (size * size)
+    total = 0
+    for layout in itertools.combinations(squares, atom_count):
+        if solver.is_consistent(list(layout), observations, size):
+            total += 1
+            for row, col in layout:
+                counts[row * size + col] += 1
+    return [count / total for count in counts], total
+
+
+def shoot(atoms, size, entries):
+    game = BlackBox.BlackBoxGame(list(atoms), BlackBox.Board, size)
+    for entry in entries:
+        game.shoot_ray(*entry)
+    return solver.get_observations(game)
+
+
+@pytest.mark.parametrize("atom_count, size", [(2, 7), (1, 20)])
+def test_table_matches_every_layout(tmp_path, atom_count, size):
+    path = str(tmp_path / "index.bin")
+    signatures.build_index(path, atom_count=atom_count, size=size, chunk=100)
+    atoms = [(size - 2, size - 3), (2, 3)][:atom_count]  # the far square passes 255 on the larger board
+    observations = shoot(atoms, size, [(0, 3), (2, 0), (size - 1, size - 3), (3, size - 1)])
+    with signatures.SignatureIndex(path) as index:
+        table = heatmap.LayoutTable(index)
+        table.set_observations(observations[:2])
+        table.set_observations(observations)
+        probabilities, count = table.get_probabilities()
+        assert (probabilities, count) == pytest.approx(get_exact(atom_count, size, observations))
+
+        table.set_observations(observations[1:])  # the first ray taken back
+        assert table.get_probabilities() == pytest.approx(get_exact(atom_count, size, observations[1:]))
+
+
+def test_sampler_is_exact_with_few_candidates():
+    observations = shoot([(2, 3), (5, 5)], 7, [(0, 3), (2, 0), (6, 5), (5, 6), (0, 2)])
+    sampler = heatmap.LayoutSampler(2, 7)
+    sampler.set_observations(observations)
+    assert sampler.is_final()
+    assert sampler.get_probabilities() == pytest.approx(get_exact(2, 7, observations))
+
+
+def test_worker_answers_the_newest_rays():
+    game = BlackBox.BlackBoxGame([(2, 3), (5, 5)], BlackBox.BitBoard, 7)
+    view = heatmap.Heatmap(2, 7)
+    try:
+        game.shoot_ray(0, 3)
+        view.update(game)
+        game.shoot_ray(2, 0)
+        view.update(game)
+        deadline = time.time() + 10
+        while view.is_pending() and time.time() < deadline:
+            view.poll()
+            time.sleep(0.01)
+        assert not view.is_pending()
+        expected, count = get_exact(2, 7, solver.get_observations(game))
+        assert view.get_layout_count() == count
+        assert view.get_probability(2, 3) == pytest.approx(expected[2 * 7 + 3])
+    finally:
+        view.close()
+
+
+def test_growing_sample_sends_few_results(monkeypatch):
+    monkeypatch.setattr(heatmap, "RESULT_INTERVAL", 60)  # only growth sends a result, however slow the machine is
+    game = BlackBox.BlackBoxGame([(2, 3), (5, 5), (7, 2), (4, 8)], BlackBox.BitBoard)
+    game.shoot_ray(0, 3)
+    requests, results = queue.Queue(), queue.Queue()
+    requests.put((1, solver.get_observations(game)))
+    worker = threading.Thread(target=heatmap.run_worker, args=(requests, results, None, 4, 10), daemon=True)
+    worker.start()
+    answers = [results.get(timeout=30)]
+    while not answers[-1][3]:
+        answers.append(results.get(timeout=30))
+    requests.put(heatmap.STOP)
+    worker.join(5)
+
+    counts = [count for version, probabilities, count, final in answers]
+    assert counts == sorted(counts) and counts[-1] >= 3000
+    assert len(answers) <= 12  # about 30 before, one after every batch of 200 tries
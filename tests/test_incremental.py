@@ -0,0 +1,51 @@
+# Description: tests that adding, removing and moving atoms retraces exactly the rays whose exit changed
+
+import random
+
+import pytest
+
+import BlackBox
+
+BOARD_CLASSES = (BlackBox.Board, BlackBox.BitBoard, BlackBox.SparseBoard)
+
+
+def test_changes_match_a_full_retrace():
+    rng = random.Random(11)
+    for board_class in BOARD_CLASSES:
+        for size in (6, 10, 20):
+            squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+            atoms = rng.sample(squares, 4)
+            board = board_class(list(atoms), size)
+            exits = dict(board.get_exits())
+            for _ in range(30):
+                free = [pos for pos in squares if pos not in atoms]
+                move = rng.choice(["add", "remove", "move"] if len(atoms) > 1 else ["add"])
+                if move == "add":
+                    pos = rng.choice(free)
+                    changed = board.add_atom(pos)
+                    atoms.append(pos)
+                elif move == "remove":
+                    pos = rng.choice(atoms)
+                    changed = board.remove_atom(pos)
+                    atoms.remove(pos)
+                else:
+                    old, new = rng.choice(atoms), rng.choice(free)
+                    changed = board.move_atom(old, new)
+                    atoms[atoms.index(old)] = new
+
+                expected = board_class(list(atoms), size).get_exits()
+                assert board.get_exits() == expected
+                assert sorted(changed) == sorted(entry for entry in expected if expected[entry] != exits[entry])
+                exits = dict(expected)
+
+
+def test_bad_changes_are_rejected():
+    board = BlackBox.BitBoard([(2, 3)])
+    board.get_exits()
+    with pytest.raises(ValueError):
+        board.remove_atom((4, 4))
+    with pytest.raises(ValueError):
+        board.add_atom((2, 3))
+    with pytest.raises(ValueError):
+        board.add_atom((0, 3))
+    assert board.get_atoms_pos() == [(2, 3)]
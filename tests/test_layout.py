@@ -0,0 +1,50 @@
+# Description: tests of the board coordinate mapping and the widget hit grid
+
+import random
+
+import pygame
+
+from layout import BoardLayout, HitGrid
+
+
+def test_screen_and_board_round_trip():
+    layout = BoardLayout(100, 50, 500, 500)
+    assert layout.get_tile_size() == (50, 50)
+    for row in range(10):
+        for col in range(10):
+            x, y = layout.to_screen(row, col)
+            assert layout.get_tile((x, y)) == (row, col)
+            assert layout.get_tile((x + 49, y + 49)) == (row, col)
+    assert layout.get_tile((99, 60)) is None
+    assert layout.get_tile((600, 60)) is None
+    assert layout.is_corner((9, 0)) and not layout.is_corner((0, 4))
+
+
+def test_hit_grid_matches_a_linear_search():
+    rng = random.Random(8)
+    grid = HitGrid(400, 300, cell_size=32)
+    widgets = []
+    for i in range(60):
+        rect = pygame.Rect(rng.randrange(-20, 400), rng.randrange(-20, 300), rng.randrange(1, 120), rng.randrange(1, 90))
+        grid.add(i, rect)
+        widgets.append((i, rect))
+    for i in range(0, 60, 7):
+        grid.remove(i)
+    widgets = [(i, rect) for i, rect in widgets if i % 7]
+
+    for _ in range(2000):
+        pos = (rng.randrange(400), rng.randrange(300))
+        expected = None
+        for i, rect in reversed(widgets):  # the last added is on top
+            if rect.collidepoint(pos):
+                expected = i
+                break
+        assert grid.get_widget(pos) == expected
+
+
+def test_adding_again_moves_a_widget():
+    grid = HitGrid(100, 100)
+    grid.add("button", pygame.Rect(0, 0, 10, 10))
+    grid.add("button", pygame.Rect(50, 50, 10, 10))
+    assert grid.get_widget((5, 5)) is None
+    assert grid.get_widget((55, 55)) == "button"
@@ -0,0 +1,70 @@
+# Description: tests of the metrics registry and the engine instrumentation
+
+import json
+
+import pytest
+
+import BlackBox
+import metrics
+
+
+@pytest.fixture
+def registry():
+    target = metrics.Registry()
+    metrics.instrument(target)
+    yield target
+    metrics.uninstrument()
+
+
+def get_value(snapshot, name, **labels):
+    for entry in snapshot[name]["series"]:
+        if entry["labels"] == {key: str(value) for key, value in labels.items()}:
+            return entry.get("value", entry.get("count"))
+    return None
+
+
+def test_engine_is_measured(registry):
+    for board_class in (BlackBox.Board, BlackBox.BitBoard, BlackBox.SparseBoard):
+        game = BlackBox.BlackBoxGame([(2, 3), (5, 5)], board_class)
+        game.shoot_ray(0, 3)  # hit
+        game.shoot_ray(0, 4)
+        game.shoot_ray(0, 0)  # rejected
+        game.guess_atom(2, 3)
+
+    snapshot = registry.get_snapshot()
+    assert get_value(snapshot, "blackbox_shots_total", outcome="hit") == 3
+    assert get_value(snapshot, "blackbox_shots_total", outcome="rejected") == 3
+    assert get_value(snapshot, "blackbox_guesses_total", correct="true") == 3
+    for name in ("Board", "BitBoard", "SparseBoard"):
+        assert get_value(snapshot, "blackbox_find_exit_seconds", board=name) == 2
+        assert get_value(snapshot, "blackbox_find_exit_steps_total", board=name) > 0
+    assert get_value(snapshot, "blackbox_can_move_calls_total", board="Board") > 0
+
+
+def test_uninstrument_puts_the_methods_back():
+    original = BlackBox.BitBoard.find_exit
+    metrics.instrument(metrics.Registry())
+    assert metrics.is_instrumented() and BlackBox.BitBoard.find_exit is not original
+    metrics.uninstrument()
+    assert not metrics.is_instrumented() and BlackBox.BitBoard.find_exit is original
+
+
+def test_histogram_and_formats(tmp_path):
+    target = metrics.Registry()
+    histogram = target.histogram("latency_seconds", "a latency", (0.1, 1, float("inf")), path="a")
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+    target.counter("requests_total", "requests").inc(3)
+    assert histogram.get_counts() == [1, 1, 1]
+
+    text = target.to_prometheus()
+    assert 'latency_seconds_bucket{path="a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{path="a",le="+Inf"} 3' in text
+    assert "requests_total 3" in text
+
+    target.dump(str(tmp_path / "metrics.prom"))
+    target.dump(str(tmp_path / "metrics.json"))
+    assert (tmp_path / "metrics.prom").read_text() == text
+    assert json.loads((tmp_path / "metrics.json").read_text())["requests_total"]["series"][0]["value"] == 3
+    with pytest.raises(ValueError):
+        target.counter("latency_seconds")
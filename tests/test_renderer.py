@@ -0,0 +1,73 @@
+# Description: tests that the dirty-rectangle renderer repaints only what changed, with the pixels of a full repaint
+
+import pygame
+import pytest
+
+from renderer import DirtyRenderer
+
+
+@pytest.fixture
+def screen():
+    pygame.display.init()
+    yield pygame.display.set_mode((200, 100))
+    pygame.display.quit()
+
+
+def draw_boxes(screen, colors):
+    screen.fill((0, 0, 0))
+    for i, color in enumerate(colors):
+        pygame.draw.rect(screen, color, pygame.Rect(i * 50, 0, 40, 40))
+
+
+def test_only_changed_regions_are_repainted(screen):
+    renderer = DirtyRenderer(screen)
+    colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+
+    def regions():
+        return {i: (colors[i], pygame.Rect(i * 50, 0, 40, 40)) for i in range(3)}
+
+    assert renderer.render(regions(), lambda: draw_boxes(screen, colors)) == [screen.get_rect()]
+    assert renderer.render(regions(), lambda: draw_boxes(screen, colors)) == []
+
+    colors[1] = (255, 255, 0)
+    assert renderer.render(regions(), lambda: draw_boxes(screen, colors)) == [pygame.Rect(50, 0, 40, 40)]
+
+    expected = screen.copy()
+    draw_boxes(expected, colors)
+    assert pygame.image.tostring(screen, "RGB") == pygame.image.tostring(expected, "RGB")
+
+
+def test_removed_region_and_invalidate(screen):
+    renderer = DirtyRenderer(screen)
+    renderer.render({"a": (1, pygame.Rect(0, 0, 10, 10)), "b": (1, pygame.Rect(20, 0, 10, 10))}, lambda: None)
+    assert renderer.render({"a": (1, pygame.Rect(0, 0, 10, 10))}, lambda: None) == [pygame.Rect(20, 0, 10, 10)]
+    renderer.invalidate()
+    assert renderer.render({"a": (1, pygame.Rect(0, 0, 10, 10))}, lambda: None) == [screen.get_rect()]
+
+
+def test_many_changes_become_one_rect(screen):
+    renderer = DirtyRenderer(screen, max_rects=2)
+    renderer.render({i: (0, pygame.Rect(i * 20, 0, 10, 10)) for i in range(5)}, lambda: None)
+    dirty = renderer.render({i: (1, pygame.Rect(i * 20, 0, 10, 10)) for i in range(5)}, lambda: None)
+    assert dirty == [pygame.Rect(0, 0, 90, 10)]
+
+
+def test_one_draw_per_frame(screen):
+    renderer = DirtyRenderer(screen)
+    colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+    calls = []
+
+    def draw():
+        calls.append(screen.get_clip())
+        draw_boxes(screen, colors)
+
+    renderer.render({i: (colors[i], pygame.Rect(i * 50, 0, 40, 40)) for i in range(3)}, draw)
+    colors[0], colors[2] = (255, 255, 0), (0, 255, 255)
+    calls.clear()
+    dirty = renderer.render({i: (colors[i], pygame.Rect(i * 50, 0, 40, 40)) for i in range(3)}, draw)
+    assert dirty == [pygame.Rect(0, 0, 40, 40), pygame.Rect(100, 0, 40, 40)]
+    assert calls == [pygame.Rect(0, 0, 140, 40)]
+
+    expected = screen.copy()
+    draw_boxes(expected, colors)
+    assert pygame.image.tostring(screen, "RGB") == pygame.image.tostring(expected, "RGB")
@@ -0,0 +1,42 @@
+# Description: tests of the self-play harness
+
+import random
+
+import selfplay
+
+
+def test_results_do_not_depend_on_workers():
+    one = next(reversed(list(selfplay.simulate(30, ("random", "sweep"), seed=5, processes=1, chunk_size=7))))
+    two = next(reversed(list(selfplay.simulate(30, ("random", "sweep"), seed=5, processes=2, chunk_size=7))))
+    for name in ("random", "sweep"):
+        assert one[name].get_report() == two[name].get_report()
+        assert one[name].get_games() == 30
+
+
+def test_more_rays_than_border_squares():
+    for name in ("random", "sweep"):
+        strategy = selfplay.get_strategy(name)(rays=40)
+        for index in range(5):
+            score, won, rays = selfplay.play_game(strategy, selfplay.get_layout(0, index), 10, random.Random(index))
+            assert rays == 32
+            assert 0 <= score <= 100
+
+
+def test_greedy_strategy_plays_a_game():
+    strategy = selfplay.get_strategy("greedy")(rays=4, rounds=2)
+    score, won, rays = selfplay.play_game(strategy, selfplay.get_layout(1, 0), 10, random.Random(0))
+    assert rays <= 4 and 0 <= score <= 100
+
+
+def test_aggregates_merge():
+    first, second, both = selfplay.Aggregate(), selfplay.Aggregate(), selfplay.Aggregate()
+    for i, (score, won, rays) in enumerate([(90, True, 5), (40, False, 8), (85, True, 5)]):
+        (first if i % 2 else second).add(score, won, rays)
+        both.add(score, won, rays)
+    first.merge(second)
+    assert first.get_report() == both.get_report()
+    assert both.get_report()["win_rate"] == round(2 / 3, 4)
+
+
+def test_strategy_from_a_module():
+    assert selfplay.get_strategy("selfplay:SweepStrategy") is selfplay.SweepStrategy
@@ -0,0 +1,77 @@
+# Description: tests of the game server protocol
+
+import asyncio
+import json
+
+import server
+from sessions import SessionStore
+
+
+def ask(game_server, request):
+    return json.loads(game_server.handle_line(json.dumps(request).encode()))
+
+
+def test_game_over_the_protocol():
+    game_server = server.GameServer(seed=1)
+    game_id = ask(game_server, {"id": 1, "op": "create", "atoms": [[2, 3], [5, 5]]})["result"]
+    assert ask(game_server, {"id": 2, "op": "shoot", "game": game_id, "row": 0, "col": 3}) == \
+        {"id": 2, "ok": True, "result": [[0, 3], None]}
+    assert ask(game_server, {"id": 3, "op": "shoot", "game": game_id, "row": 0, "col": 0})["result"] is False
+    assert ask(game_server, {"id": 4, "op": "guess", "game": game_id, "row": 2, "col": 3})["result"] is True
+    assert ask(game_server, {"id": 5, "op": "score", "game": game_id})["result"] == 99
+    assert ask(game_server, {"id": 6, "op": "close", "game": game_id})["result"] is True
+    assert ask(game_server, {"id": 7, "op": "score", "game": game_id})["error"] == "unknown game"
+
+
+def test_errors():
+    game_server = server.GameServer(max_games=1)
+    assert not json.loads(game_server.handle_line(b"not json"))["ok"]
+    assert ask(game_server, {"id": 1, "op": "fly"})["error"] == "unknown op"
+    assert ask(game_server, {"id": 2, "op": "shoot", "row": 0, "col": 3})["error"] == "missing game"
+    assert not ask(game_server, {"id": 3, "op": "create", "atoms": [[0, 3]]})["ok"]
+    assert not ask(game_server, {"id": 4, "op": "create", "size": 2})["ok"]
+    game_id = ask(game_server, {"id": 5, "op": "create"})["result"]
+    assert ask(game_server, {"id": 6, "op": "create"})["error"] == "too many games"
+    assert not ask(game_server, {"id": 7, "op": "shoot", "game": game_id, "row": 0.5, "col": 3})["ok"]
+
+
+def test_every_failure_is_answered():
+    game_server = server.GameServer()
+    answer = json.loads(game_server.handle_line(b"[" * 100000 + b"]" * 100000))
+    assert not answer["ok"] and answer["id"] is None
+
+    def fail(request):
+        raise IndexError("no such square")
+    game_server._ops["fail"] = fail
+    assert ask(game_server, {"id": 8, "op": "fail"}) == {"id": 8, "ok": False, "error": "IndexError: no such square"}
+
+
+def test_pipelined_requests_over_tcp():
+    async def run():
+        game_server = server.GameServer(seed=2)
+        await game_server.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", game_server.get_port())
+        writer.write(b'{"id": 1, "op": "create", "atoms": [[2, 3]]}\n')
+        lines = [json.dumps({"id": i, "op": "score", "game": 1}).encode() + b"\n" for i in range(2, 52)]
+        writer.write(b"".join(lines))
+        answers = [json.loads(await reader.readline()) for _ in range(51)]
+        writer.close()
+        await game_server.stop()
+        return answers
+
+    answers = asyncio.run(run())
+    assert [answer["id"] for answer in answers] == list(range(1, 52))
+    assert all(answer["result"] == 100 for answer in answers[1:])
+
+
+def test_idle_games_are_spilled(tmp_path):
+    async def run(store):
+        server.GameServer(sessions=store).create({"atoms": [[2, 3]]})
+        evictor = asyncio.create_task(server.evict_idle(store, 0.01, 0.01))
+        await asyncio.sleep(0.1)
+        evictor.cancel()
+
+    with SessionStore(str(tmp_path / "spill")) as store:
+        asyncio.run(run(store))
+        assert store.get_stats()["on_disk"] == 1
+        assert store[1].get_atoms() == [(2, 3)]
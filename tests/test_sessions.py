@@ -0,0 +1,60 @@
+# Description: tests of the session store that spills games to disk
+
+import pytest
+
+import BlackBox
+from sessions import SessionStore
+
+
+def make_game(seed):
+    game = BlackBox.BlackBoxGame([(2, 3), (5, seed % 8 + 1)], BlackBox.BitBoard)
+    game.shoot_ray(0, 3)
+    game.shoot_ray(seed % 8 + 1, 0)
+    return game
+
+
+def test_evicted_games_come_back(tmp_path):
+    with SessionStore(str(tmp_path / "spill"), max_entries=3) as store:
+        for game_id in range(10):
+            store[game_id] = make_game(game_id)
+        assert len(store) == 10
+        assert store.get_stats()["in_memory"] == 3
+        for game_id in range(10):
+            game = store[game_id]
+            assert game.get_rays() == make_game(game_id).get_rays()
+            assert game.get_score() == make_game(game_id).get_score()
+        assert store.get_stats()["loads"] >= 7
+
+
+def test_least_recently_used_is_evicted(tmp_path):
+    with SessionStore(str(tmp_path / "spill"), max_entries=2) as store:
+        store[1] = make_game(1)
+        store[2] = make_game(2)
+        store[1]
+        store[3] = make_game(3)
+        assert store.get_stats()["on_disk"] == 1
+        assert store.get(2) is not None
+        assert store.get_stats()["loads"] == 1
+
+
+def test_delete_and_missing(tmp_path):
+    path = tmp_path / "spill"
+    with SessionStore(str(path), max_entries=1) as store:
+        store[1] = make_game(1)
+        store[2] = make_game(2)
+        del store[1]
+        del store[2]
+        assert len(store) == 0
+        assert store.get(1) is None
+        with pytest.raises(KeyError):
+            store[1]
+    assert not path.exists()
+
+
+def test_max_bytes_and_idle(tmp_path):
+    with SessionStore(str(tmp_path / "spill"), max_entries=100, max_bytes=1) as store:
+        store[1] = make_game(1)
+        store[2] = make_game(2)
+        assert store.get_stats()["in_memory"] == 1
+        assert store.evict_idle(0) == 1
+        assert store[2].get_score() == make_game(2).get_score()
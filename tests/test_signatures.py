@@ -0,0 +1,44 @@
+# Description: tests of the layout ranks and the signature index
+
+import itertools
+
+import pytest
+
+import BlackBox
+import signatures
+
+
+def test_ranks_count_every_layout_once():
+    inner = 5
+    layouts = list(itertools.combinations([(row, col) for row in range(1, 6) for col in range(1, 6)], 3))
+    ranks = sorted(signatures.get_rank(list(layout), inner + 2) for layout in layouts)
+    assert ranks == list(range(len(layouts)))
+    for layout in layouts[::37]:
+        rank = signatures.get_rank(list(layout), 7)
+        assert signatures.get_layout(rank, 3, 7) == sorted(layout)
+
+
+def test_index_matches_board(tmp_path):
+    path = str(tmp_path / "index.bin")
+    signatures.build_index(path, atom_count=2, size=7, chunk=100)
+    with signatures.SignatureIndex(path) as index:
+        assert len(index) == 300
+        assert (index.get_size(), index.get_atom_count()) == (7, 2)
+        for rank in range(0, 300, 7):
+            layout = signatures.get_layout(rank, 2, 7)
+            assert index.get_exits(layout) == BlackBox.Board(layout, 7).get_exits()
+        scanned = sum(len(rows) for first, rows in index.scan(block=64))
+        assert scanned == 300
+        with pytest.raises(ValueError):
+            index.get_signature([(1, 1)])
+
+
+def test_not_an_index(tmp_path):
+    path = tmp_path / "index.bin"
+    path.write_bytes(b"nope")
+    with pytest.raises(ValueError):
+        signatures.SignatureIndex(str(path))
+    signatures.build_index(str(path), atom_count=1, size=5)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        signatures.SignatureIndex(str(path))
@@ -0,0 +1,50 @@
+# Description: tests that the solver finds exactly the layouts that explain the rays
+
+import itertools
+import random
+
+import BlackBox
+import solver
+
+
+def play(atoms, entries, size=10):
+    game = BlackBox.BlackBoxGame(list(atoms), BlackBox.BitBoard, size)
+    for entry in entries:
+        game.shoot_ray(*entry)
+    return game
+
+
+def test_matches_brute_force():
+    size = 6
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    rng = random.Random(7)
+    for _ in range(5):
+        atoms = sorted(rng.sample(squares, 3))
+        game = play(atoms, rng.sample(BlackBox.Board([], size).get_border_entries(), 5), size)
+        observations = solver.get_observations(game)
+        expected = [list(layout) for layout in itertools.combinations(squares, 3)
+                    if solver.is_consistent(list(layout), observations, size)]
+        found = sorted(sorted(layout) for layout in solver.solve(game, processes=1))
+        assert found == expected
+        assert atoms in found
+
+
+def test_processes_find_the_same_layouts():
+    game = play([(2, 3), (5, 5), (7, 2), (4, 8)], [(0, 3), (9, 5), (4, 0), (2, 9), (0, 7), (6, 9)])
+    one = sorted(sorted(layout) for layout in solver.solve(game, processes=1))
+    two = sorted(sorted(layout) for layout in solver.solve(game, processes=2))
+    assert one == two
+    assert [(2, 3), (4, 8), (5, 5), (7, 2)] in one
+
+
+def test_candidate_squares_leave_out_the_first_step_of_an_exit():
+    observations = [((0, 4), (9, 4))]
+    candidates = solver.get_candidate_squares(observations)
+    for pos in [(1, 3), (1, 4), (1, 5)]:
+        assert pos not in candidates
+    assert len(candidates) == 64 - 3
+
+
+def test_observations_are_distinct():
+    game = play([(2, 3)], [(0, 3), (0, 3), (0, 5)])
+    assert solver.get_observations(game) == [((0, 3), None), ((0, 5), (9, 5))]
@@ -0,0 +1,135 @@
+# Description: tests of undo, redo, snapshots and branches of BlackBoxGame
+
+import pickle
+
+import BlackBox
+import eventlog
+
+ATOMS = [(2, 3), (5, 5), (7, 2), (4, 8)]
+
+
+def get_state(game):
+    return (game.get_score(), game.atoms_left(), game.get_status(), game.get_guesses(), game.get_entries_exits(),
+            game.get_hits(), game.get_reflects(), game.get_rays())
+
+
+def test_undo_and_redo():
+    game = BlackBox.BlackBoxGame(list(ATOMS), BlackBox.BitBoard)
+    start = game.get_snapshot()
+    game.shoot_ray(0, 3)
+    after_ray = game.get_snapshot()
+    game.guess_atom(1, 1)
+    score = game.get_score()
+    assert score < 100
+
+    assert game.undo()
+    assert game.get_snapshot() == after_ray
+    assert game.undo()
+    assert game.get_snapshot() == start
+    assert not game.undo()
+
+    assert game.redo() and game.redo()
+    assert game.get_score() == score and game.get_guesses() == [(1, 1)]
+    assert not game.redo()
+
+
+def test_move_after_undo_forgets_redo():
+    game = BlackBox.BlackBoxGame(list(ATOMS), BlackBox.BitBoard)
+    game.shoot_ray(0, 3)
+    game.undo()
+    game.shoot_ray(4, 0)
+    assert not game.can_redo()
+    assert game.get_rays() == [((4, 0), game.get_board().get_exit((4, 0)))]
+
+
+def test_moves_that_change_nothing_are_not_recorded():
+    game = BlackBox.BlackBoxGame(list(ATOMS), BlackBox.BitBoard)
+    game.guess_atom(2, 3)
+    game.guess_atom(2, 3)
+    assert game.shoot_ray(0, 0) is False
+    assert game.undo()
+    assert not game.can_undo()
+    assert game.get_guesses() is None
+
+
+def test_branch_and_restore():
+    game = BlackBox.BlackBoxGame(list(ATOMS), BlackBox.BitBoard)
+    game.shoot_ray(0, 3)
+    saved = game.get_snapshot()
+    other = game.branch()
+    other.shoot_ray(4, 0)
+    for pos in ATOMS:
+        other.guess_atom(*pos)
+    assert other.get_status() == "You won! Play again!"
+    assert game.get_rays() == [((0, 3), game.get_board().get_exit((0, 3)))]
+    assert game.get_status() == "started"
+
+    game.restore(other.get_snapshot())
+    assert game.get_guesses() == sorted(ATOMS)
+    assert game.undo()
+    assert game.get_snapshot() == saved
+
+
+def test_pickled_game_keeps_its_history():
+    game = BlackBox.BlackBoxGame(list(ATOMS), BlackBox.BitBoard)
+    for entry in [(0, 3), (9, 5), (4, 0)]:
+        game.shoot_ray(*entry)
+    game.undo()
+    copy = pickle.loads(pickle.dumps(game))
+    assert get_state(copy) == get_state(game)
+    assert copy.redo() and game.redo()
+    assert get_state(copy) == get_state(game)
+
+
+def test_persistent_list():
+    items = BlackBox.PersistentList([1, 2])
+    longer = items.append(3)
+    assert items.to_list() == [1, 2] and longer.to_list() == [1, 2, 3]
+    assert 3 in longer and 3 not in items
+    assert longer.get_rest().to_list() == [1, 2] and longer.get_last() == 3
+    assert pickle.loads(pickle.dumps(longer)).to_list() == [1, 2, 3]
+
+
+def test_undo_and_redo_are_replayed(tmp_path):
+    path = str(tmp_path / "events.log")
+    with eventlog.EventLog(path) as log:
+        game = BlackBox.BlackBoxGame(list(ATOMS), BlackBox.BitBoard, event_log=log, game_id=1)
+        game.shoot_ray(0, 3)
+        game.guess_atom(1, 1)
+        game.undo()
+        game.undo()
+        game.redo()
+        game.shoot_ray(4, 0)
+    with eventlog.EventLogReader(path) as reader:
+        copy = reader.replay()[1]
+    assert get_state(copy) == get_state(game)
+
+
+def test_history_grows_with_the_shots_not_the_board():
+    size = 60
+    game = BlackBox.BlackBoxGame([(2, 3), (30, 30)], BlackBox.SparseBoard, size)
+    sizes = []
+    for entry in game.get_board().get_border_entries()[:200]:
+        game.shoot_ray(*entry)
+        sizes.append(len(pickle.dumps(game, pickle.HIGHEST_PROTOCOL)))
+        assert game.get_snapshot()[5].bit_length() <= 4 * (size - 2)  # the used squares mask
+    assert sizes[199] - sizes[99] < 2 * (sizes[99] - sizes[0])
+
+    copy = pickle.loads(pickle.dumps(game, pickle.HIGHEST_PROTOCOL))
+    while game.can_undo():
+        assert copy.undo() and game.undo()
+        assert get_state(copy) == get_state(game)
+    assert not copy.can_undo()
+    assert copy.redo() and get_state(copy) != get_state(game)
+
+
+def test_packed_lists_share_their_nodes():
+    first = BlackBox.PersistentList([1, 2, 3])
+    second = first.append(4)
+    third = first.get_rest().append(5)
+    items, rests, heads = BlackBox.pack_lists([second, third, None, BlackBox.EMPTY_LIST, first])
+    assert len(items) == 5
+    lists = BlackBox.unpack_lists(items, rests, heads)
+    assert [plist.to_list() for plist in lists[:2]] == [[1, 2, 3, 4], [1, 2, 5]]
+    assert lists[2] is None and len(lists[3]) == 0 and lists[4].to_list() == [1, 2, 3]
+    assert lists[0].get_rest() is lists[4]